@@ -189,33 +189,33 @@ def show_fantasy_points_sample():
     client = DatabricksRestClient()
     
     print("🏆 Top 10 players by fantasy points:")
-    result = client.execute_sql("""
+    columns = client.execute_sql_numpy("""
     SELECT 
         player_name,
         matches_played,
-        total_tries,
-        total_tackles_made,
-        total_metres_carried,
-        total_fantasy_points,
-        fantasy_points_per_game,
-        fantasy_points_per_minute,
+        COALESCE(total_tries, 0) as total_tries,
+        COALESCE(total_tackles_made, 0) as total_tackles_made,
+        COALESCE(total_metres_carried, 0) as total_metres_carried,
+        COALESCE(total_fantasy_points, 0) as total_fantasy_points,
+        COALESCE(fantasy_points_per_game, 0) as fantasy_points_per_game,
+        COALESCE(fantasy_points_per_minute, 0) as fantasy_points_per_minute,
         last_updated
     FROM default.rugby_match_statistics_agg
     ORDER BY total_fantasy_points DESC
     LIMIT 10
     """)
     
-    if result and 'result' in result and result['result'].get('data_array'):
+    if len(columns['player_name']):
         print("Player Name | Matches | Tries | Tackles | Metres | Total FP | FP/Game | FP/Min")
         print("-" * 95)
-        for i, row in enumerate(result['result']['data_array'], 1):
-            tries = float(row[2]) if row[2] is not None else 0
-            tackles = float(row[3]) if row[3] is not None else 0
-            metres = float(row[4]) if row[4] is not None else 0
-            fantasy_points = float(row[5]) if row[5] is not None else 0
-            fp_per_game = float(row[6]) if row[6] is not None else 0
-            fp_per_minute = float(row[7]) if row[7] is not None else 0
-            print(f"{row[0]:<25} | {row[1]:<7} | {tries:>5.0f} | {tackles:>7.0f} | {metres:>6.0f} | {fantasy_points:>8.1f} | {fp_per_game:>7.1f} | {fp_per_minute:>6.2f}")
+        rows = zip(
+            columns['player_name'], columns['matches_played'], columns['total_tries'],
+            columns['total_tackles_made'], columns['total_metres_carried'], columns['total_fantasy_points'],
+            columns['fantasy_points_per_game'], columns['fantasy_points_per_minute']
+        )
+        for name, matches, tries, tackles, metres, fantasy_points, fp_per_game, fp_per_minute in rows:
+            print(f"{name:<25} | {matches:<7} | {tries:>5.0f} | {tackles:>7.0f} | {metres:>6.0f} | {fantasy_points:>8.1f} | {fp_per_game:>7.1f} | {fp_per_minute:>6.2f}")
+        print(f"\nAverage FP/Game across the top 10: {columns['fantasy_points_per_game'].mean():.1f}")
     else:
         print("No data found in aggregate table")
 
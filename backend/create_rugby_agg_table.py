@@ -198,12 +198,12 @@ def show_sample_data():
     SELECT 
         player_name,
         total_matches,
-        total_minutes_played,
-        total_tries,
-        total_tackles_made,
-        avg_tackles_per_minute,
-        avg_tries_per_match,
-        avg_tackles_per_match,
+        COALESCE(total_minutes_played, 0) as total_minutes_played,
+        COALESCE(total_tries, 0) as total_tries,
+        COALESCE(total_tackles_made, 0) as total_tackles_made,
+        COALESCE(avg_tackles_per_minute, 0) as avg_tackles_per_minute,
+        COALESCE(avg_tries_per_match, 0) as avg_tries_per_match,
+        COALESCE(avg_tackles_per_match, 0) as avg_tackles_per_match,
         last_updated
     FROM default.rugby_match_statistics_agg
     ORDER BY total_tries DESC
@@ -211,19 +211,18 @@ def show_sample_data():
     """
     
     try:
-        result = client.execute_sql(sample_sql)
-        if result and 'result' in result and result['result'].get('data_array'):
+        columns = client.execute_sql_numpy(sample_sql)
+        if len(columns['player_name']):
             print("\n🏆 Top 5 players by total tries:")
             print("Player Name | Matches | Minutes | Tries | Tackles | Tackles/Min | Avg Tries/Match | Avg Tackles/Match")
             print("-" * 110)
-            for row in result['result']['data_array']:
-                minutes = float(row[2]) if row[2] is not None else 0
-                tries = float(row[3]) if row[3] is not None else 0
-                tackles = float(row[4]) if row[4] is not None else 0
-                tackles_per_min = float(row[5]) if row[5] is not None else 0
-                avg_tries = float(row[6]) if row[6] is not None else 0
-                avg_tackles = float(row[7]) if row[7] is not None else 0
-                print(f"{row[0]:<15} | {row[1]:<7} | {minutes:>7.1f} | {tries:>5.0f} | {tackles:>7.0f} | {tackles_per_min:>10.3f} | {avg_tries:>15.2f} | {avg_tackles}")
+            rows = zip(
+                columns['player_name'], columns['total_matches'], columns['total_minutes_played'],
+                columns['total_tries'], columns['total_tackles_made'], columns['avg_tackles_per_minute'],
+                columns['avg_tries_per_match'], columns['avg_tackles_per_match']
+            )
+            for name, matches, minutes, tries, tackles, tackles_per_min, avg_tries, avg_tackles in rows:
+                print(f"{name:<15} | {matches:<7} | {minutes:>7.1f} | {tries:>5.0f} | {tackles:>7.0f} | {tackles_per_min:>10.3f} | {avg_tries:>15.2f} | {avg_tackles}")
         else:
             print("No data found in aggregate table")
             
@@ -3,6 +3,8 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from .databricks_rest_client import DatabricksRestClient
+from .row_mapper import map_records
+from .result_cache import invalidate
 
 
 @api_view(['DELETE'])
@@ -14,8 +16,7 @@ def remove_team_from_league(request, league_id, team_id):
         
         # First, verify the user is the league admin
         # Get league info to check created_by
-        league_sql = f"SELECT * FROM default.user_created_leagues WHERE id = {league_id}"
-        league_result = client.execute_sql(league_sql)
+        league_result = client.execute_named('league_by_id', {'league_id': league_id})
         
         if not league_result or 'result' not in league_result or not league_result['result'].get('data_array'):
             return Response({'error': 'League not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -27,8 +28,7 @@ def remove_team_from_league(request, league_id, team_id):
         # For now, we'll allow the operation (you can add JWT verification later)
         
         # Check if team exists in the league
-        team_sql = f"SELECT * FROM default.league_teams WHERE id = {team_id} AND league_id = {league_id}"
-        team_result = client.execute_sql(team_sql)
+        team_result = client.execute_named('team_in_league', {'team_id': team_id, 'league_id': league_id})
         
         if not team_result or 'result' not in team_result or not team_result['result'].get('data_array'):
             return Response({'error': 'Team not found in this league'}, status=status.HTTP_404_NOT_FOUND)
@@ -38,6 +38,8 @@ def remove_team_from_league(request, league_id, team_id):
         result = client.execute_sql(delete_sql)
         
         if result and 'status' in result and result['status'].get('state') == 'SUCCEEDED':
+            team = map_records(team_result, coerce=False)[0]
+            invalidate([f'league:{league_id}', f'team:{team_id}', f'user:{team.team_owner_user_id}'])
             return Response({'status': 'Team removed from league successfully'}, status=status.HTTP_200_OK)
         else:
             return Response({'error': 'Failed to remove team from league'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -54,8 +56,7 @@ def get_league_admin(request, league_id):
         client = DatabricksRestClient()
         
         # Get league info
-        league_sql = f"SELECT * FROM default.user_created_leagues WHERE id = {league_id}"
-        league_result = client.execute_sql(league_sql)
+        league_result = client.execute_named('league_by_id', {'league_id': league_id})
         
         if not league_result or 'result' not in league_result or not league_result['result'].get('data_array'):
             return Response({'error': 'League not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -89,8 +90,7 @@ def is_user_league_admin(request, league_id, user_id):
         client = DatabricksRestClient()
         
         # Get league info
-        league_sql = f"SELECT * FROM default.user_created_leagues WHERE id = {league_id}"
-        league_result = client.execute_sql(league_sql)
+        league_result = client.execute_named('league_by_id', {'league_id': league_id})
         
         if not league_result or 'result' not in league_result or not league_result['result'].get('data_array'):
             return Response({'error': 'League not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -124,16 +124,8 @@ def register(request):
         try:
             client = DatabricksRestClient()
             
-            # Check if user exists by email
-            existing_user = client.get_user_by_email(email)
-            if existing_user and 'result' in existing_user and existing_user['result'].get('data_array'):
-                return Response({
-                    'success': False,
-                    'error': 'User with this email already exists'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Check if user exists by username
-            existing_user = client.get_user_by_username(email)
+            # Check if user exists by email or username in one lookup
+            existing_user = client.execute_named('user_exists', {'email': email, 'username': email})
             if existing_user and 'result' in existing_user and existing_user['result'].get('data_array'):
                 return Response({
                     'success': False,
@@ -148,8 +140,8 @@ def register(request):
                 is_active=True
             )
             
-            # Get the created user
-            user_data = client.get_user_by_email(email)
+            # Get the created user (not from a lookup that may predate the insert)
+            user_data = client.get_user_by_email(email, coalesce=False)
             if not user_data or 'result' not in user_data or not user_data['result'].get('data_array'):
                 return Response({
                     'success': False,
@@ -307,7 +299,7 @@ def refresh_token(request):
         # Get user from Databricks using REST API
         try:
             client = DatabricksRestClient()
-            user_data = client.execute_sql(f"SELECT * FROM default.auth_users WHERE id = {payload['user_id']}")
+            user_data = client.execute_named('user_by_id', {'user_id': payload['user_id']})
             
             if not user_data or 'result' not in user_data or not user_data['result'].get('data_array'):
                 return Response({
@@ -384,7 +376,7 @@ def verify_token(request):
         # Get user from Databricks using REST API
         try:
             client = DatabricksRestClient()
-            user_data = client.execute_sql(f"SELECT * FROM default.auth_users WHERE id = {payload['user_id']}")
+            user_data = client.execute_named('user_by_id', {'user_id': payload['user_id']})
             
             if not user_data or 'result' not in user_data or not user_data['result'].get('data_array'):
                 return Response({
@@ -0,0 +1,109 @@
+"""
+Auto-pick for the draft engine
+
+When a team's pick clock runs out the draft engine picks for it. The old
+client-side auto-pick (AUTO_PICK_SYSTEM.md) re-sorted every available
+player by fantasy_points_per_game on each expiry and ignored the team's
+roster. This one keeps, per draft, one ranking of the available players
+per fantasy position and scores only the best of each:
+
+    score = value - replacement[position] + NEED_BONUS (if a starting slot is open)
+
+- value: the player's fantasy_points_per_game
+- replacement: value over replacement baseline, the points per game of the
+  last player at the position who would start if every team filled its
+  starting slots with the best players there (computed once per draft)
+- NEED_BONUS: extra weight for positions where the team still has an open
+  starting slot, so rosters fill their starters before their bench
+
+Positions whose next player does not fit the team's roster are skipped.
+Each ranking is a sorted index with a moving head: picked players (by
+anyone) are dropped lazily as the head passes them, like pops from a
+heap, so a pick costs one vectorized score over the handful of positions
+plus amortized constant work per position. Ties go to the position
+listed first and then to the lower player id, so the same draft state
+always gives the same pick.
+
+Configuration:
+- AUTO_PICK_NEED_BONUS: points per game added for an open starting slot
+  (default 3.0)
+"""
+
+import numpy as np
+from decouple import config
+
+
+NEED_BONUS = config('AUTO_PICK_NEED_BONUS', default=3.0, cast=float)
+VALUE_FIELD = 'fantasy_points_per_game'
+
+
+class AutoPicker:
+    """Per-draft rankings of available players for auto-picking"""
+
+    def __init__(self, catalog, eligible, team_count, starting_slots, bench_slots):
+        """
+        catalog and eligible: the draft's player catalog snapshot and the
+        catalog indices of the players in the draft. starting_slots maps
+        fantasy position to starters per team; bench_slots is the number
+        of extra players of any position.
+        """
+        self.starting_slots = starting_slots
+        self.bench_slots = bench_slots
+        self.values = np.nan_to_num(catalog.stats[VALUE_FIELD].astype(np.float64))
+
+        fantasy_positions = catalog.column('fantasy_position')
+        eligible = catalog.sort(np.asarray(eligible, dtype=np.int64), by=VALUE_FIELD)
+        present = set(fantasy_positions[eligible].tolist())
+        # Positions with starting slots first, in roster order, then any others
+        self.positions = [position for position in starting_slots if position in present] + sorted(
+            (position for position in present if position not in starting_slots), key=str
+        )
+
+        # Best first, ties by player id (catalog.sort's order)
+        eligible_positions = fantasy_positions[eligible]
+        self.rankings = [eligible[eligible_positions == position] for position in self.positions]
+        self.heads = np.zeros(len(self.positions), dtype=np.int64)
+
+        replacement = np.zeros(len(self.positions))
+        for slot, (position, ranking) in enumerate(zip(self.positions, self.rankings)):
+            starters = team_count * starting_slots.get(position, 0)
+            if starters and len(ranking):
+                replacement[slot] = self.values[ranking[min(starters, len(ranking)) - 1]]
+        # Bench-only positions are measured against the strictest baseline
+        has_starters = np.array([bool(starting_slots.get(position)) for position in self.positions], dtype=bool)
+        if has_starters.any():
+            replacement[~has_starters] = replacement[has_starters].max()
+        self.replacement = replacement
+        self.starter_slots = np.array([starting_slots.get(position, 0) for position in self.positions])
+
+    def _head(self, slot, picked):
+        """Catalog index of the best available player at a position, or -1"""
+        ranking = self.rankings[slot]
+        head = self.heads[slot]
+        while head < len(ranking) and picked[ranking[head]]:
+            head += 1
+        self.heads[slot] = head
+        return ranking[head] if head < len(ranking) else -1
+
+    def pick(self, position_counts, roster_size, picked):
+        """
+        Catalog index of the player to auto-pick, or None if nothing fits
+
+        position_counts: Counter of the team's players by fantasy position;
+        roster_size: number of players the team has; picked: the draft's
+        picked-player bitset.
+        """
+        heads = np.array([self._head(slot, picked) for slot in range(len(self.positions))], dtype=np.int64)
+        counts = np.array([position_counts[position] for position in self.positions])
+
+        starters = np.minimum(counts, self.starter_slots).sum()
+        open_starter = counts < self.starter_slots
+        bench_open = roster_size - starters < self.bench_slots
+        fits = (heads >= 0) & (open_starter | bench_open)
+        if not fits.any():
+            return None
+
+        scores = self.values[heads] - self.replacement + NEED_BONUS * open_starter
+        scores[~fits] = -np.inf
+        # argmax takes the first of equal scores: the earlier position
+        return int(heads[int(np.argmax(scores))])
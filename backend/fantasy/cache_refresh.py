@@ -0,0 +1,170 @@
+"""
+Background refresh for stale-while-revalidate cache entries
+
+Hot read endpoints (player pool, tournaments) cache their results with a
+max_stale window. Once an entry passes its ttl it is still served, so users
+never wait on the warehouse, and a refresh is queued on a small thread pool
+instead. Past ttl + max_stale the entry is gone and the next request loads
+it synchronously.
+
+A scheduler thread also watches how often each key is read and refreshes
+the hottest keys shortly before they go stale, so busy pages rarely see a
+stale value at all.
+
+Configuration:
+- CACHE_REFRESH_WORKERS: background refresh threads per worker (default 4)
+- CACHE_REFRESH_INTERVAL: seconds between scheduler passes (default 5)
+- CACHE_REFRESH_TOP_N: hottest keys the scheduler keeps warm (default 20)
+- CACHE_REFRESH_LEAD: refresh hot keys this many seconds before they go stale (default 15)
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decouple import config
+
+
+REFRESH_WORKERS = config('CACHE_REFRESH_WORKERS', default=4, cast=int)
+REFRESH_INTERVAL = config('CACHE_REFRESH_INTERVAL', default=5, cast=float)
+REFRESH_TOP_N = config('CACHE_REFRESH_TOP_N', default=20, cast=int)
+REFRESH_LEAD = config('CACHE_REFRESH_LEAD', default=15, cast=float)
+
+
+class _TrackedKey:
+    """A refreshable key: how to reload it, when it goes stale and how hot it is"""
+
+    def __init__(self, reload):
+        self.reload = reload
+        self.fresh_until = None
+        self.hits = 0.0
+
+
+class CacheRefresher:
+    """Runs refreshes in the background and keeps the hottest keys warm"""
+
+    def __init__(self, workers=REFRESH_WORKERS, interval=REFRESH_INTERVAL, top_n=REFRESH_TOP_N, lead=REFRESH_LEAD):
+        self.workers = workers
+        self.interval = interval
+        self.top_n = top_n
+        self.lead = lead
+        self._keys = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._scheduler = None
+        self._pid = None
+        self.served_stale = 0
+        self.scheduled = 0
+        self.refreshed = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        """Start the pool and scheduler in this process (again after a fork)"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='cache-refresh')
+            self._pending = set()
+            self._scheduler = threading.Thread(target=self._run_scheduler, name='cache-refresh-scheduler', daemon=True)
+            self._pid = pid
+            self._scheduler.start()
+
+    def track(self, cache_key, reload, fresh_until):
+        """
+        Record a read of cache_key
+
+        reload() must load the value and store it in the cache, returning
+        the new fresh_until. Stale reads queue a refresh immediately.
+        """
+        self._ensure_started()
+        with self._lock:
+            tracked = self._keys.get(cache_key)
+            if tracked is None:
+                tracked = self._keys[cache_key] = _TrackedKey(reload)
+            tracked.reload = reload
+            tracked.fresh_until = fresh_until
+            tracked.hits += 1
+            stale = fresh_until is not None and fresh_until <= time.time()
+            if stale:
+                self.served_stale += 1
+        if stale:
+            self.schedule(cache_key)
+
+    def loaded(self, cache_key, fresh_until):
+        """Record that cache_key was (re)loaded and is fresh until fresh_until"""
+        with self._lock:
+            tracked = self._keys.get(cache_key)
+            if tracked is not None:
+                tracked.fresh_until = fresh_until
+
+    def schedule(self, cache_key):
+        """Queue a background refresh of cache_key unless one is already queued"""
+        self._ensure_started()
+        with self._lock:
+            tracked = self._keys.get(cache_key)
+            if tracked is None or cache_key in self._pending:
+                return
+            self._pending.add(cache_key)
+            self.scheduled += 1
+        self._executor.submit(self._refresh, cache_key, tracked.reload)
+
+    def _refresh(self, cache_key, reload):
+        try:
+            fresh_until = reload()
+            with self._lock:
+                self.refreshed += 1
+            self.loaded(cache_key, fresh_until)
+        except Exception as e:
+            # Keep serving the stale value; the next stale read retries
+            print(f"WARNING: background refresh of {cache_key} failed: {e}")
+            with self._lock:
+                self.failed += 1
+        finally:
+            with self._lock:
+                self._pending.discard(cache_key)
+
+    def _run_scheduler(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                for cache_key in self._due_hot_keys():
+                    self.schedule(cache_key)
+            except Exception as e:
+                print(f"WARNING: cache refresh scheduler pass failed: {e}")
+
+    def _due_hot_keys(self):
+        """Hottest keys that go stale within the lead time; decays hit counts"""
+        now = time.time()
+        with self._lock:
+            hottest = sorted(self._keys.items(), key=lambda item: item[1].hits, reverse=True)[:self.top_n]
+            due = [
+                cache_key for cache_key, tracked in hottest
+                if tracked.hits >= 1 and tracked.fresh_until is not None
+                and tracked.fresh_until - now <= self.lead
+            ]
+            # Halve every count each pass so keys cool off once traffic stops
+            for cache_key, tracked in list(self._keys.items()):
+                tracked.hits /= 2
+                if tracked.hits < 0.01 and cache_key not in self._pending:
+                    del self._keys[cache_key]
+        return due
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                'tracked_keys': len(self._keys),
+                'pending': len(self._pending),
+                'served_stale': self.served_stale,
+                'scheduled': self.scheduled,
+                'refreshed': self.refreshed,
+                'failed': self.failed
+            }
+
+
+# Shared by all view modules in this process
+refresher = CacheRefresher()
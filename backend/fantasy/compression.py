@@ -0,0 +1,246 @@
+"""
+Negotiated response compression and conditional GET
+
+Responses are compressed with brotli or gzip, whichever the client's
+Accept-Encoding prefers (brotli only when the `brotli` package is
+installed). Bodies under COMPRESSION_MIN_SIZE bytes go out as they are.
+
+Two paths:
+- CompressionMiddleware compresses any other JSON or text response on the
+  fly at a fast compression level.
+- Hot cacheable endpoints serialize their result once into an EncodedBody,
+  which compresses each encoding once at a high level and keeps the bytes
+  for as long as the cached result is unchanged. Repeat requests then cost
+  a dictionary lookup instead of a serialize and compress.
+
+Encoded bodies also carry a strong ETag (a hash of the uncompressed body,
+suffixed per content encoding) and a Last-Modified time, so polling
+clients sending If-None-Match or If-Modified-Since get a 304 without the
+body being rebuilt or re-serialized.
+
+Configuration:
+- COMPRESSION_MIN_SIZE: smallest body worth compressing in bytes (default 1024)
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from decouple import config
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from .renderers import ORJSONRenderer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+# Encodings in server preference order, used to break ties in q-values
+SUPPORTED_ENCODINGS = ['br', 'gzip'] if brotli is not None else ['gzip']
+# Encoded bodies kept per process by cache key
+BODY_CACHE_ENTRIES = 256
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript')
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Best supported encoding for an Accept-Encoding header, or None
+
+    Honors q-values (q=0 refuses an encoding) and the '*' wildcard.
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(content, encoding, fast=False):
+    """Compress bytes with 'br' or 'gzip'; fast trades ratio for speed"""
+    if encoding == 'br':
+        return brotli.compress(content, quality=5 if fast else 11)
+    if encoding == 'gzip':
+        return gzip.compress(content, compresslevel=6 if fast else 9, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+class EncodedBody:
+    """A serialized response body and its compressed forms, each built once"""
+
+    def __init__(self, content, content_type='application/json'):
+        self.content = content
+        self.content_type = content_type
+        self.last_modified = time.time()
+        self.etag_value = hashlib.sha256(content).hexdigest()[:32]
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def etag(self, encoding=None):
+        """Strong ETag of this body as sent with a content encoding"""
+        return f'"{self.etag_value}-{encoding}"' if encoding else f'"{self.etag_value}"'
+
+    def matches(self, if_none_match):
+        """Whether an If-None-Match header names this body (in any encoding)"""
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag == '*':
+                return True
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            tag = tag.strip('"')
+            if tag == self.etag_value or tag.rpartition('-')[0] == self.etag_value:
+                return True
+        return False
+
+    def not_modified(self, request):
+        """Whether a conditional GET can be answered with 304"""
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            return self.matches(if_none_match)
+        since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return since is not None and int(self.last_modified) <= since
+
+    def encoded(self, encoding):
+        """
+        (bytes, content encoding) to send for a negotiated encoding
+
+        Falls back to the identity body when it is too small to be worth
+        compressing or compression would not make it smaller.
+        """
+        if encoding is None or len(self.content) < MIN_SIZE:
+            return self.content, None
+        with self._lock:
+            cached = self._encoded.get(encoding)
+        if cached is None:
+            compressed = compress(self.content, encoding)
+            cached = (compressed, encoding) if len(compressed) < len(self.content) else (self.content, None)
+            with self._lock:
+                self._encoded[encoding] = cached
+        return cached
+
+
+def render_body(data, renderer=None):
+    """Serialize data with a negotiated renderer (JSON by default)"""
+    renderer = renderer or ORJSONRenderer()
+    return EncodedBody(renderer.render(data, renderer.media_type), content_type=renderer.media_type)
+
+
+def json_body(data):
+    """Serialize data exactly as the API's JSON renderer does"""
+    return render_body(data)
+
+
+def accepted_renderer(request):
+    """The renderer DRF negotiated from the request's Accept header"""
+    return getattr(request, 'accepted_renderer', None) or ORJSONRenderer()
+
+
+_bodies = OrderedDict()
+_bodies_lock = threading.Lock()
+
+
+def cached_body(cache_key, data, renderer=None):
+    """
+    The EncodedBody for a cached result, serialized once per result
+
+    Keyed by cache key, response format and the identity of the result
+    object: the query cache hands back the same object until the entry is
+    replaced, so a new result (after a reload or invalidation) is
+    serialized afresh.
+    """
+    renderer = renderer or ORJSONRenderer()
+    cache_key = (cache_key, renderer.format)
+    with _bodies_lock:
+        entry = _bodies.get(cache_key)
+        if entry is not None and entry[0] is data:
+            _bodies.move_to_end(cache_key)
+            return entry[1]
+    body = render_body(data, renderer)
+    # A reload that produced the same content keeps its ETag and Last-Modified
+    if entry is not None and entry[1].content == body.content:
+        body = entry[1]
+    with _bodies_lock:
+        _bodies[cache_key] = (data, body)
+        _bodies.move_to_end(cache_key)
+        while len(_bodies) > BODY_CACHE_ENTRIES:
+            _bodies.popitem(last=False)
+    return body
+
+
+def body_response(request, body, status=200):
+    """
+    HttpResponse for an EncodedBody in the encoding the client prefers
+
+    Answers a matching conditional GET with 304 Not Modified. Clients are
+    told to revalidate every time (Cache-Control: no-cache) so a stored
+    copy is never used without checking it is still current.
+    """
+    content, encoding = body.encoded(negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+    if status == 200 and body.not_modified(request):
+        response = HttpResponse(status=304)
+        del response['Content-Type']
+    else:
+        response = HttpResponse(content, content_type=body.content_type, status=status)
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Content-Length'] = str(len(content))
+    if status == 200:
+        response['ETag'] = body.etag(encoding)
+        response['Last-Modified'] = http_date(body.last_modified)
+        patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+    return response
+
+
+class CompressionMiddleware:
+    """Compress JSON and text responses that a view did not already encode"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < MIN_SIZE:
+            return response
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding, fast=True)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        return response
@@ -2,6 +2,8 @@ import requests
 import json
 from django.conf import settings
 from typing import Dict, List, Optional, Any
+from . import databricks_rest_client
+from .databricks_rest_client import session_request
 
 
 class DatabricksClient:
@@ -28,14 +30,10 @@ class DatabricksClient:
         
         try:
             print(f"Making request to: {url}")
-            if method.upper() == 'GET':
-                response = requests.get(url, headers=self.headers)
-            elif method.upper() == 'POST':
-                response = requests.post(url, headers=self.headers, json=data)
-            elif method.upper() == 'PUT':
-                response = requests.put(url, headers=self.headers, json=data)
-            elif method.upper() == 'DELETE':
-                response = requests.delete(url, headers=self.headers)
+            if method.upper() in ('GET', 'DELETE'):
+                response = session_request(method.upper(), url, headers=self.headers)
+            elif method.upper() in ('POST', 'PUT'):
+                response = session_request(method.upper(), url, headers=self.headers, json=data)
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
             
@@ -43,7 +41,7 @@ class DatabricksClient:
             response.raise_for_status()
             return response.json()
             
-        except requests.exceptions.RequestException as e:
+        except databricks_rest_client.TRANSPORT_ERRORS as e:
             print(f"Databricks API request failed: {e}")
             print(f"URL was: {url}")
             return None
@@ -9,21 +9,316 @@ Key Features:
 - Automatic authentication with Bearer tokens
 - Error handling and response parsing
 - Support for both warehouse and cluster execution
+- Process-wide pooled keep-alive HTTP session shared by all clients
+- Asynchronous statement submission with polling and cancellation
+- Chunk-by-chunk result streaming (inline JSON or external Arrow links)
+- Columnar results as pyarrow Tables or NumPy arrays for analytic reads
+- Named, typed records built from the statement manifest
+- Parameterized statements and a registry of named query templates
+- Batches of independent statements executed concurrently
+- Identical concurrent reads coalesced into one warehouse statement
 
 Configuration:
 - Uses environment variables for sensitive data
 - Supports both development and production environments
 - Handles API rate limiting and retries
+- DATABRICKS_POOL_SIZE: connections kept alive per worker (default 10)
+- DATABRICKS_HTTP2: use an HTTP/2 transport when httpx[http2] is installed
+- DATABRICKS_COALESCE_READS: share in-flight identical reads (default on)
 
 Author: Roland Crouch
 Date: September 2025
 Version: 1.0.0
 """
 
+import os
+import re
+import time
+import itertools
+import threading
 import requests
 import json
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 from decouple import config
+from concurrent.futures import ThreadPoolExecutor
+from .row_mapper import record_converter, map_records
+from .queries import get_query, statement_parameters
+from .single_flight import SingleFlight, statement_key
+
+
+# Connection pool configuration (per worker process)
+POOL_SIZE = config('DATABRICKS_POOL_SIZE', default=10, cast=int)
+HTTP2_ENABLED = config('DATABRICKS_HTTP2', default=False, cast=bool)
+REQUEST_TIMEOUT = 60
+
+# Statement execution: how long the server may hold a submit request before
+# handing back a statement id, and how we poll afterwards
+SUBMIT_WAIT_TIMEOUT = '10s'
+POLL_INITIAL_DELAY = 0.25
+POLL_MAX_DELAY = 5.0
+POLL_BACKOFF = 1.5
+STATEMENT_TERMINAL_STATES = ('SUCCEEDED', 'FAILED', 'CANCELED', 'CLOSED')
+STATEMENT_TIMEOUT = config('DATABRICKS_STATEMENT_TIMEOUT', default=120, cast=int)
+
+# Read statements that identical concurrent callers may share
+COALESCE_READS = config('DATABRICKS_COALESCE_READS', default=True, cast=bool)
+READ_STATEMENT = re.compile(r'^\s*(SELECT|WITH|SHOW|DESCRIBE)\b', re.IGNORECASE)
+statement_flight = SingleFlight()
+
+# Exceptions raised by the transport layer; extended when httpx is in use
+TRANSPORT_ERRORS = (requests.exceptions.RequestException,)
+
+_session = None
+_session_pid = None
+_session_transport = None
+_session_lock = threading.Lock()
+_request_count = 0
+_batch_executor = None
+
+
+def _build_session():
+    """Create the pooled session, preferring HTTP/2 when enabled and available"""
+    global TRANSPORT_ERRORS
+    
+    if HTTP2_ENABLED:
+        try:
+            import httpx
+            session = httpx.Client(
+                http2=True,
+                timeout=REQUEST_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=POOL_SIZE,
+                    max_keepalive_connections=POOL_SIZE
+                )
+            )
+            TRANSPORT_ERRORS = (requests.exceptions.RequestException, httpx.HTTPError)
+            return session, 'httpx/http2'
+        except ImportError:
+            print("WARNING: DATABRICKS_HTTP2 is set but httpx[http2] is not installed, using HTTP/1.1")
+    
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, pool_block=False)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session, 'requests/http1.1'
+
+
+def get_session():
+    """
+    Return the process-wide pooled HTTP session
+    
+    The session is rebuilt after a fork so gunicorn workers never share
+    sockets inherited from the master process.
+    """
+    global _session, _session_pid, _session_transport
+    
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session, _session_transport = _build_session()
+                _session_pid = pid
+    return _session
+
+
+def session_request(method, url, **kwargs):
+    """Send a request through the shared session and count it for pool statistics"""
+    global _request_count
+    
+    session = get_session()
+    with _session_lock:
+        _request_count += 1
+    return session.request(method, url, **kwargs)
+
+
+def get_pool_stats():
+    """
+    Return connection pool statistics for this worker
+    
+    reuse_ratio is the share of requests that were served over an already
+    open connection (only available for the HTTP/1.1 transport).
+    """
+    stats = {
+        'pid': os.getpid(),
+        'transport': _session_transport,
+        'pool_size': POOL_SIZE,
+        'requests': _request_count,
+        'connections_opened': None,
+        'reuse_ratio': None
+    }
+    
+    if _session is None or _session_pid != os.getpid() or not isinstance(_session, requests.Session):
+        return stats
+    
+    connections = 0
+    pooled_requests = 0
+    for adapter in set(_session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            pooled_requests += pool.num_requests
+    
+    stats['connections_opened'] = connections
+    if pooled_requests:
+        stats['reuse_ratio'] = round(1 - connections / pooled_requests, 3)
+    return stats
+
+
+def _get_batch_executor():
+    """Thread pool used to run batched statements, sized to the connection pool"""
+    global _batch_executor
+    
+    if _batch_executor is None:
+        with _session_lock:
+            if _batch_executor is None:
+                _batch_executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix='databricks-batch')
+    return _batch_executor
+
+
+def _require_pyarrow():
+    """Import pyarrow, which is only needed for Arrow/columnar results"""
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc
+    except ImportError:
+        raise Exception("pyarrow is required to read ARROW_STREAM results (pip install pyarrow)")
+    return pa
+
+
+class StatementHandle:
+    """
+    Handle to a statement submitted with DatabricksRestClient.submit_sql
+    
+    Several handles can be outstanding at once, so callers can overlap
+    long-running statements and collect the results afterwards.
+    
+    Example Usage:
+        handles = [client.submit_sql(sql) for sql in statements]
+        results = [handle.result(timeout=600) for handle in handles]
+    """
+    
+    def __init__(self, client, response):
+        self.client = client
+        self.response = response
+        self.statement_id = response.get('statement_id')
+    
+    @property
+    def state(self):
+        return self.response.get('status', {}).get('state')
+    
+    def done(self):
+        """Refresh the statement status once and report whether it has finished"""
+        if self.state not in STATEMENT_TERMINAL_STATES:
+            self.response = self.client.get_statement(self.statement_id)
+        return self.state in STATEMENT_TERMINAL_STATES
+    
+    def result(self, timeout=None):
+        """
+        Wait for the statement to finish and return the final API response
+        
+        Polls with exponential backoff. Raises TimeoutError if the statement
+        is still running after `timeout` seconds (None waits indefinitely).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = POLL_INITIAL_DELAY
+        
+        while not self.done():
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise TimeoutError(f"Databricks statement {self.statement_id} still {self.state} after {timeout}s")
+            time.sleep(delay)
+            delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+        
+        return self.response
+    
+    def cancel(self):
+        """Ask the warehouse to cancel the statement if it is still running"""
+        if self.statement_id and self.state not in STATEMENT_TERMINAL_STATES:
+            self.client.cancel_statement(self.statement_id)
+            self.response = self.client.get_statement(self.statement_id)
+
+
+class BatchItem:
+    """One statement of a StatementBatch; its response is set when the batch runs"""
+    
+    def __init__(self, sql, params):
+        self.sql = sql
+        self.params = params
+        self.response = None
+        self.error = None
+    
+    @property
+    def ok(self):
+        return self.error is None and bool(self.response) and self.response.get('status', {}).get('state') == 'SUCCEEDED'
+    
+    @property
+    def rows(self):
+        """Raw data_array rows of the result"""
+        return ((self.response or {}).get('result') or {}).get('data_array') or []
+    
+    def records(self, coerce=True, keep_raw=()):
+        """Result rows as named records (see row_mapper)"""
+        return map_records(self.response, coerce=coerce, keep_raw=keep_raw)
+
+
+class StatementBatch:
+    """
+    Independent statements executed concurrently, returned together
+    
+    Statements queued with add()/add_named() run in parallel over the
+    shared connection pool when the `with` block exits (or run() is
+    called), so N independent reads cost one round trip of wall time.
+    Dependent work should be expressed as one compound statement (a CTE or
+    MERGE) rather than a sequence of round trips.
+    
+    Example Usage:
+        with client.batch() as batch:
+            teams = batch.add_named('teams_by_league', {'league_id': league_id})
+            league = batch.add_named('league_by_id', {'league_id': league_id})
+        if teams.ok and league.ok:
+            ...
+    """
+    
+    def __init__(self, client):
+        self.client = client
+        self.items = []
+    
+    def add(self, sql, params=None):
+        """Queue a statement and return its BatchItem"""
+        item = BatchItem(sql, params)
+        self.items.append(item)
+        return item
+    
+    def add_named(self, name, params=None):
+        """Queue a registered query template (see queries.QUERIES)"""
+        query = get_query(name)
+        return self.add(query.sql, query.bind(params))
+    
+    def _execute(self, item):
+        try:
+            item.response = self.client.execute_sql(item.sql, params=item.params)
+        except Exception as e:
+            item.error = e
+    
+    def run(self):
+        """Execute all queued statements concurrently and wait for them"""
+        pending = [item for item in self.items if item.response is None and item.error is None]
+        if len(pending) == 1:
+            self._execute(pending[0])
+        elif pending:
+            list(_get_batch_executor().map(self._execute, pending))
+        return self.items
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.run()
+        return False
 
 
 class DatabricksRestClient:
@@ -32,6 +327,7 @@ class DatabricksRestClient:
     
     This class provides methods to execute SQL queries against Databricks
     warehouses and retrieve data for the Fantasy Rugby application.
+    Instances are cheap: all of them share one pooled keep-alive session.
     
     Attributes:
         workspace_url (str): Databricks workspace URL
@@ -53,23 +349,269 @@ class DatabricksRestClient:
             'Content-Type': 'application/json'
         }
     
-    def execute_sql(self, sql):
-        """Execute SQL using Databricks REST API"""
-        url = f"{self.workspace_url}/api/2.0/sql/statements"
+    def _request(self, method, path, payload=None):
+        """Send a request to the SQL statements API and return the decoded JSON"""
+        url = f"{self.workspace_url}/api/2.0/sql/statements{path}"
+        
+        try:
+            if payload is None:
+                response = session_request(method, url, headers=self.headers, timeout=REQUEST_TIMEOUT)
+            else:
+                response = session_request(method, url, headers=self.headers, json=payload, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            return response.json() if response.content else {}
+        except TRANSPORT_ERRORS as e:
+            raise Exception(f"Databricks API request failed: {e}")
+    
+    def submit_sql(self, sql, params=None, wait_timeout='0s', disposition='INLINE', format='JSON_ARRAY'):
+        """
+        Submit SQL without waiting for it to finish
         
+        The server holds the request for at most `wait_timeout` ('0s' or
+        '5s'-'50s'); the returned StatementHandle polls for the outcome.
+        `params` fills `:name` markers in the statement (a dict, or a list
+        already built by queries.statement_parameters). `disposition` and
+        `format` select how results are delivered (INLINE/JSON_ARRAY or
+        EXTERNAL_LINKS/ARROW_STREAM).
+        """
         payload = {
             "warehouse_id": self.warehouse_id,
             "statement": sql,
-            "wait_timeout": "50s"
+            "wait_timeout": wait_timeout,
+            "on_wait_timeout": "CONTINUE",
+            "disposition": disposition,
+            "format": format
         }
+        if params:
+            payload["parameters"] = params if isinstance(params, list) else statement_parameters(params)
+        
+        return StatementHandle(self, self._request('POST', '', payload))
+    
+    def get_statement(self, statement_id):
+        """Get the current status (and result, once finished) of a statement"""
+        return self._request('GET', f"/{statement_id}")
+    
+    def cancel_statement(self, statement_id):
+        """Request cancellation of a running statement"""
+        return self._request('POST', f"/{statement_id}/cancel", {})
+    
+    def execute_sql(self, sql, params=None, timeout=STATEMENT_TIMEOUT, coalesce=True):
+        """
+        Execute SQL using Databricks REST API
+        
+        Submits with a short server-side wait and then polls, so slow
+        statements return their final state instead of PENDING. Statements
+        still running after `timeout` seconds are cancelled.
+        
+        Pass values through `params` (`WHERE id = :league_id`) rather than
+        formatting them into the SQL: identical statement text lets the
+        warehouse reuse cached plans and results, and values are never
+        interpreted as SQL.
+        
+        Pass coalesce=False for a read that must see a write the caller just
+        made (see _coalesce).
+        """
+        return self._coalesce('merged', sql, params, lambda: self._execute_merged(sql, params, timeout), coalesce)
+    
+    def _execute_merged(self, sql, params, timeout):
+        """Run a statement and merge all of its inline chunks into one data_array"""
+        response = self._wait(self.submit_sql(sql, params=params, wait_timeout=SUBMIT_WAIT_TIMEOUT), timeout)
+        
+        # Large inline results arrive in several chunks; gather the rest so
+        # callers always see the complete data_array
+        result = response.get('result')
+        if result and result.get('next_chunk_internal_link'):
+            rows = list(result.get('data_array') or [])
+            for chunk in itertools.islice(self._chain_chunks(result), 1, None):
+                rows.extend(chunk.get('data_array') or [])
+            result['data_array'] = rows
+            result.pop('next_chunk_index', None)
+            result.pop('next_chunk_internal_link', None)
+        
+        return response
+    
+    def _coalesce(self, mode, sql, params, fn, coalesce=True):
+        """
+        Share one execution of fn() between identical concurrent reads
         
+        Waiting callers receive the same response object, so responses must
+        be treated as read-only. Writes always run on their own, and so do
+        reads made with coalesce=False: a shared read may have been sent
+        before the caller's own write landed (e.g. looking up a row that was
+        just inserted) and would return the state before it.
+        """
+        if not coalesce or not COALESCE_READS or not READ_STATEMENT.match(sql):
+            return fn()
+        key = statement_key(self.workspace_url, self.warehouse_id, mode, sql=sql, params=params)
+        return statement_flight.do(key, fn)
+    
+    def _wait(self, handle, timeout):
+        """Wait for a submitted statement, cancelling it if it overruns"""
         try:
-            response = requests.post(url, headers=self.headers, json=payload, timeout=60)
+            return handle.result(timeout=timeout)
+        except TimeoutError as e:
+            handle.cancel()
+            raise Exception(f"Databricks statement timed out: {e}")
+    
+    def _get_internal_link(self, link):
+        """Fetch a result chunk by the internal link the API handed back"""
+        try:
+            response = session_request('GET', f"{self.workspace_url}{link}", headers=self.headers, timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
             return response.json()
-        except requests.exceptions.RequestException as e:
+        except TRANSPORT_ERRORS as e:
             raise Exception(f"Databricks API request failed: {e}")
     
+    def _chain_chunks(self, first):
+        """Yield `first` and every later chunk by following next_chunk_internal_link"""
+        chunk = first
+        while chunk is not None:
+            yield chunk
+            
+            # External link chunks carry their continuation on the last link
+            source = chunk['external_links'][-1] if chunk.get('external_links') else chunk
+            link = source.get('next_chunk_internal_link')
+            chunk = self._get_internal_link(link) if link else None
+    
+    def _download_arrow_chunk(self, external_link):
+        """Download one pre-signed Arrow stream chunk and decode it into a pyarrow Table"""
+        pa = _require_pyarrow()
+        
+        # Pre-signed cloud storage URLs must not receive the Databricks token
+        try:
+            response = session_request('GET', external_link['external_link'], timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+        except TRANSPORT_ERRORS as e:
+            raise Exception(f"Failed to download Databricks result chunk: {e}")
+        return pa.ipc.open_stream(response.content).read_all()
+    
+    def _execute_checked(self, sql, params, disposition, timeout, coalesce=True):
+        """Run a statement to completion and raise unless it succeeded"""
+        return self._coalesce(disposition, sql, params, lambda: self._execute_checked_once(sql, params, disposition, timeout),
+                              coalesce)
+    
+    def _execute_checked_once(self, sql, params, disposition, timeout):
+        if disposition == 'EXTERNAL_LINKS':
+            handle = self.submit_sql(sql, params=params, wait_timeout=SUBMIT_WAIT_TIMEOUT, disposition='EXTERNAL_LINKS', format='ARROW_STREAM')
+        else:
+            handle = self.submit_sql(sql, params=params, wait_timeout=SUBMIT_WAIT_TIMEOUT)
+        response = self._wait(handle, timeout)
+        
+        if handle.state != 'SUCCEEDED':
+            raise Exception(f"Databricks statement {handle.statement_id} {handle.state}: {response.get('status')}")
+        return response
+    
+    def iter_chunks(self, sql, params=None, disposition='INLINE', timeout=STATEMENT_TIMEOUT):
+        """
+        Execute SQL and yield its result chunk by chunk
+        
+        INLINE yields the JSON `data_array` of each chunk. EXTERNAL_LINKS
+        requests ARROW_STREAM results and yields one pyarrow Table per chunk,
+        downloaded only when the consumer asks for it.
+        """
+        response = self._execute_checked(sql, params, disposition, timeout)
+        
+        first = response.get('result')
+        if not first:
+            return
+        
+        for chunk in self._chain_chunks(first):
+            if disposition == 'EXTERNAL_LINKS':
+                for link in chunk.get('external_links') or []:
+                    yield self._download_arrow_chunk(link)
+            else:
+                yield chunk.get('data_array') or []
+    
+    def execute_sql_arrow(self, sql, params=None, timeout=STATEMENT_TIMEOUT):
+        """
+        Execute SQL and return the whole result as a typed pyarrow Table
+        
+        Results are fetched as ARROW_STREAM chunks, so numeric columns keep
+        their warehouse types instead of arriving as JSON strings.
+        """
+        pa = _require_pyarrow()
+        response = self._execute_checked(sql, params, 'EXTERNAL_LINKS', timeout)
+        
+        tables = []
+        if response.get('result'):
+            for chunk in self._chain_chunks(response['result']):
+                for link in chunk.get('external_links') or []:
+                    tables.append(self._download_arrow_chunk(link))
+        
+        if tables:
+            return pa.concat_tables(tables)
+        
+        # Empty results carry no chunks; build the columns from the manifest
+        columns = response.get('manifest', {}).get('schema', {}).get('columns', [])
+        return pa.table({column['name']: [] for column in columns})
+    
+    def execute_sql_numpy(self, sql, params=None, timeout=STATEMENT_TIMEOUT):
+        """
+        Execute SQL and return a dict of column name -> NumPy array
+        
+        Numeric columns become float/int arrays (nulls in numeric columns
+        become NaN); string columns become object arrays.
+        """
+        table = self.execute_sql_arrow(sql, params=params, timeout=timeout)
+        return {
+            name: table.column(name).to_numpy(zero_copy_only=False)
+            for name in table.column_names
+        }
+    
+    def iter_rows(self, sql, params=None, disposition='INLINE', timeout=STATEMENT_TIMEOUT):
+        """
+        Execute SQL and yield result rows one at a time as lists
+        
+        Only one chunk is held in memory at once, so large tables can be
+        read without loading the whole result into a single JSON blob.
+        """
+        for chunk in self.iter_chunks(sql, params=params, disposition=disposition, timeout=timeout):
+            if disposition == 'EXTERNAL_LINKS':
+                columns = [column.to_pylist() for column in chunk.columns]
+                for row in zip(*columns):
+                    yield list(row)
+            else:
+                for row in chunk:
+                    yield row
+    
+    def iter_records(self, sql, params=None, coerce=True, keep_raw=(), timeout=STATEMENT_TIMEOUT, coalesce=True):
+        """
+        Execute SQL and yield each row as a named record
+        
+        Field names and types come from the result manifest, so callers use
+        `record.team_name` instead of positional indexes. See row_mapper.
+        """
+        response = self._execute_checked(sql, params, 'INLINE', timeout, coalesce)
+        
+        first = response.get('result')
+        if not first:
+            return
+        
+        _, convert = record_converter(response['manifest']['schema']['columns'], coerce, keep_raw)
+        for chunk in self._chain_chunks(first):
+            for row in chunk.get('data_array') or []:
+                yield convert(row)
+    
+    def execute_records(self, sql, params=None, coerce=True, keep_raw=(), timeout=STATEMENT_TIMEOUT, coalesce=True):
+        """Execute SQL and return all rows as a list of named records"""
+        return list(self.iter_records(sql, params=params, coerce=coerce, keep_raw=keep_raw, timeout=timeout,
+                                      coalesce=coalesce))
+    
+    def execute_named(self, name, params=None, timeout=STATEMENT_TIMEOUT, coalesce=True):
+        """Execute a registered query template (see queries.QUERIES) with validated parameters"""
+        query = get_query(name)
+        return self.execute_sql(query.sql, params=query.bind(params), timeout=timeout, coalesce=coalesce)
+    
+    def named_records(self, name, params=None, coerce=True, keep_raw=(), timeout=STATEMENT_TIMEOUT, coalesce=True):
+        """Execute a registered query template and return its rows as named records"""
+        query = get_query(name)
+        return self.execute_records(query.sql, params=query.bind(params), coerce=coerce, keep_raw=keep_raw, timeout=timeout,
+                                    coalesce=coalesce)
+    
+    def batch(self):
+        """Start a StatementBatch of independent statements"""
+        return StatementBatch(self)
+    
     def create_user(self, username, email, password_hash, is_active=True):
         """Create a new user in Databricks"""
         # Escape single quotes in values
@@ -85,21 +627,13 @@ class DatabricksRestClient:
         result = self.execute_sql(sql)
         return result
     
-    def get_user_by_email(self, email):
-        """Get user by email"""
-        email_escaped = email.replace("'", "''")
-        sql = f"SELECT * FROM default.auth_users WHERE email = '{email_escaped}'"
-        
-        result = self.execute_sql(sql)
-        return result
+    def get_user_by_email(self, email, coalesce=True):
+        """Get user by email; coalesce=False right after creating the user"""
+        return self.execute_named('user_by_email', {'email': email}, coalesce=coalesce)
     
     def get_user_by_username(self, username):
         """Get user by username"""
-        username_escaped = username.replace("'", "''")
-        sql = f"SELECT * FROM default.auth_users WHERE username = '{username_escaped}'"
-        
-        result = self.execute_sql(sql)
-        return result
+        return self.execute_named('user_by_username', {'username': username})
     
     def update_user(self, user_id, **kwargs):
         """Update user fields"""
@@ -0,0 +1,810 @@
+"""
+Server-authoritative draft engine
+
+Each live draft is held in memory by the worker process as a small state
+machine: the snake order, the pick on the clock and its deadline, a
+picked-player bitset over the player catalog, each team's roster and the
+log of picks so far. Submitting a pick is a constant-time check against
+that state followed by one append to the pick log; clients no longer hold
+the whole player pool in state to work out whose turn it is.
+
+Persistence is append-only:
+- default.drafts: one row per draft with its order and pick clock; the
+  draft_id doubles as a version token for the draft
+- default.draft_picks: one row per pick, appended only if its pick
+  number is not in the log yet
+
+Within a process a draft's warehouse writes (pick appends and the roster
+save) are serialized by its write_lock. Its lock guards the in-memory state
+only and is never held across a warehouse statement, so status reads and
+event streams never wait on the warehouse.
+The append guard (INSERT ... WHERE NOT EXISTS) narrows the race between
+workers but Delta does not make it atomic: two workers appending the same
+pick number at the same moment can both succeed. The first row per pick
+number (earliest picked_at, then lowest player_id) is the pick: a worker
+reads its pick number back after appending and applies that row, its own
+or not, and replays do the same, so workers and rebuilds agree with the
+log. Routing a league's picks to one worker rules the race out.
+
+Any worker (or a restarted one) rebuilds a draft by replaying its picks,
+and catches up with picks made elsewhere by reading only the picks after
+the last one it has seen.
+
+A draft is also a numbered stream of events (status, clock and pick; see
+Draft.event) derived from the pick log alone, so every worker numbers
+them the same way and a client can resume the stream from any of them.
+Subscribers are called after every change (draft_stream pushes them to
+clients).
+
+The pick clock is enforced lazily, and only for drafts the engine is
+driving: once a pick has been submitted to it or a client follows its
+event stream. A pick submission or event stream first makes every pick
+whose deadline has passed; plain status reads never write. Drafts run in
+the browser (started here, completed by posting rosters) are never
+auto-picked, and end_draft stops them when their rosters arrive. When
+the last pick is made the rosters are saved to team_players and the
+league is marked COMPLETED; if that save fails, complete-draft retries it
+(finish_draft) and only reports success once it succeeds.
+
+Saving rosters is one MERGE keyed by (team_id, player_id) and stamped
+with a version token (the draft_id), so a retried save changes nothing.
+Rosters larger than DRAFT_SAVE_CHUNK_ROWS are first staged in
+draft_roster_stage in chunks, keeping each statement bounded in size.
+
+The engine's tables and team_players.draft_id are created by
+`python manage.py create_draft_tables`. Until it has run (schema_ready),
+drafts start as they used to: the league is only marked LIVE and the draft
+is run in the browser.
+
+Configuration:
+- DRAFT_PICK_SECONDS: time each team has to pick (default 90)
+- DRAFT_SYNC_INTERVAL: seconds between pick log catch-ups on reads (default 2)
+- DRAFT_SAVE_CHUNK_ROWS: most roster rows written per statement (default 250)
+- DRAFT_SCHEMA_RECHECK: seconds between checks for the engine's tables while
+  they are missing (default 60)
+"""
+
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+import numpy as np
+from decouple import config
+from .auto_pick import AutoPicker
+from .player_catalog import get_player_catalog
+from .queries import statement_parameters, values_list
+from .result_cache import invalidate
+
+
+PICK_SECONDS = config('DRAFT_PICK_SECONDS', default=90, cast=int)
+SYNC_INTERVAL = config('DRAFT_SYNC_INTERVAL', default=2, cast=float)
+SAVE_CHUNK_ROWS = config('DRAFT_SAVE_CHUNK_ROWS', default=250, cast=int)
+SCHEMA_RECHECK = config('DRAFT_SCHEMA_RECHECK', default=60, cast=float)
+ENGINE_TABLES = {'drafts', 'draft_picks', 'draft_roster_stage'}
+
+# Roster rules, as enforced by the draft page (usePlayerFilters.js): each
+# team drafts ROSTER_SIZE players, filling its starting slots per fantasy
+# position, with BENCH_SLOTS players of any position on top
+ROSTER_SIZE = 15
+STARTING_SLOTS = {
+    'Prop': 1,
+    'Hooker': 1,
+    'Lock': 1,
+    'Back Row': 2,
+    'Scrum-half': 1,
+    'Fly-half': 1,
+    'Centre': 1,
+    'Back Three': 2
+}
+BENCH_SLOTS = ROSTER_SIZE - sum(STARTING_SLOTS.values())
+
+ROSTER_COLUMNS = ['team_id', 'player_id', 'position', 'fantasy_position', 'is_starting']
+ROSTER_TYPES = {'team_id': 'BIGINT', 'player_id': 'BIGINT', 'position': 'STRING',
+                'fantasy_position': 'STRING', 'is_starting': 'BOOLEAN'}
+
+
+class DraftError(Exception):
+    """A draft operation that cannot be carried out, with the HTTP status to report"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _check(result, action):
+    """Raise unless a statement succeeded"""
+    if not result or result.get('status', {}).get('state') != 'SUCCEEDED':
+        raise Exception(f"Failed to {action}: {result.get('status') if result else result}")
+    return result
+
+
+def _timestamp(seconds):
+    """Epoch seconds as a TIMESTAMP parameter value"""
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def _epoch(value):
+    """A TIMESTAMP value from the warehouse as epoch seconds"""
+    if value is None:
+        return time.time()
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00').replace(' ', 'T'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class Draft:
+    """In-memory state of one league's draft"""
+
+    def __init__(self, draft_id, league_id, order, teams, catalog, tournament_id=None,
+                 pick_seconds=PICK_SECONDS, started_at=None):
+        self.draft_id = draft_id
+        self.league_id = league_id
+        self.order = list(order)
+        self.teams = teams
+        self.catalog = catalog
+        self.tournament_id = tournament_id
+        self.pick_seconds = pick_seconds
+        self.started_at = started_at or time.time()
+        self.lock = threading.RLock()
+        # Serializes the draft's warehouse writes; self.lock is never held across one
+        self.write_lock = threading.RLock()
+        self.synced_at = time.time()
+        self._listeners = set()
+
+        # Players of the league's tournament, from a catalog snapshot that
+        # stays fixed for the life of the draft
+        eligible = catalog.select(tournament_id=tournament_id) if tournament_id else np.arange(catalog.size)
+        player_ids = catalog.text['id'][eligible].tolist()
+        self.index_of = dict(zip(player_ids, eligible.tolist()))
+        self.fantasy_positions = catalog.column('fantasy_position')
+        self.picked = np.zeros(catalog.size, dtype=bool)
+        self.auto_picker = AutoPicker(catalog, eligible, len(self.order), STARTING_SLOTS, BENCH_SLOTS)
+
+        self.picks = []
+        self.rosters = {team_id: [] for team_id in self.order}
+        self.position_counts = {team_id: Counter() for team_id in self.order}
+        self.deadline = self.started_at + pick_seconds
+        self.status = 'LIVE'
+        # Whether the engine runs the clock (see the module docstring)
+        self.driven = False
+        # Whether the rosters of the completed draft are in team_players
+        self.saved = False
+
+    @property
+    def total_picks(self):
+        return len(self.order) * ROSTER_SIZE
+
+    @property
+    def pick_number(self):
+        """1-based number of the pick on the clock"""
+        return len(self.picks) + 1
+
+    def team_for_pick(self, pick_number):
+        """Team making a pick under snake order: rounds alternate direction"""
+        round_index, position = divmod(pick_number - 1, len(self.order))
+        if round_index % 2 == 1:
+            position = len(self.order) - 1 - position
+        return self.order[position]
+
+    @property
+    def team_on_clock(self):
+        return self.team_for_pick(self.pick_number) if self.status == 'LIVE' else None
+
+    def fits_roster(self, team_id, fantasy_position):
+        """Whether a player of this fantasy position still fits the team's roster"""
+        counts = self.position_counts[team_id]
+        if counts[fantasy_position] < STARTING_SLOTS.get(fantasy_position, 0):
+            return True
+        starters = sum(min(counts[position], slots) for position, slots in STARTING_SLOTS.items())
+        return len(self.rosters[team_id]) - starters < BENCH_SLOTS
+
+    def validate(self, team_id, player_id):
+        """
+        Catalog index of player_id if team_id may pick them now
+
+        Raises DraftError otherwise.
+        """
+        if self.status != 'LIVE':
+            raise DraftError(f'Draft is {self.status.lower()}', 409)
+        if team_id != self.team_on_clock:
+            raise DraftError(f'It is not team {team_id}\'s turn (team {self.team_on_clock} is on the clock)', 409)
+        index = self.index_of.get(str(player_id))
+        if index is None:
+            raise DraftError(f'Player {player_id} is not in this draft', 404)
+        if self.picked[index]:
+            raise DraftError(f'Player {player_id} has already been drafted', 409)
+        if not self.fits_roster(team_id, self.fantasy_positions[index]):
+            raise DraftError(f'Team {team_id} has no roster slot left for a {self.fantasy_positions[index]}')
+        return index
+
+    def apply(self, team_id, player_id, is_auto=False, picked_at=None):
+        """Record a pick that has been validated (or replayed from the log)"""
+        index = self.index_of[str(player_id)]
+        picked_at = picked_at or time.time()
+        self.picked[index] = True
+        self.rosters[team_id].append(index)
+        self.position_counts[team_id][self.fantasy_positions[index]] += 1
+        self.picks.append({
+            'pick_number': len(self.picks) + 1,
+            'round': len(self.picks) // len(self.order) + 1,
+            'team_id': team_id,
+            'player_id': str(player_id),
+            'is_auto': is_auto,
+            'picked_at': picked_at
+        })
+        self.deadline = picked_at + self.pick_seconds
+        if len(self.picks) >= self.total_picks:
+            self.status = 'COMPLETED'
+        self._notify()
+
+    def subscribe(self, callback):
+        """Have callback() called after every pick; it must not block"""
+        with self.lock:
+            self._listeners.add(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            self._listeners.discard(callback)
+
+    def _notify(self):
+        for callback in list(self._listeners):
+            callback()
+
+    @property
+    def last_event_id(self):
+        """Sequence number of the latest event: two per pick after the opening two"""
+        return 2 * len(self.picks) + 2
+
+    def event(self, sequence):
+        """
+        (type, data) of the event with this sequence number
+
+        1 is the opening 'status' event. After n picks, 2n + 1 is the 'pick'
+        event of pick n and 2n + 2 the 'clock' event of the next pick, or
+        the closing 'status' event once the last pick is made.
+        """
+        if sequence == 1:
+            return 'status', {
+                'draft_id': self.draft_id,
+                'status': 'LIVE',
+                'order': self.order,
+                'teams': self.teams,
+                'total_picks': self.total_picks,
+                'pick_seconds': self.pick_seconds
+            }
+        if sequence % 2:
+            return 'pick', self.picks[sequence // 2 - 1]
+        made = sequence // 2 - 1
+        if made >= self.total_picks or (self.status != 'LIVE' and sequence == self.last_event_id):
+            return 'status', {'draft_id': self.draft_id, 'status': self.status}
+        pick_number = made + 1
+        deadline = (self.picks[made - 1]['picked_at'] if made else self.started_at) + self.pick_seconds
+        return 'clock', {
+            'pick_number': pick_number,
+            'round': made // len(self.order) + 1,
+            'team_id': self.team_for_pick(pick_number),
+            'deadline': deadline,
+            'seconds_remaining': max(0, round(deadline - time.time(), 1))
+        }
+
+    def event_id(self, sequence):
+        """Id of an event as sent to clients: the draft id and the sequence number"""
+        return f'{self.draft_id}:{sequence}'
+
+    def resume_after(self, event_id):
+        """
+        Sequence number to resume after for the last event id a client saw
+
+        Ids of another draft (or none at all) replay the stream from the start.
+        """
+        draft_id, _, sequence = str(event_id or '').partition(':')
+        if draft_id != self.draft_id or not sequence.isdigit():
+            return 0
+        return int(sequence)
+
+    def events_after(self, sequence):
+        """[(sequence, type, data)] of the events after a sequence number"""
+        return [(n,) + self.event(n) for n in range(max(sequence, 0) + 1, self.last_event_id + 1)]
+
+    def auto_pick(self, team_id):
+        """Player id auto-picked for team_id, weighing value against the team's roster needs"""
+        index = self.auto_picker.pick(self.position_counts[team_id], len(self.rosters[team_id]), self.picked)
+        return self.catalog.text['id'][index] if index is not None else None
+
+    def roster_rows(self):
+        """Rosters in complete_draft's team_rosters form, starters marked"""
+        positions = self.catalog.column('position')
+        team_rosters = []
+        for team_id in self.order:
+            filled = Counter()
+            players = []
+            for index in self.rosters[team_id]:
+                fantasy_position = self.fantasy_positions[index]
+                filled[fantasy_position] += 1
+                players.append({
+                    'id': self.catalog.text['id'][index],
+                    'position': positions[index] or '',
+                    'fantasy_position': fantasy_position or '',
+                    'is_starting': filled[fantasy_position] <= STARTING_SLOTS.get(fantasy_position, 0)
+                })
+            team_rosters.append({'team_id': team_id, 'players': players})
+        return team_rosters
+
+    def snapshot(self, after=0):
+        """Draft state for API responses; picks are limited to those after `after`"""
+        now = time.time()
+        on_clock = self.team_on_clock
+        return {
+            'draft_id': self.draft_id,
+            'league_id': self.league_id,
+            'status': self.status,
+            'order': self.order,
+            'teams': self.teams,
+            'pick_number': self.pick_number if self.status == 'LIVE' else None,
+            'round': (self.pick_number - 1) // len(self.order) + 1 if self.status == 'LIVE' else None,
+            'total_picks': self.total_picks,
+            'team_on_clock': on_clock,
+            'deadline': self.deadline if on_clock else None,
+            'seconds_remaining': max(0, round(self.deadline - now, 1)) if on_clock else None,
+            'last_event_id': self.event_id(self.last_event_id),
+            'picks': self.picks[after:]
+        }
+
+
+_drafts = {}
+_drafts_lock = threading.Lock()
+
+
+_schema = {'ready': False, 'checked_at': None}
+
+
+def schema_ready(client):
+    """
+    Whether the warehouse has the draft engine's tables and team_players.draft_id
+
+    Once found they are not checked again. While missing they are checked
+    at most every DRAFT_SCHEMA_RECHECK seconds, so running
+    create_draft_tables takes effect without a restart.
+    """
+    if _schema['ready']:
+        return True
+    now = time.time()
+    if _schema['checked_at'] is not None and now - _schema['checked_at'] < SCHEMA_RECHECK:
+        return False
+    tables = _check(client.execute_named('draft_engine_tables'), 'list draft tables')
+    columns = _check(client.execute_named('team_players_columns'), 'list team_players columns')
+    # SHOW TABLES rows are (database, tableName, isTemporary); SHOW COLUMNS rows are (col_name)
+    table_names = {row[1] for row in (tables.get('result') or {}).get('data_array') or []}
+    column_names = {row[0] for row in (columns.get('result') or {}).get('data_array') or []}
+    ready = ENGINE_TABLES <= table_names and 'draft_id' in column_names
+    _schema.update(ready=ready, checked_at=now)
+    if not ready:
+        print("WARNING: Draft engine tables are missing; drafts run in the browser until "
+              "`python manage.py create_draft_tables` has run")
+    return ready
+
+
+def _load_teams(client, league_id):
+    """{team_id: {'team_name', 'owner_user_id'}} for the league's teams, in id order"""
+    records = client.named_records('team_ids_by_league', {'league_id': league_id})
+    return {
+        record.id: {'team_name': record.team_name, 'owner_user_id': record.team_owner_user_id}
+        for record in records
+    }
+
+
+def _league_tournament(client, league_id):
+    rows = client.named_records('league_by_id', {'league_id': league_id}, keep_raw=('tournament_id',))
+    if not rows:
+        raise DraftError(f'League {league_id} not found', 404)
+    return getattr(rows[0], 'tournament_id', None)
+
+
+def _new_draft(client, draft_id, league_id, order, pick_seconds, started_at):
+    teams = _load_teams(client, league_id)
+    unknown = [team_id for team_id in order if team_id not in teams]
+    if unknown:
+        raise DraftError(f'Teams {unknown} are not in league {league_id}')
+    catalog = get_player_catalog(client)
+    return Draft(draft_id, league_id, order, teams, catalog, _league_tournament(client, league_id),
+                 pick_seconds=pick_seconds, started_at=started_at)
+
+
+def _apply_logged(draft, rows):
+    """Apply draft_picks_after rows that follow the draft's last pick"""
+    for row in rows:
+        # Skips later rows of a pick number that was appended twice
+        if row.pick_number == len(draft.picks) + 1:
+            draft.apply(row.team_id, row.player_id, is_auto=bool(row.is_auto), picked_at=_epoch(row.picked_at))
+
+
+def _sync(client, draft):
+    """Apply picks other workers have logged since the last one this draft has seen"""
+    rows = client.named_records('draft_picks_after', {'draft_id': draft.draft_id, 'after': len(draft.picks)},
+                                keep_raw=('player_id',))
+    with draft.lock:
+        _apply_logged(draft, rows)
+        draft.synced_at = time.time()
+    return len(rows)
+
+
+def _load_draft(client, league_id):
+    """Rebuild a league's latest draft from its log, or None if it never had one"""
+    if not schema_ready(client):
+        return None
+    rows = client.named_records('latest_draft_by_league', {'league_id': league_id}, keep_raw=('draft_id',))
+    if not rows:
+        return None
+    row = rows[0]
+    order = [int(team_id) for team_id in row.draft_order.split(',') if team_id]
+    draft = _new_draft(client, row.draft_id, league_id, order, row.pick_seconds, _epoch(row.started_at))
+    _sync(client, draft)
+    # Only the engine writes the pick log
+    draft.driven = bool(draft.picks)
+    return draft
+
+
+def get_draft(client, league_id, load=True, sync=True, clock=True):
+    """
+    The league's draft, or None
+
+    Drafts not yet held by this process are rebuilt from the pick log
+    (unless load is False). Held drafts catch up with picks made by other
+    workers at most every DRAFT_SYNC_INTERVAL seconds. With clock, overdue
+    picks of a draft the engine is driving are made first; read-only
+    callers pass clock=False.
+    """
+    league_id = int(league_id)
+    draft = _drafts.get(league_id)
+    if draft is None:
+        if not load:
+            return None
+        draft = _load_draft(client, league_id)
+        if draft is None:
+            return None
+        with _drafts_lock:
+            draft = _drafts.setdefault(league_id, draft)
+    with draft.lock:
+        due = sync and draft.status == 'LIVE' and time.time() - draft.synced_at >= SYNC_INTERVAL
+        driven = draft.driven
+    if due:
+        _sync(client, draft)
+    if clock and driven:
+        run_clock(client, draft)
+    return draft
+
+
+def end_draft(league_id, status='COMPLETED'):
+    """
+    Stop the engine's draft of a league that was finished elsewhere
+
+    Used when the browser posts its rosters or the league's stored status
+    is no longer LIVE: the draft stays in memory with that status (so it
+    is not rebuilt from the log), its clock stops and open event streams
+    get a closing status event.
+    """
+    draft = _drafts.get(int(league_id))
+    if draft is None:
+        return None
+    with draft.lock:
+        if draft.status == 'LIVE':
+            draft.status = status
+            draft.driven = False
+            # Its rosters were saved by whoever finished it, never from this draft
+            draft.saved = True
+            draft._notify()
+    return draft
+
+
+def start_draft(client, league_id, order=None, pick_seconds=PICK_SECONDS):
+    """
+    Start the league's draft, or return the one already running
+
+    order is the draft order as team ids (default: teams by id). Returns
+    None if the engine's tables are missing: the league is then only marked
+    LIVE and the browser runs the draft, as before the engine.
+    """
+    league_id = int(league_id)
+    if not schema_ready(client):
+        _check(client.execute_named('set_draft_status', {'draft_status': 'LIVE', 'league_id': league_id}), 'start draft')
+        invalidate(['leagues', f'league:{league_id}'])
+        return None
+    existing = get_draft(client, league_id)
+    if existing is not None and existing.status == 'LIVE':
+        return existing
+
+    teams = _load_teams(client, league_id)
+    if not teams:
+        raise DraftError(f'League {league_id} has no teams to draft')
+    order = [int(team_id) for team_id in order] if order else list(teams)
+    if sorted(order) != sorted(teams):
+        raise DraftError('Draft order must list every team in the league exactly once')
+
+    draft_id = uuid.uuid4().hex
+    started_at = time.time()
+    result = client.execute_named('create_draft', {
+        'draft_id': draft_id,
+        'league_id': league_id,
+        'draft_order': ','.join(str(team_id) for team_id in order),
+        'pick_seconds': pick_seconds,
+        'started_at': _timestamp(started_at)
+    })
+    _check(result, 'create draft')
+    _check(client.execute_named('set_draft_status', {'draft_status': 'LIVE', 'league_id': league_id}), 'start draft')
+    invalidate(['leagues', f'league:{league_id}'])
+
+    draft = _new_draft(client, draft_id, league_id, order, pick_seconds, started_at)
+    with _drafts_lock:
+        _drafts[league_id] = draft
+    print(f"DEBUG: Draft {draft_id} started for league {league_id} with {len(order)} teams")
+    return draft
+
+
+def _record_pick(client, draft, pick_number, team_id, player_id, is_auto, picked_at=None):
+    """
+    Append a validated pick to the log and apply the pick the log kept for its number
+
+    Returns the applied pick if it is this one, or None if another worker's
+    pick holds the number. The append's guard is not atomic, so its insert
+    count cannot tell: the pick number is read back (never from a shared
+    in-flight read) and its first row wins, as on every replay. Callers
+    hold draft.write_lock.
+    """
+    picked_at = picked_at or time.time()
+    result = client.execute_named('record_draft_pick', {
+        'draft_id': draft.draft_id,
+        'league_id': draft.league_id,
+        'pick_number': pick_number,
+        'team_id': team_id,
+        'player_id': player_id,
+        'is_auto': is_auto,
+        'picked_at': _timestamp(picked_at)
+    })
+    _check(result, 'record pick')
+    rows = client.named_records('draft_picks_after', {'draft_id': draft.draft_id, 'after': pick_number - 1},
+                                keep_raw=('player_id',), coalesce=False)
+    with draft.lock:
+        _apply_logged(draft, rows)
+        if len(draft.picks) < pick_number:
+            raise Exception(f"Failed to record pick: pick {pick_number} of draft {draft.draft_id} is not in the log")
+        pick = draft.picks[pick_number - 1]
+        unsaved = draft.status == 'COMPLETED' and not draft.saved
+    if unsaved:
+        _finish(client, draft)
+    if pick['team_id'] != team_id or pick['player_id'] != str(player_id):
+        return None
+    return pick
+
+
+def submit_pick(client, league_id, team_id, player_id):
+    """
+    Make a pick for the team on the clock; returns the draft and the pick
+
+    Raises DraftError if there is no live draft or the pick is not allowed.
+    """
+    draft = get_draft(client, league_id)
+    if draft is None:
+        raise DraftError(f'League {league_id} has no draft', 404)
+    team_id = int(team_id)
+    with draft.write_lock:
+        with draft.lock:
+            take_clock = draft.status == 'LIVE' and not draft.driven
+            draft.driven = draft.driven or take_clock
+        if take_clock:
+            run_clock(client, draft)
+        with draft.lock:
+            draft.validate(team_id, player_id)
+            pick_number = draft.pick_number
+        pick = _record_pick(client, draft, pick_number, team_id, player_id, is_auto=False)
+    if pick is None:
+        # Another worker's pick holds this pick number in the log
+        raise DraftError(f'Pick {pick_number} was made concurrently by another request', 409)
+    return draft, pick
+
+
+def run_clock(client, draft, now=None):
+    """
+    Auto-pick for every team whose time ran out; returns the number of picks made
+
+    Each auto-pick is stamped with the deadline it was made for, so after a
+    quiet spell every overdue pick is made at once and the clock of the
+    team now on it is where it would have been. Returns at once if another
+    request is writing to the draft: it, or the next read, runs the clock.
+    """
+    if not draft.write_lock.acquire(blocking=False):
+        return 0
+    made = 0
+    try:
+        while True:
+            with draft.lock:
+                if draft.status != 'LIVE' or (now or time.time()) < draft.deadline:
+                    break
+                team_id = draft.team_on_clock
+                player_id = draft.auto_pick(team_id)
+                pick_number, deadline = draft.pick_number, draft.deadline
+            if player_id is None:
+                raise DraftError(f'No eligible player left for team {team_id}', 409)
+            # A pick another worker made for the same number is applied instead
+            if _record_pick(client, draft, pick_number, team_id, player_id, is_auto=True, picked_at=deadline) is not None:
+                made += 1
+    finally:
+        draft.write_lock.release()
+    return made
+
+
+def _roster_rows(team_rosters):
+    """team_rosters as one row per (team_id, player_id), the last entry winning"""
+    rows = {}
+    for team_roster in team_rosters:
+        team_id = team_roster.get('team_id')
+        if not team_id:
+            continue
+        for player in team_roster.get('players', []):
+            player_id = player.get('id')
+            if not player_id:
+                continue
+            rows[int(team_id), int(player_id)] = {
+                'team_id': int(team_id),
+                'player_id': int(player_id),
+                'position': player.get('position') or '',
+                'fantasy_position': player.get('fantasy_position') or '',
+                'is_starting': bool(player.get('is_starting', False))
+            }
+    return list(rows.values())
+
+
+def roster_version(league_id, rows):
+    """Version token of rosters saved without an engine draft: equal rosters share it"""
+    content = json.dumps([league_id] + sorted([row[column] for column in ROSTER_COLUMNS] for row in rows))
+    return 'rosters-' + hashlib.sha256(content.encode()).hexdigest()[:32]
+
+
+def _stage_rows(client, draft_id, league_id, rows):
+    """Upsert roster rows into draft_roster_stage, SAVE_CHUNK_ROWS per statement"""
+    for start in range(0, len(rows), SAVE_CHUNK_ROWS):
+        values_sql, params = values_list(rows[start:start + SAVE_CHUNK_ROWS], ROSTER_COLUMNS, ROSTER_TYPES, prefix='r')
+        stage_sql = f"""
+        MERGE INTO default.draft_roster_stage AS t
+        USING (
+            SELECT * FROM VALUES {values_sql}
+            AS v({', '.join(ROSTER_COLUMNS)})
+        ) AS s
+        ON t.draft_id = :draft_id AND t.team_id = s.team_id AND t.player_id = s.player_id
+        WHEN MATCHED THEN UPDATE SET
+            t.position = s.position,
+            t.fantasy_position = s.fantasy_position,
+            t.is_starting = s.is_starting
+        WHEN NOT MATCHED THEN INSERT
+            (draft_id, league_id, team_id, player_id, position, fantasy_position, is_starting)
+            VALUES (:draft_id, :league_id, s.team_id, s.player_id, s.position, s.fantasy_position, s.is_starting)
+        """
+        params += statement_parameters({'draft_id': draft_id, 'league_id': league_id}, {'draft_id': 'STRING', 'league_id': 'BIGINT'})
+        _check(client.execute_sql(stage_sql, params=params), 'stage team rosters')
+
+
+def save_rosters(client, league_id, team_rosters, draft_id=None, team_ids=None):
+    """
+    Make the league's team_players exactly the given rosters; safe to retry
+
+    team_rosters is a list of {'team_id', 'players': [{'id', 'position',
+    'fantasy_position', 'is_starting'}]}. One MERGE keyed by (team_id,
+    player_id) inserts new players, updates moved ones and deletes players
+    of the league's teams (team_ids, loaded when omitted) that are not in
+    the rosters. Rows are stamped with draft_id (for posted rosters, a
+    token derived from their content), so rerunning a save that already
+    landed matches every row and changes nothing. Returns the number of
+    players in the rosters.
+
+    Until create_draft_tables has added team_players.draft_id, the teams'
+    rosters are replaced by a DELETE and an INSERT instead, as before.
+    """
+    league_id = int(league_id)
+    rows = _roster_rows(team_rosters)
+    if not rows:
+        raise DraftError('Team rosters have no players to save')
+    draft_id = draft_id or roster_version(league_id, rows)
+    if team_ids is None:
+        team_ids = list(_load_teams(client, league_id))
+    team_ids = sorted({int(team_id) for team_id in team_ids} | {row['team_id'] for row in rows})
+
+    if schema_ready(client):
+        _merge_rosters(client, league_id, draft_id, rows, team_ids)
+    else:
+        _replace_rosters(client, rows, team_ids)
+
+    _check(client.execute_named('set_draft_status', {'draft_status': 'COMPLETED', 'league_id': league_id}),
+           'update draft status')
+
+    # Rosters of every drafted team and the league's draft status changed
+    invalidate(['leagues', f'league:{league_id}'] + [f'team:{team_id}' for team_id in team_ids])
+    return len(rows)
+
+
+def _merge_rosters(client, league_id, draft_id, rows, team_ids):
+    """The MERGE of save_rosters, staging rows first when there are many"""
+    if len(rows) <= SAVE_CHUNK_ROWS:
+        values_sql, params = values_list(rows, ROSTER_COLUMNS, ROSTER_TYPES, prefix='r')
+        source_sql = f"SELECT * FROM VALUES {values_sql} AS v({', '.join(ROSTER_COLUMNS)})"
+        staged = False
+    else:
+        # Too many rows for one statement: stage them in chunks and merge from the stage
+        _stage_rows(client, draft_id, league_id, rows)
+        source_sql = f"""
+            SELECT {', '.join(ROSTER_COLUMNS)} FROM default.draft_roster_stage WHERE draft_id = :draft_id
+        """
+        params = []
+        staged = True
+
+    team_markers = ', '.join(f':league_team_{index}' for index in range(len(team_ids)))
+    merge_sql = f"""
+    MERGE INTO default.team_players AS t
+    USING ({source_sql}) AS s
+    ON t.team_id = s.team_id AND t.player_id = s.player_id
+    WHEN MATCHED AND (t.draft_id IS NULL OR t.draft_id <> :draft_id) THEN UPDATE SET
+        t.position = s.position,
+        t.fantasy_position = s.fantasy_position,
+        t.is_starting = s.is_starting,
+        t.draft_id = :draft_id
+    WHEN NOT MATCHED THEN INSERT
+        (team_id, player_id, position, fantasy_position, is_starting, draft_id)
+        VALUES (s.team_id, s.player_id, s.position, s.fantasy_position, s.is_starting, :draft_id)
+    WHEN NOT MATCHED BY SOURCE AND t.team_id IN ({team_markers})
+        AND (t.draft_id IS NULL OR t.draft_id <> :draft_id) THEN DELETE
+    """
+    params += statement_parameters(
+        dict({'draft_id': draft_id}, **{f'league_team_{index}': team_id for index, team_id in enumerate(team_ids)}),
+        dict({'draft_id': 'STRING'}, **{f'league_team_{index}': 'BIGINT' for index in range(len(team_ids))})
+    )
+    _check(client.execute_sql(merge_sql, params=params), 'save team rosters')
+
+    if staged:
+        # Leftover stage rows only cost space; a failed cleanup is not an error
+        cleared = client.execute_named('clear_draft_roster_stage', {'draft_id': draft_id})
+        if not cleared or cleared.get('status', {}).get('state') != 'SUCCEEDED':
+            print(f"WARNING: Could not clear staged rosters of {draft_id}: {cleared}")
+
+
+def _replace_rosters(client, rows, team_ids):
+    """Save rosters without version tokens: delete the teams' players, then insert the rosters"""
+    team_markers = ', '.join(f':league_team_{index}' for index in range(len(team_ids)))
+    params = statement_parameters({f'league_team_{index}': team_id for index, team_id in enumerate(team_ids)},
+                                  {f'league_team_{index}': 'BIGINT' for index in range(len(team_ids))})
+    _check(client.execute_sql(f"DELETE FROM default.team_players WHERE team_id IN ({team_markers})", params=params),
+           'clear team rosters')
+    values_sql, params = values_list(rows, ROSTER_COLUMNS, ROSTER_TYPES, prefix='r')
+    insert_sql = f"INSERT INTO default.team_players ({', '.join(ROSTER_COLUMNS)}) VALUES {values_sql}"
+    _check(client.execute_sql(insert_sql, params=params), 'save team rosters')
+
+
+def finish_draft(client, draft):
+    """
+    Save the rosters of a completed draft unless they already are; returns
+    the number of players drafted
+
+    Raises DraftError if the draft is still in progress.
+    """
+    with draft.lock:
+        if draft.status != 'COMPLETED':
+            raise DraftError(f'Draft is still in progress ({len(draft.picks)} of {draft.total_picks} picks made)', 409)
+    with draft.write_lock:
+        if not draft.saved:
+            with draft.lock:
+                team_rosters = draft.roster_rows()
+            save_rosters(client, draft.league_id, team_rosters, draft_id=draft.draft_id, team_ids=draft.order)
+            draft.saved = True
+    return len(draft.picks)
+
+
+def _finish(client, draft):
+    """Save the rosters of a draft whose last pick was just made"""
+    try:
+        players = finish_draft(client, draft)
+    except Exception as e:
+        # The last pick is logged either way; complete-draft retries the save
+        print(f"ERROR: Saving the rosters of draft {draft.draft_id} for league {draft.league_id} failed: {str(e)}")
+        return
+    print(f"DEBUG: Draft {draft.draft_id} for league {draft.league_id} completed; saved {players} players")
@@ -0,0 +1,168 @@
+"""
+Server-Sent Events push channel for live drafts
+
+Clients on the draft page open one EventSource per league instead of
+polling draft-status. Each pick is fanned out to every open stream of the
+draft the moment it is applied (draft subscribers are woken, not polled),
+as three kinds of events:
+
+- status: the draft went LIVE (order, teams, pick clock) or COMPLETED
+- pick: a pick was made (by a team or by the clock)
+- clock: the next pick is on the clock, with its team and deadline
+
+Every event carries an id of the form <draft_id>:<sequence>. Browsers
+send the last one back in Last-Event-ID when they reconnect and the
+stream resumes right after it; sequence numbers come from the pick log
+(Draft.event), so a client can reconnect to any worker. Following a
+draft's stream hands its clock to the engine (Draft.driven): a stream
+wakes at the deadline and the overdue auto-pick is made and pushed.
+
+Streams need ASGI (rugby_fantasy.asgi, served by uvicorn workers): they
+wait on the event loop, only borrow a thread to read the draft, end when
+the draft completes or after DRAFT_STREAM_MAX_AGE seconds, and the browser
+reconnects on its own. Under WSGI an open stream would hold a worker for
+its whole life, so there the response only carries the events the client
+has not seen yet and closes; EventSource reconnects after the retry delay
+with its Last-Event-ID, which turns the stream into polling.
+
+Configuration:
+- DRAFT_STREAM_HEARTBEAT: seconds between keep-alive comments (default 15)
+- DRAFT_STREAM_MAX_AGE: seconds before a stream is closed for the client
+  to reconnect (default 300)
+- DRAFT_STREAM_RETRY_MS: reconnect delay sent to clients, and so the
+  polling interval under WSGI (default 2000)
+"""
+
+import asyncio
+import time
+from asgiref.sync import sync_to_async
+from decouple import config
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from . import draft_engine
+from .renderers import ORJSONRenderer
+
+
+HEARTBEAT = config('DRAFT_STREAM_HEARTBEAT', default=15, cast=float)
+MAX_AGE = config('DRAFT_STREAM_MAX_AGE', default=300, cast=float)
+RETRY_MS = config('DRAFT_STREAM_RETRY_MS', default=2000, cast=int)
+
+_renderer = ORJSONRenderer()
+
+
+def format_event(event_type, data, event_id=None):
+    """One SSE message as bytes"""
+    lines = [f'id: {event_id}'.encode()] if event_id is not None else []
+    lines.append(f'event: {event_type}'.encode())
+    lines.append(b'data: ' + _renderer.render(data))
+    return b'\n'.join(lines) + b'\n\n'
+
+
+def _retry(milliseconds=RETRY_MS):
+    return f'retry: {milliseconds}\n\n'.encode()
+
+
+class DraftEventCursor:
+    """A client's position in a draft's event stream"""
+
+    def __init__(self, client, draft, last_event_id=None):
+        self.client = client
+        self.draft = draft
+        self.sequence = draft.resume_after(last_event_id)
+        self.opened = self.sent = time.time()
+        with draft.lock:
+            if draft.status == 'LIVE':
+                draft.driven = True
+
+    def poll(self):
+        """
+        (chunks to send now, seconds to wait before polling again)
+
+        Brings the draft up to date first (picks from other workers and
+        overdue auto-picks). The wait is None once the stream should end.
+        """
+        draft = self.draft
+        try:
+            draft_engine.get_draft(self.client, draft.league_id)
+        except draft_engine.DraftError as e:
+            return [format_event('error', {'error': str(e)})], None
+
+        with draft.lock:
+            events = draft.events_after(self.sequence)
+            chunks = [format_event(event_type, data, draft.event_id(sequence))
+                      for sequence, event_type, data in events]
+            finished = draft.status != 'LIVE'
+            deadline = draft.deadline
+        if events:
+            self.sequence = events[-1][0]
+
+        now = time.time()
+        if chunks:
+            self.sent = now
+        elif now - self.sent >= HEARTBEAT:
+            chunks.append(b': keep-alive\n\n')
+            self.sent = now
+        if finished or now - self.opened >= MAX_AGE:
+            return chunks, None
+        # Wake for the clock, for picks made by other workers and for the heartbeat
+        return chunks, max(0.0, min(deadline - now, draft_engine.SYNC_INTERVAL, HEARTBEAT))
+
+
+def poll_events(cursor):
+    """SSE chunks of the events a cursor has not seen yet, then the end of the response (WSGI)"""
+    chunks, _ = cursor.poll()
+    return [_retry()] + chunks
+
+
+async def astream_events(cursor):
+    """SSE chunks for a cursor, waiting on the event loop between events (ASGI)"""
+    loop = asyncio.get_running_loop()
+    woken = asyncio.Event()
+
+    def wake():
+        loop.call_soon_threadsafe(woken.set)
+
+    cursor.draft.subscribe(wake)
+    try:
+        yield _retry()
+        while True:
+            chunks, wait = await sync_to_async(cursor.poll, thread_sensitive=False)()
+            for chunk in chunks:
+                yield chunk
+            if wait is None:
+                return
+            try:
+                await asyncio.wait_for(woken.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+            woken.clear()
+    finally:
+        cursor.draft.unsubscribe(wake)
+
+
+def _stream_response(content):
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def event_stream_response(request, client, draft, last_event_id=None):
+    """StreamingHttpResponse pushing a draft's events after last_event_id"""
+    cursor = DraftEventCursor(client, draft, last_event_id)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        return _stream_response(astream_events(cursor))
+    # Never hold a WSGI worker: answer with what is pending and let the client poll
+    return _stream_response(poll_events(cursor))
+
+
+def status_stream_response(draft_status, retry_ms=None):
+    """
+    A stream that only reports a league's draft status and closes
+
+    For leagues with no live draft to follow: the client checks back after
+    retry_ms (default: the heartbeat interval).
+    """
+    retry_ms = retry_ms if retry_ms is not None else int(HEARTBEAT * 1000)
+    return _stream_response([_retry(retry_ms), format_event('status', draft_status)])
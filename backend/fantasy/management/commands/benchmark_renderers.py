@@ -0,0 +1,165 @@
+"""
+Benchmark response encodings on the API's largest payloads
+
+Compares the stock DRF JSON encoder, orjson and MessagePack on
+rugby_players, league_fixtures and chat_messages responses: median encode
+time, body size and gzip size.
+
+    python manage.py benchmark_renderers
+    python manage.py benchmark_renderers --league-id 12 --iterations 200
+
+Without --league-id the payloads are synthetic but shaped like the real
+responses (sizes set by --players, --fixtures and --messages); with it they
+are read from Databricks.
+"""
+
+import gzip
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from fantasy.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+
+
+POSITIONS = [
+    ('Prop', 'Prop'), ('Hooker', 'Hooker'), ('Lock', 'Lock'), ('Flanker', 'Back Row'),
+    ('Number 8', 'Back Row'), ('Scrum-half', 'Scrum-half'), ('Fly-half', 'Fly-half'),
+    ('Centre', 'Centre'), ('Wing', 'Back Three'), ('Fullback', 'Back Three')
+]
+TEAMS = ['Bath', 'Bristol', 'Exeter', 'Gloucester', 'Harlequins', 'Leicester', 'Newcastle',
+         'Northampton', 'Sale', 'Saracens']
+
+
+def synthetic_players(count, rng):
+    players = []
+    for i in range(count):
+        position, fantasy_position = rng.choice(POSITIONS)
+        matches = rng.randint(0, 18)
+        players.append({
+            'id': str(100000 + i),
+            'team': rng.choice(TEAMS),
+            'name': f"Player {i}",
+            'position': position,
+            'fantasy_position': fantasy_position,
+            'tournament_id': '1',
+            'fantasy_points_per_game': round(rng.uniform(0, 30), 1),
+            'fantasy_points_per_minute': round(rng.uniform(0, 0.5), 2),
+            'total_fantasy_points': round(rng.uniform(0, 400), 1),
+            'matches_played': matches,
+            'total_tries': float(rng.randint(0, 10)),
+            'total_tackles_made': float(rng.randint(0, 200)),
+            'total_metres_carried': float(rng.randint(0, 1500)),
+            'avg_tries_per_match': round(rng.uniform(0, 1), 2),
+            'avg_tackles_per_match': round(rng.uniform(0, 15), 2)
+        })
+    return players
+
+
+def synthetic_fixtures(count, rng):
+    return [{
+        'id': str(i),
+        'week_number': str(i // 4 + 1),
+        'week_date': '2025-10-04',
+        'home_team_id': str(rng.randint(1, 8)),
+        'away_team_id': str(rng.randint(1, 8)),
+        'home_team_name': f"Team {rng.randint(1, 8)}",
+        'away_team_name': f"Team {rng.randint(1, 8)}",
+        'home_team_points': round(rng.uniform(0, 300), 1),
+        'away_team_points': round(rng.uniform(0, 300), 1),
+        'is_playoff': 'false'
+    } for i in range(count)]
+
+
+def synthetic_messages(count, rng):
+    return {
+        'messages': [{
+            'id': str(i),
+            'league_id': '1',
+            'user_id': str(rng.randint(1, 8)),
+            'message': 'Anyone up for a trade? ' * rng.randint(1, 4),
+            'timestamp': '2025-10-04T12:00:00.000Z',
+            'message_type': 'text',
+            'reply_to_id': None,
+            'is_deleted': False,
+            'metadata': None,
+            'username': f"Team {rng.randint(1, 8)}",
+            'email': None
+        } for i in range(count)],
+        'has_more': True
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare JSON, orjson and MessagePack encode time and size on large API payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100, help='Encodes per payload and encoder')
+        parser.add_argument('--league-id', type=int, help='Read real payloads for this league from Databricks')
+        parser.add_argument('--players', type=int, default=3000, help='Synthetic player count')
+        parser.add_argument('--fixtures', type=int, default=120, help='Synthetic fixture count')
+        parser.add_argument('--messages', type=int, default=50, help='Synthetic chat message count')
+
+    def handle(self, *args, **options):
+        payloads = self.load_payloads(options)
+
+        encoders = [('json (DRF)', JSONRenderer())]
+        if orjson is not None:
+            encoders.append(('orjson', ORJSONRenderer()))
+        else:
+            self.stdout.write(self.style.WARNING('orjson is not installed; skipping it'))
+        if msgpack is not None:
+            encoders.append(('msgpack', MessagePackRenderer()))
+        else:
+            self.stdout.write(self.style.WARNING('msgpack is not installed; skipping it'))
+
+        self.stdout.write(f"{'payload':<16} {'encoder':<12} {'encode ms':>10} {'bytes':>10} {'gzip bytes':>11}")
+        for name, data in payloads:
+            for label, renderer in encoders:
+                timings = []
+                for _ in range(options['iterations']):
+                    start = time.perf_counter()
+                    body = renderer.render(data, renderer.media_type)
+                    timings.append(time.perf_counter() - start)
+                self.stdout.write(
+                    f"{name:<16} {label:<12} {statistics.median(timings) * 1000:>10.3f} "
+                    f"{len(body):>10} {len(gzip.compress(body, compresslevel=6)):>11}"
+                )
+
+    def load_payloads(self, options):
+        """(name, response data) pairs to encode"""
+        league_id = options.get('league_id')
+        if league_id is None:
+            rng = random.Random(42)
+            return [
+                ('rugby_players', synthetic_players(options['players'], rng)),
+                ('league_fixtures', synthetic_fixtures(options['fixtures'], rng)),
+                ('chat_messages', synthetic_messages(options['messages'], rng))
+            ]
+
+        from fantasy.databricks_rest_client import DatabricksRestClient
+        from fantasy.player_catalog import load_player_catalog
+
+        client = DatabricksRestClient()
+        catalog = load_player_catalog(client)
+        players = catalog.rows(catalog.sort(catalog.select()))
+        fixtures = [record._asdict() for record in client.named_records(
+            'fixtures_by_league', {'league_id': league_id}, coerce=False
+        )]
+        messages = [record._asdict() for record in client.iter_records(
+            """
+            SELECT cm.id, cm.league_id, cm.user_id, cm.message, cm.timestamp,
+                   cm.message_type, cm.reply_to_id, cm.is_deleted, cm.metadata
+            FROM default.chat_messages cm
+            WHERE cm.league_id = :league_id
+            ORDER BY cm.timestamp DESC
+            LIMIT 50
+            """,
+            params={'league_id': league_id},
+            coerce=False
+        )]
+        return [
+            ('rugby_players', players),
+            ('league_fixtures', fixtures),
+            ('chat_messages', {'messages': messages, 'has_more': len(messages) == 50})
+        ]
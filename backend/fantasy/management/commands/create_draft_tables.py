@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand
+from fantasy.databricks_rest_client import DatabricksRestClient
+
+class Command(BaseCommand):
+    help = 'Create the tables used by the draft engine in Databricks and add draft_id to team_players'
+
+    def handle(self, *args, **options):
+        client = DatabricksRestClient()
+
+        # One row per draft: its order and pick clock
+        create_drafts_sql = """
+        CREATE TABLE IF NOT EXISTS default.drafts (
+            draft_id STRING,
+            league_id BIGINT,
+            draft_order STRING,
+            pick_seconds INT,
+            started_at TIMESTAMP
+        )
+        """
+
+        try:
+            result = client.execute_sql(create_drafts_sql)
+            self.stdout.write(self.style.SUCCESS('Successfully created drafts table'))
+            self.stdout.write(f'Result: {result}')
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error creating drafts table: {str(e)}'))
+
+        # Append-only log of picks, one row per pick number of a draft
+        create_draft_picks_sql = """
+        CREATE TABLE IF NOT EXISTS default.draft_picks (
+            draft_id STRING,
+            league_id BIGINT,
+            pick_number INT,
+            team_id BIGINT,
+            player_id BIGINT,
+            is_auto BOOLEAN,
+            picked_at TIMESTAMP
+        )
+        """
+
+        try:
+            result = client.execute_sql(create_draft_picks_sql)
+            self.stdout.write(self.style.SUCCESS('Successfully created draft_picks table'))
+            self.stdout.write(f'Result: {result}')
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error creating draft_picks table: {str(e)}'))
+
+        # Roster rows staged in chunks before one MERGE into team_players
+        create_stage_sql = """
+        CREATE TABLE IF NOT EXISTS default.draft_roster_stage (
+            draft_id STRING,
+            league_id BIGINT,
+            team_id BIGINT,
+            player_id BIGINT,
+            position STRING,
+            fantasy_position STRING,
+            is_starting BOOLEAN
+        )
+        """
+
+        try:
+            result = client.execute_sql(create_stage_sql)
+            self.stdout.write(self.style.SUCCESS('Successfully created draft_roster_stage table'))
+            self.stdout.write(f'Result: {result}')
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error creating draft_roster_stage table: {str(e)}'))
+
+        # Version token of the save that wrote each roster row, so retried saves are no-ops
+        add_draft_id_sql = "ALTER TABLE default.team_players ADD COLUMN draft_id STRING"
+
+        try:
+            result = client.execute_sql(add_draft_id_sql)
+            if result and result.get('status', {}).get('state') == 'SUCCEEDED':
+                self.stdout.write(self.style.SUCCESS('Successfully added draft_id to team_players'))
+            else:
+                # Fails when the column already exists
+                self.stdout.write(self.style.WARNING(f'Could not add draft_id to team_players: {result}'))
+        except Exception as e:
+            self.stdout.write(self.style.WARNING(f'Could not add draft_id to team_players: {str(e)}'))
@@ -0,0 +1,180 @@
+"""
+Simulate whole drafts against an in-memory warehouse
+
+Drives the draft API end to end for a number of leagues at once: start
+the draft, make every pick (present teams submit picks, absent teams run
+out their clock and are auto-picked while a client follows the draft's
+event stream), read the draft status the way
+polling clients do, and complete the draft. Statements go to the bundled
+InMemoryWarehouse (fantasy.warehouse_stub) with a configurable round-trip
+latency, so runs are repeatable and need no Databricks access.
+
+Reports latency percentiles per operation, warehouse statement counts
+and query cache / coalescing hit rates. Run it before a release to catch
+regressions in the draft views:
+
+    python manage.py simulate_draft
+    python manage.py simulate_draft --leagues 8 --teams 12 --concurrency 8 --latency 80 --jitter 40
+"""
+
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from fantasy import draft_engine
+from fantasy.databricks_rest_client import DatabricksRestClient, statement_flight
+from fantasy.result_cache import cache_stats
+from fantasy.views.utils import cache_flight
+from fantasy.warehouse_stub import InMemoryWarehouse
+
+
+OPERATIONS = ['start_draft', 'draft_status', 'submit_pick', 'auto_pick', 'complete_draft']
+
+
+class Command(BaseCommand):
+    help = 'Simulate full drafts against an in-memory warehouse and report latency, statements and cache hits'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--leagues', type=int, default=4, help='Leagues drafting during the run')
+        parser.add_argument('--teams', type=int, default=12, help='Teams per league')
+        parser.add_argument('--concurrency', type=int, default=4, help='Leagues drafting at the same time')
+        parser.add_argument('--latency', type=float, default=50.0, help='Warehouse round trip per statement in ms')
+        parser.add_argument('--jitter', type=float, default=20.0, help='Extra random latency per statement, up to this many ms')
+        parser.add_argument('--absent', type=float, default=0.25, help='Share of teams that never pick and are auto-picked')
+        parser.add_argument('--status-reads', type=int, default=1, help='draft-status reads per pick, as polling clients make')
+        parser.add_argument('--players', type=int, default=900, help='Size of the player pool')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for players and absent teams')
+
+    def handle(self, *args, **options):
+        if options['players'] < options['teams'] * draft_engine.ROSTER_SIZE:
+            raise CommandError('--players must cover a full roster for every team')
+
+        warehouse = InMemoryWarehouse(
+            leagues=options['leagues'],
+            teams_per_league=options['teams'],
+            players=options['players'],
+            latency=options['latency'] / 1000,
+            jitter=options['jitter'] / 1000,
+            seed=options['seed']
+        )
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+        started = time.perf_counter()
+        with warehouse.installed():
+            with ThreadPoolExecutor(max_workers=max(1, options['concurrency'])) as executor:
+                picks = list(executor.map(lambda league_id: self.run_league(league_id, warehouse, options),
+                                          warehouse.leagues))
+        elapsed = time.perf_counter() - started
+
+        self.report(warehouse, sum(picks), elapsed)
+
+    def timed(self, operation, send):
+        """Time one API call; non-2xx responses count as errors"""
+        start = time.perf_counter()
+        response = send()
+        duration = time.perf_counter() - start
+        with self.lock:
+            self.timings[operation].append(duration)
+            if response.status_code >= 300:
+                self.errors[operation] += 1
+        if response.status_code >= 300:
+            self.stderr.write(f"{operation}: {response.status_code} {response.content[:200]!r}")
+        return response
+
+    def run_league(self, league_id, warehouse, options):
+        """Draft one league from start to completion; returns the number of picks made"""
+        client = Client(SERVER_NAME='localhost')
+        base = f'/api/leagues/{league_id}'
+        team_ids = [team_id for team_id, _, _ in warehouse.teams[league_id]]
+        rng = random.Random(options['seed'] + league_id)
+        absent = set(rng.sample(team_ids, round(len(team_ids) * options['absent'])))
+
+        self.timed('start_draft', lambda: client.post(f'{base}/start-draft/', {}, content_type='application/json'))
+        draft = draft_engine.get_draft(DatabricksRestClient(), league_id, load=False)
+        if draft is None:
+            self.stderr.write(f'League {league_id}: the draft did not start')
+            return 0
+
+        while draft.status == 'LIVE':
+            for _ in range(options['status_reads']):
+                self.timed('draft_status', lambda: client.get(f'{base}/draft-status/', {'after': len(draft.picks)}))
+            with draft.lock:
+                team_id = draft.team_on_clock
+                if team_id is None:
+                    break
+                if team_id in absent:
+                    # Let the clock run out: the stream that follows the draft makes the auto-pick
+                    draft.deadline = time.time()
+                    player_id = None
+                    last_event_id = draft.event_id(draft.last_event_id)
+                else:
+                    # A present team drafts the player the auto-picker would suggest
+                    player_id = draft.auto_pick(team_id)
+            if player_id is None:
+                self.timed('auto_pick', lambda: self.follow_until_pick(client, base, last_event_id))
+            else:
+                self.timed('submit_pick', lambda: client.post(
+                    f'{base}/draft-picks/', {'team_id': team_id, 'player_id': player_id},
+                    content_type='application/json'
+                ))
+
+        self.timed('complete_draft', lambda: client.post(f'{base}/complete-draft/', {}, content_type='application/json'))
+        return len(draft.picks)
+
+    def follow_until_pick(self, client, base, last_event_id):
+        """Follow the draft's event stream until the next pick event arrives"""
+        response = client.get(f'{base}/draft-events/', headers={'Last-Event-ID': last_event_id})
+        if response.status_code < 300:
+            try:
+                for chunk in response.streaming_content:
+                    if chunk.startswith(b'id: ') and b'\nevent: pick\n' in chunk:
+                        break
+            finally:
+                response.close()
+        return response
+
+    def report(self, warehouse, picks, elapsed):
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(warehouse.leagues)} leagues, {picks} picks in {elapsed:.2f}s ({picks / elapsed:.1f} picks/s)'
+        ))
+
+        self.stdout.write('')
+        self.stdout.write(f"{'operation':<16} {'count':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7}")
+        for operation in OPERATIONS:
+            timings = self.timings.get(operation)
+            if not timings:
+                continue
+            p50, p90, p99 = np.percentile(np.array(timings) * 1000, [50, 90, 99])
+            self.stdout.write(
+                f"{operation:<16} {len(timings):>6} {p50:>9.2f} {p90:>9.2f} {p99:>9.2f} "
+                f"{max(timings) * 1000:>9.2f} {self.errors.get(operation, 0):>7}"
+            )
+
+        total = sum(warehouse.statements.values())
+        self.stdout.write('')
+        self.stdout.write(f"Warehouse statements: {total} ({total / picks:.2f} per pick)" if picks else
+                          f"Warehouse statements: {total}")
+        for name, count in warehouse.statements.most_common():
+            self.stdout.write(f"  {name:<32} {count:>6}")
+
+        cache = cache_stats()
+        self.stdout.write('')
+        self.stdout.write(
+            f"Query cache: {cache['hits']} hits, {cache['misses']} misses "
+            f"(hit ratio {cache['hit_ratio']}), {cache.get('invalidations', 0)} invalidations"
+        )
+        statements = statement_flight.stats()
+        loads = cache_flight.stats()
+        self.stdout.write(f"Coalesced statements: {statements['coalesced']} of {statements['executed'] + statements['coalesced']}")
+        self.stdout.write(f"Coalesced cache loads: {loads['coalesced']} of {loads['executed'] + loads['coalesced']}")
+
+        rostered = sum(len(players) for players in warehouse.team_players.values())
+        expected = sum(len(teams) for teams in warehouse.teams.values()) * draft_engine.ROSTER_SIZE
+        style = self.style.SUCCESS if rostered == expected else self.style.ERROR
+        self.stdout.write(style(f"Rostered players saved: {rostered} of {expected}"))
@@ -0,0 +1,407 @@
+"""
+In-memory columnar player catalog
+
+The draft page's biggest payload is the player pool from
+default.draft_players_optimized. Instead of querying it per request, each
+worker process keeps the whole table in memory as column arrays: NumPy
+float/int arrays for the stats, category codes for team, position,
+fantasy position and tournament, and interned strings for ids and names.
+Filters, sorts and top-k queries are vectorized over those arrays.
+
+The catalog is loaded on first use. A version probe (latest last_updated
+and row count, a one-row query) runs in the background at most every
+PLAYER_CATALOG_CHECK_INTERVAL seconds, and the catalog is rebuilt when the
+table has changed, e.g. after refresh_draft_players.py. Reloads are
+incremental: only rows with a newer last_updated are fetched, along with
+the current id list to drop deleted players.
+
+The last few snapshots are kept so clients holding an older version can be
+sent just the players that changed since, plus the ids that were removed.
+
+Configuration:
+- PLAYER_CATALOG_CHECK_INTERVAL: seconds between version probes (default 60)
+- PLAYER_CATALOG_HISTORY: previous snapshots kept for delta sync (default 8)
+"""
+
+import base64
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+import numpy as np
+from decouple import config
+from .cache_refresh import refresher
+from .databricks_rest_client import DatabricksRestClient
+
+
+CHECK_INTERVAL = config('PLAYER_CATALOG_CHECK_INTERVAL', default=60, cast=float)
+HISTORY_SIZE = config('PLAYER_CATALOG_HISTORY', default=8, cast=int)
+# Largest page a client may ask for
+MAX_PAGE_SIZE = config('PLAYER_CATALOG_MAX_PAGE_SIZE', default=500, cast=int)
+# Derived results kept per snapshot before the memo is reset
+MEMO_LIMIT = 256
+
+# Fields of each player in API responses, in response order
+PLAYER_FIELDS = [
+    'id',
+    'team',
+    'name',
+    'position',
+    'fantasy_position',
+    'tournament_id',
+    'fantasy_points_per_game',
+    'fantasy_points_per_minute',
+    'total_fantasy_points',
+    'matches_played',
+    'total_tries',
+    'total_tackles_made',
+    'total_metres_carried',
+    'avg_tries_per_match',
+    'avg_tackles_per_match'
+]
+
+# Low-cardinality text columns stored as codes into a sorted category list
+CATEGORY_COLUMNS = ['team', 'position', 'fantasy_position', 'tournament_id']
+# Free text columns stored as interned strings
+TEXT_COLUMNS = ['id', 'name']
+FLOAT_COLUMNS = [
+    'fantasy_points_per_game',
+    'fantasy_points_per_minute',
+    'total_fantasy_points',
+    'total_tries',
+    'total_tackles_made',
+    'total_metres_carried',
+    'avg_tries_per_match',
+    'avg_tackles_per_match'
+]
+INT_COLUMNS = ['matches_played']
+STAT_COLUMNS = FLOAT_COLUMNS + INT_COLUMNS
+
+# Decimal places each stat is rounded to in responses
+ROUNDING = {
+    'fantasy_points_per_game': 1,
+    'fantasy_points_per_minute': 2,
+    'total_fantasy_points': 1
+}
+
+PlayerRecord = namedtuple('PlayerRecord', PLAYER_FIELDS + ['last_updated'])
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class PlayerCatalog:
+    """An immutable columnar snapshot of draft_players_optimized"""
+
+    def __init__(self, records, version, updated_through=None):
+        self.version = version
+        # Latest last_updated in the table when this snapshot was read
+        self.updated_through = updated_through
+        self.loaded_at = time.time()
+        self.checked_at = self.loaded_at
+        self.size = len(records)
+
+        columns = {field: [] for field in PLAYER_FIELDS + ['last_updated']}
+        for record in records:
+            for field in columns:
+                columns[field].append(getattr(record, field))
+
+        self.text = {}
+        for field in TEXT_COLUMNS + ['last_updated']:
+            self.text[field] = np.array([_intern(value) for value in columns[field]], dtype=object)
+
+        self.categories = {}
+        self.codes = {}
+        self._category_values = {}
+        for field in CATEGORY_COLUMNS:
+            # Nulls sort as '' for np.unique and decode back to None
+            values = ['' if value is None else value for value in columns[field]]
+            categories, codes = np.unique(np.array(values, dtype=object), return_inverse=True)
+            self.categories[field] = [_intern(value) for value in categories.tolist()]
+            self.codes[field] = codes.astype(np.int32)
+            self._category_values[field] = np.array([value or None for value in self.categories[field]], dtype=object)
+
+        self.stats = {}
+        for field in FLOAT_COLUMNS:
+            self.stats[field] = np.array([value or 0.0 for value in columns[field]], dtype=np.float64)
+            if field in ROUNDING:
+                self.stats[field] = np.round(self.stats[field], ROUNDING[field])
+        for field in INT_COLUMNS:
+            self.stats[field] = np.array([value or 0 for value in columns[field]], dtype=np.int64)
+
+        # Numeric player ids give a stable, cheap tie-break for sorting
+        self.id_numbers = np.array([_id_number(value) for value in columns['id']], dtype=np.int64)
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+
+    def column(self, field):
+        """Full column as an array (category columns are decoded to strings)"""
+        if field in self.stats:
+            return self.stats[field]
+        if field in self.codes:
+            return self._category_values[field][self.codes[field]]
+        return self.text[field]
+
+    def select(self, tournament_id=None, position=None, fantasy_position=None, team=None):
+        """
+        Indices of players matching every given filter
+
+        Each filter takes one value or a list of accepted values.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        for field, wanted in (('tournament_id', tournament_id), ('position', position),
+                              ('fantasy_position', fantasy_position), ('team', team)):
+            if wanted is None:
+                continue
+            wanted = [wanted] if isinstance(wanted, str) else list(wanted)
+            lookup = {category: code for code, category in enumerate(self.categories[field])}
+            wanted_codes = [lookup[value] for value in wanted if value in lookup]
+            mask &= np.isin(self.codes[field], wanted_codes)
+        return np.flatnonzero(mask)
+
+    def sort(self, indices, by='fantasy_points_per_game', descending=True):
+        """
+        Order indices by a stat or text column, ties broken by player id
+
+        The default matches the table's usual ordering: best points per
+        game first.
+        """
+        key = self.column(by)[indices]
+        if by in self.stats:
+            primary = -key if descending else key
+            order = np.lexsort((self.id_numbers[indices], primary))
+        else:
+            order = np.lexsort((self.id_numbers[indices], key.astype(str)))
+            if descending:
+                order = order[::-1]
+        return indices[order]
+
+    def top_k(self, indices, by='fantasy_points_per_game', k=10):
+        """The k best players among indices by a stat, best first"""
+        values = self.stats[by][indices]
+        if k < len(indices):
+            candidates = np.argpartition(-values, k - 1)[:k]
+            indices = indices[candidates]
+        return self.sort(indices, by=by, descending=True)
+
+    def page(self, indices, by='fantasy_points_per_game', descending=True, after=None, limit=None):
+        """
+        Keyset pagination over indices already ordered by sort(by, descending)
+
+        `after` is the (value, player id) of the last player on the previous
+        page. Returns the page and the key of its last player, or None as
+        the key when there are no more players.
+        """
+        if after is not None:
+            value, id_number = after
+            keys = self.stats[by][indices]
+            ids = self.id_numbers[indices]
+            beyond = keys < value if descending else keys > value
+            indices = indices[beyond | ((keys == value) & (ids > id_number))]
+        if limit is None or len(indices) <= limit:
+            return indices, None
+        indices = indices[:limit]
+        last = indices[-1]
+        return indices, (self.stats[by][last].item(), int(self.id_numbers[last]))
+
+    def rows(self, indices, fields=None):
+        """Players at indices as response dicts, limited to `fields` when given"""
+        fields = fields or PLAYER_FIELDS
+        columns = [self.column(field)[indices].tolist() for field in fields]
+        return [dict(zip(fields, values)) for values in zip(*columns)]
+
+    def records(self):
+        """Every player as a PlayerRecord, e.g. to merge with changed rows"""
+        columns = [self.column(field).tolist() for field in PlayerRecord._fields]
+        return [PlayerRecord(*values) for values in zip(*columns)]
+
+    def changes_since(self, older, tournament_id=None):
+        """
+        Players that differ from an older snapshot
+
+        Returns the indices of players that are new or whose response
+        fields changed, and the ids of players no longer present (or no
+        longer in the tournament). last_updated alone does not count as a
+        change, since a full table rebuild restamps every row.
+        """
+        indices = self.select(tournament_id=tournament_id)
+        old_indices = older.select(tournament_id=tournament_id)
+        old_positions = dict(zip(older.text['id'][old_indices].tolist(), old_indices.tolist()))
+
+        added, kept, kept_old = [], [], []
+        for index, player_id in zip(indices.tolist(), self.text['id'][indices].tolist()):
+            old_index = old_positions.pop(player_id, None)
+            if old_index is None:
+                added.append(index)
+            else:
+                kept.append(index)
+                kept_old.append(old_index)
+
+        kept = np.array(kept, dtype=np.int64)
+        kept_old = np.array(kept_old, dtype=np.int64)
+        differs = np.zeros(len(kept), dtype=bool)
+        for field in PLAYER_FIELDS:
+            differs |= self.column(field)[kept] != older.column(field)[kept_old]
+
+        changed = np.sort(np.concatenate([np.array(added, dtype=np.int64), kept[differs]]))
+        return changed, list(old_positions)
+
+    def memoize(self, key, build):
+        """Reuse a derived result (e.g. a serialized page) for the life of this snapshot"""
+        with self._memo_lock:
+            if key in self._memo:
+                return self._memo[key]
+        value = build()
+        with self._memo_lock:
+            if len(self._memo) >= MEMO_LIMIT:
+                self._memo.clear()
+            self._memo[key] = value
+        return value
+
+    def stats_summary(self):
+        """Figures for monitoring"""
+        return {
+            'version': self.version,
+            'players': self.size,
+            'loaded_at': self.loaded_at,
+            'checked_at': self.checked_at
+        }
+
+
+def encode_cursor(by, descending, key):
+    """Opaque cursor for the page after the player with this sort key"""
+    payload = json.dumps({'sort': by, 'desc': descending, 'value': key[0], 'id': key[1]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, by, descending):
+    """
+    The (value, player id) key in a cursor from encode_cursor
+
+    Raises ValueError for malformed cursors or ones issued for another sort.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, id_number = float(payload['value']), int(payload['id'])
+    except (ValueError, TypeError, KeyError):
+        raise ValueError('Invalid cursor')
+    if payload.get('sort') != by or payload.get('desc') != descending:
+        raise ValueError('Cursor was issued for a different sort order')
+    return value, id_number
+
+
+def _id_number(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+# Snapshots replaced by a reload, oldest first, keyed by version
+_history = OrderedDict()
+
+
+def _probe(client):
+    """Latest last_updated and row count of the table as it is now, or None"""
+    probe = client.named_records('draft_players_version', coerce=False)
+    return probe[0] if probe else None
+
+
+def _version(probe):
+    """Version token for a probe result"""
+    return f"{probe.last_updated}|{probe.player_count}" if probe else None
+
+
+def load_player_catalog(client=None):
+    """Read draft_players_optimized into a new PlayerCatalog"""
+    client = client or DatabricksRestClient()
+    probe = _probe(client)
+    records = client.named_records('draft_players_catalog', keep_raw=('id', 'tournament_id', 'last_updated'))
+    return PlayerCatalog(records, _version(probe), probe.last_updated if probe else None)
+
+
+def _reload_incrementally(client, catalog, probe):
+    """
+    Build the next snapshot from catalog plus the rows changed since it
+
+    Returns None when the result cannot be trusted (row count does not
+    match the probe), in which case the caller reloads everything.
+    """
+    if catalog.updated_through is None or probe is None:
+        return None
+    changed = client.named_records('draft_players_changed_since', {'since': catalog.updated_through},
+                                   keep_raw=('id', 'tournament_id', 'last_updated'))
+    current_ids = {record.id for record in client.named_records('draft_player_ids', keep_raw=('id',))}
+    changed_ids = {record.id for record in changed}
+    records = [
+        record for record in catalog.records()
+        if record.id in current_ids and record.id not in changed_ids
+    ] + list(changed)
+    if str(len(records)) != str(probe.player_count):
+        return None
+    print(f"DEBUG: Player catalog reload fetched {len(changed)} changed rows")
+    return PlayerCatalog(records, _version(probe), probe.last_updated)
+
+
+def _check_for_new_version():
+    """Background check: rebuild the catalog if the table changed since it was loaded"""
+    global _catalog
+
+    client = DatabricksRestClient()
+    catalog = _catalog
+    probe = _probe(client)
+    if catalog is None or _version(probe) != catalog.version:
+        new_catalog = None
+        if catalog is not None:
+            new_catalog = _reload_incrementally(client, catalog, probe)
+        if new_catalog is None:
+            new_catalog = load_player_catalog(client)
+        with _catalog_lock:
+            if catalog is not None:
+                _history[catalog.version] = catalog
+                while len(_history) > HISTORY_SIZE:
+                    _history.popitem(last=False)
+            _catalog = new_catalog
+        print(f"DEBUG: Player catalog reloaded at version {new_catalog.version} ({new_catalog.size} players)")
+    else:
+        catalog.checked_at = time.time()
+    return time.time() + CHECK_INTERVAL
+
+
+def catalog_snapshot(version):
+    """A previous snapshot still held for delta sync, or None"""
+    with _catalog_lock:
+        return _history.get(version)
+
+
+def get_player_catalog(client=None):
+    """
+    The current catalog, loading it on first use
+
+    Readers never wait on version checks: a due check runs on the cache
+    refresh pool and swaps in a new catalog when it finds one.
+    """
+    global _catalog
+
+    catalog = _catalog
+    if catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = load_player_catalog(client)
+            catalog = _catalog
+
+    refresher.track('player_catalog', _check_for_new_version, catalog.checked_at + CHECK_INTERVAL)
+    return catalog
+
+
+def catalog_stats():
+    """Catalog figures for runtime-stats, or None before the first load"""
+    catalog = _catalog
+    if catalog is None:
+        return None
+    return dict(catalog.stats_summary(), history=list(_history))
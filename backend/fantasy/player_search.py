@@ -0,0 +1,181 @@
+"""
+Fuzzy player name search
+
+A trigram inverted index over the player catalog's names and teams. Each
+word is padded and split into overlapping three-letter grams, and each gram
+maps to the players whose name or team contains it. A query is scored by
+the share of its grams a player has, so misspellings ("sextn", "ringroes")
+still find the right player, and words the query is a prefix of get a bonus
+so typing a name narrows results as you go.
+
+Lookups touch only the posting lists of the query's grams and are a few
+vectorized NumPy operations, well under a millisecond for a few thousand
+players. The index is built from a catalog snapshot and rebuilt the first
+time it is used after the catalog reloads.
+"""
+
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+import numpy as np
+
+
+# Share of a query word's trigrams a player must have to count as a match
+MIN_SCORE = 0.34
+# Bonus when a player's name (or team) has a word starting with the query word
+NAME_PREFIX_BONUS = 0.5
+TEAM_PREFIX_BONUS = 0.25
+# Team grams count for less than name grams
+TEAM_WEIGHT = 0.6
+
+
+def strip_name_affixes(name):
+    """
+    Strip whitespace and common prefixes and suffixes (Mr., Dr., Jr., III)
+    from a player name
+
+    Shared with player_matcher, which matches names across CSV files.
+    """
+    # Convert to string and strip whitespace
+    name = str(name).strip()
+
+    # Remove common suffixes and prefixes
+    name = re.sub(r'\s+(Jr\.?|Sr\.?|III|IV|V)$', '', name)
+    name = re.sub(r'^(Mr\.?|Mrs\.?|Ms\.?|Dr\.?)\s+', '', name)
+
+    # Remove extra spaces
+    return re.sub(r'\s+', ' ', name)
+
+
+def clean_player_name(name):
+    """
+    Normalize a name for matching
+
+    strip_name_affixes plus lowercasing, accent folding and punctuation
+    removal so "O'Mahony" and "Gibson-Park" match as typed.
+    """
+    if not name:
+        return ""
+
+    name = unicodedata.normalize('NFKD', strip_name_affixes(name))
+    name = ''.join(char for char in name if not unicodedata.combining(char)).lower()
+    name = re.sub(r"['’]", '', name)
+    name = re.sub(r'[^a-z0-9]+', ' ', name)
+
+    # Remove extra spaces
+    return re.sub(r'\s+', ' ', name).strip()
+
+
+def trigrams(word):
+    """Trigrams of a word padded so its start and end form grams of their own"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PlayerSearchIndex:
+    """Trigram and word-prefix index over one catalog snapshot"""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.version = catalog.version
+        names = catalog.column('name').tolist()
+        teams = catalog.column('team').tolist()
+
+        postings = {}
+        words = []
+        for index, (name, team) in enumerate(zip(names, teams)):
+            for field, text, weight in (('name', name, 1.0), ('team', team, TEAM_WEIGHT)):
+                grams = set()
+                for word in clean_player_name(text).split():
+                    grams |= trigrams(word)
+                    words.append((word, field, index))
+                for gram in grams:
+                    postings.setdefault(gram, ([], []))
+                    postings[gram][0].append(index)
+                    postings[gram][1].append(weight)
+
+        # A player can hold a gram in both name and team; keep the heavier one
+        self._postings = {}
+        for gram, (indices, weights) in postings.items():
+            indices = np.array(indices, dtype=np.int32)
+            weights = np.array(weights, dtype=np.float32)
+            order = np.lexsort((-weights, indices))
+            indices, weights = indices[order], weights[order]
+            first = np.ones(len(indices), dtype=bool)
+            first[1:] = indices[1:] != indices[:-1]
+            self._postings[gram] = (indices[first], weights[first])
+
+        words.sort()
+        self._words = [word for word, _, _ in words]
+        self._word_players = np.array([index for _, _, index in words], dtype=np.int32)
+        self._word_bonus = np.array(
+            [NAME_PREFIX_BONUS if field == 'name' else TEAM_PREFIX_BONUS for _, field, _ in words],
+            dtype=np.float32
+        )
+
+    def _word_scores(self, word):
+        """Per-player score for one query word: trigram overlap plus prefix bonus"""
+        size = self.catalog.size
+        grams = trigrams(word)
+        scores = np.zeros(size, dtype=np.float32)
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        scores /= len(grams)
+
+        start = bisect_left(self._words, word)
+        end = bisect_left(self._words, word + '\uffff')
+        if end > start:
+            bonus = np.zeros(size, dtype=np.float32)
+            np.maximum.at(bonus, self._word_players[start:end], self._word_bonus[start:end])
+            scores += bonus
+        return scores
+
+    def search(self, query, limit=20, candidates=None):
+        """
+        Best matches for query as (indices, scores), best first
+
+        Every query word must match for a player to be returned. candidates
+        optionally restricts results to those catalog indices (e.g. one
+        tournament). Ties go to the player with more points per game.
+        """
+        words = clean_player_name(query).split()
+        if not words:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+        total = np.zeros(self.catalog.size, dtype=np.float32)
+        matched = np.ones(self.catalog.size, dtype=bool)
+        for word in words:
+            scores = self._word_scores(word)
+            matched &= scores >= MIN_SCORE
+            total += scores
+        if candidates is not None:
+            allowed = np.zeros(self.catalog.size, dtype=bool)
+            allowed[candidates] = True
+            matched &= allowed
+
+        indices = np.flatnonzero(matched)
+        scores = total[indices] / len(words)
+        points = self.catalog.stats['fantasy_points_per_game'][indices]
+        order = np.lexsort((self.catalog.id_numbers[indices], -points, -scores))[:limit]
+        return indices[order], scores[order]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index(catalog):
+    """The search index for this catalog snapshot, building it on first use"""
+    global _index
+
+    index = _index
+    if index is None or index.catalog is not catalog:
+        with _index_lock:
+            if _index is None or _index.catalog is not catalog:
+                _index = PlayerSearchIndex(catalog)
+                print(f"DEBUG: Player search index built for catalog version {catalog.version}")
+            index = _index
+    return index
@@ -0,0 +1,345 @@
+"""
+Named SQL query templates for the Databricks Statement Execution API
+
+Templates use `:name` parameter markers instead of formatting values into
+the SQL text. Every call of a template therefore sends the same statement
+text, which lets the warehouse reuse its plan and query result caches, and
+request values can never change the meaning of the statement.
+
+Templates are validated when this module is imported, and bind() checks
+that callers supply exactly the parameters a template declares.
+
+Example Usage:
+    client.named_records('teams_by_league', {'league_id': league_id})
+"""
+
+import re
+
+
+PARAMETER_MARKER = re.compile(r'(?<![:\w]):([A-Za-z_]\w*)')
+
+
+def _parameter_type(value):
+    """Infer the Databricks parameter type for a Python value"""
+    if isinstance(value, bool):
+        return 'BOOLEAN'
+    if isinstance(value, int):
+        return 'BIGINT'
+    if isinstance(value, float):
+        return 'DOUBLE'
+    return 'STRING'
+
+
+def _parameter_value(value, type_name):
+    """Render a value as the string the Statement Execution API expects"""
+    if type_name == 'BOOLEAN':
+        return str(value).lower()
+    return str(value)
+
+
+def statement_parameters(params, types=None):
+    """
+    Build the `parameters` list for a statement request
+    
+    Args:
+        params: dict of marker name -> value (None binds SQL NULL)
+        types: optional dict of marker name -> Databricks type; values are
+            sent as strings and cast by the warehouse to that type
+    """
+    types = types or {}
+    parameters = []
+    for name, value in params.items():
+        type_name = types.get(name) or _parameter_type(value)
+        parameter = {'name': name, 'type': type_name}
+        if value is not None:
+            parameter['value'] = _parameter_value(value, type_name)
+        parameters.append(parameter)
+    return parameters
+
+
+def values_list(rows, columns, types=None, prefix='v'):
+    """
+    Build a parameterized VALUES list for many rows
+    
+    Returns (sql, params) where sql is "(:v_a_0, :v_b_0), (:v_a_1, :v_b_1)"
+    and params is the matching parameter list, typed per column via `types`.
+    """
+    types = types or {}
+    tuples = []
+    values = {}
+    value_types = {}
+    for index, row in enumerate(rows):
+        markers = []
+        for column in columns:
+            marker = f'{prefix}_{column}_{index}'
+            markers.append(f':{marker}')
+            values[marker] = row[column]
+            if column in types:
+                value_types[marker] = types[column]
+        tuples.append(f"({', '.join(markers)})")
+    return ', '.join(tuples), statement_parameters(values, value_types)
+
+
+class QueryTemplate:
+    """
+    A named, pre-validated parameterized SQL statement
+    
+    Attributes:
+        name (str): Registry name, e.g. 'league_by_id'
+        sql (str): Statement text with `:name` markers
+        types (dict): Declared Databricks type for each marker
+        parameters (frozenset): Marker names found in the statement
+    """
+    
+    def __init__(self, name, sql, types):
+        self.name = name
+        self.sql = sql
+        self.types = types
+        self.parameters = frozenset(PARAMETER_MARKER.findall(sql))
+        
+        undeclared = self.parameters - set(types)
+        unused = set(types) - self.parameters
+        if undeclared or unused:
+            raise ValueError(f"Query '{name}' parameter mismatch: undeclared={sorted(undeclared)} unused={sorted(unused)}")
+    
+    def bind(self, params):
+        """Validate `params` against the template and return the API parameter list"""
+        params = params or {}
+        missing = self.parameters - set(params)
+        extra = set(params) - self.parameters
+        if missing or extra:
+            raise ValueError(f"Query '{self.name}' expects {sorted(self.parameters)}, missing={sorted(missing)} extra={sorted(extra)}")
+        return statement_parameters(params, self.types)
+
+
+QUERIES = {}
+
+
+def register(query_name, sql, /, **types):
+    """Register a query template; keyword arguments declare each marker's type"""
+    if query_name in QUERIES:
+        raise ValueError(f"Query '{query_name}' is already registered")
+    QUERIES[query_name] = QueryTemplate(query_name, sql.strip(), types)
+    return QUERIES[query_name]
+
+
+def get_query(name):
+    """Look up a registered query template"""
+    try:
+        return QUERIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown query template '{name}'")
+
+
+# Leagues
+register('all_leagues', """
+    SELECT * FROM default.user_created_leagues
+""")
+
+register('league_by_id', """
+    SELECT * FROM default.user_created_leagues WHERE id = :league_id
+""", league_id='BIGINT')
+
+register('latest_league_by_name', """
+    SELECT * FROM default.user_created_leagues WHERE name = :name ORDER BY created_at DESC LIMIT 1
+""", name='STRING')
+
+register('create_league', """
+    INSERT INTO default.user_created_leagues (name, description, created_by_user_id, max_teams, max_players_per_team, is_public, created_at, draft_status, tournament_id)
+    VALUES (:name, :description, :user_id, :max_teams, :max_players_per_team, :is_public, CURRENT_TIMESTAMP, 'NOT_STARTED', :tournament_id)
+""", name='STRING', description='STRING', user_id='BIGINT', max_teams='INT',
+    max_players_per_team='INT', is_public='BOOLEAN', tournament_id='BIGINT')
+
+register('draft_status_by_league', """
+    SELECT draft_status FROM default.user_created_leagues WHERE id = :league_id
+""", league_id='BIGINT')
+
+register('set_draft_status', """
+    UPDATE default.user_created_leagues SET draft_status = :draft_status WHERE id = :league_id
+""", draft_status='STRING', league_id='BIGINT')
+
+# Draft engine schema (manage.py create_draft_tables)
+register('draft_engine_tables', """
+    SHOW TABLES IN default LIKE 'drafts|draft_picks|draft_roster_stage'
+""")
+
+register('team_players_columns', """
+    SHOW COLUMNS IN default.team_players
+""")
+
+# Drafts
+register('latest_draft_by_league', """
+    SELECT draft_id, league_id, draft_order, pick_seconds, started_at
+    FROM default.drafts
+    WHERE league_id = :league_id
+    ORDER BY started_at DESC
+    LIMIT 1
+""", league_id='BIGINT')
+
+register('create_draft', """
+    INSERT INTO default.drafts (draft_id, league_id, draft_order, pick_seconds, started_at)
+    VALUES (:draft_id, :league_id, :draft_order, :pick_seconds, :started_at)
+""", draft_id='STRING', league_id='BIGINT', draft_order='STRING', pick_seconds='INT', started_at='TIMESTAMP')
+
+register('draft_picks_after', """
+    SELECT pick_number, team_id, player_id, is_auto, picked_at
+    FROM default.draft_picks
+    WHERE draft_id = :draft_id AND pick_number > :after
+    -- The first row of a pick number wins if concurrent appends both landed
+    ORDER BY pick_number, picked_at, player_id
+""", draft_id='STRING', after='INT')
+
+# Appends a pick unless the log already has its pick number. The check and the
+# insert are not atomic on Delta: concurrent appends from two workers can both
+# land (draft_picks_after replays the first)
+register('record_draft_pick', """
+    INSERT INTO default.draft_picks (draft_id, league_id, pick_number, team_id, player_id, is_auto, picked_at)
+    SELECT :draft_id, :league_id, :pick_number, :team_id, :player_id, :is_auto, :picked_at
+    WHERE NOT EXISTS (
+        SELECT 1 FROM default.draft_picks WHERE draft_id = :draft_id AND pick_number = :pick_number
+    )
+""", draft_id='STRING', league_id='BIGINT', pick_number='INT', team_id='BIGINT', player_id='BIGINT',
+    is_auto='BOOLEAN', picked_at='TIMESTAMP')
+
+register('clear_draft_roster_stage', """
+    DELETE FROM default.draft_roster_stage WHERE draft_id = :draft_id
+""", draft_id='STRING')
+
+# League teams
+register('teams_by_league', """
+    SELECT * FROM default.league_teams WHERE league_id = :league_id
+""", league_id='BIGINT')
+
+register('teams_by_owner', """
+    SELECT * FROM default.league_teams WHERE team_owner_user_id = :user_id
+""", user_id='BIGINT')
+
+register('team_in_league', """
+    SELECT * FROM default.league_teams WHERE id = :team_id AND league_id = :league_id
+""", team_id='BIGINT', league_id='BIGINT')
+
+register('create_team', """
+    INSERT INTO default.league_teams (league_id, team_name, team_owner_user_id)
+    VALUES (:league_id, :team_name, :user_id)
+""", league_id='BIGINT', team_name='STRING', user_id='BIGINT')
+
+register('team_ids_by_league', """
+    SELECT id, team_name, team_owner_user_id
+    FROM default.league_teams 
+    WHERE league_id = :league_id
+    ORDER BY id
+""", league_id='BIGINT')
+
+# Fixtures
+register('tournament_weeks_for_league', """
+    SELECT l.tournament_id, tw.Week, tw.`Week Date`
+    FROM default.user_created_leagues l
+    JOIN default.tournament_weeks tw ON tw.Tournament_ID = l.tournament_id
+    WHERE l.id = :league_id
+    ORDER BY tw.`Week Date`
+""", league_id='BIGINT')
+
+register('fixtures_by_league', """
+    SELECT
+        id,
+        week_number,
+        week_date,
+        home_team_id,
+        away_team_id,
+        home_team_name,
+        away_team_name,
+        home_team_points,
+        away_team_points,
+        is_playoff
+    FROM default.league_fixtures
+    WHERE league_id = :league_id
+    ORDER BY week_number, id
+""", league_id='BIGINT')
+
+# Players
+DRAFT_PLAYER_COLUMNS = """
+        id,
+        team,
+        name,
+        position,
+        fantasy_position,
+        tournament_id,
+        fantasy_points_per_game,
+        fantasy_points_per_minute,
+        total_fantasy_points,
+        matches_played,
+        total_tries,
+        total_tackles_made,
+        total_metres_carried,
+        avg_tries_per_match,
+        avg_tackles_per_match"""
+
+register('draft_players_all', f"""
+    SELECT {DRAFT_PLAYER_COLUMNS}
+    FROM default.draft_players_optimized
+    ORDER BY fantasy_points_per_game DESC, name
+""")
+
+register('draft_players_by_tournament', f"""
+    SELECT {DRAFT_PLAYER_COLUMNS}
+    FROM default.draft_players_optimized 
+    WHERE tournament_id = :tournament_id
+    ORDER BY fantasy_points_per_game DESC, name
+""", tournament_id='BIGINT')
+
+# Player catalog (see player_catalog): every row, plus a cheap version probe
+register('draft_players_catalog', f"""
+    SELECT {DRAFT_PLAYER_COLUMNS},
+        last_updated
+    FROM default.draft_players_optimized
+""")
+
+register('draft_players_changed_since', f"""
+    SELECT {DRAFT_PLAYER_COLUMNS},
+        last_updated
+    FROM default.draft_players_optimized
+    WHERE last_updated > :since
+""", since='TIMESTAMP')
+
+register('draft_player_ids', """
+    SELECT id FROM default.draft_players_optimized
+""")
+
+register('draft_players_version', """
+    SELECT MAX(last_updated) AS last_updated, COUNT(*) AS player_count
+    FROM default.draft_players_optimized
+""")
+
+register('team_players_by_team', """
+    SELECT tp.player_id, tp.position, tp.fantasy_position, tp.is_starting, rp.player_name, rp.team
+    FROM default.team_players tp
+    LEFT JOIN default.rugby_players_25_26 rp ON tp.player_id = rp.player_id
+    WHERE tp.team_id = :team_id
+    ORDER BY tp.is_starting DESC, tp.position
+""", team_id='BIGINT')
+
+# Moves a player between starters and bench; a NULL position keeps the current one
+register('update_team_player_position', """
+    UPDATE default.team_players
+    SET is_starting = :is_starting, position = COALESCE(:position, position)
+    WHERE team_id = :team_id AND player_id = :player_id
+""", is_starting='BOOLEAN', position='STRING', team_id='BIGINT', player_id='BIGINT')
+
+# Users
+register('user_by_email', """
+    SELECT * FROM default.auth_users WHERE email = :email
+""", email='STRING')
+
+register('user_by_username', """
+    SELECT * FROM default.auth_users WHERE username = :username
+""", username='STRING')
+
+register('user_exists', """
+    SELECT 1 FROM default.auth_users
+    WHERE email = :email OR username = :username
+    LIMIT 1
+""", email='STRING', username='STRING')
+
+register('user_by_id', """
+    SELECT * FROM default.auth_users WHERE id = :user_id
+""", user_id='BIGINT')
@@ -0,0 +1,77 @@
+"""
+Response renderers for the Fantasy Rugby API
+
+- ORJSONRenderer: JSON (application/json) encoded with orjson when it is
+  installed, several times faster than the standard library on the large
+  float-heavy player lists, with the stock DRF encoder as a fallback.
+- MessagePackRenderer: opt-in binary encoding (application/msgpack) for
+  clients that send it in Accept. Registered only when the msgpack package
+  is installed.
+- EventStreamRenderer: lets the draft event stream (text/event-stream)
+  pass content negotiation, and sends its errors as an SSE 'error' event.
+
+JSON stays the default: a client gets MessagePack only by asking for it.
+"""
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+_fallback_encoder = JSONEncoder()
+
+
+def _default(value):
+    """Types neither fast encoder knows (Decimal, lazy strings...) as DRF encodes them"""
+    return _fallback_encoder.default(value)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer using orjson for compact output, falling back to DRF's encoder"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        # Honor ?indent / Accept indent like the stock renderer
+        if self.get_indent(accepted_media_type or self.media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack encoding for clients that send Accept: application/msgpack"""
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, use_bin_type=True, default=_default)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """text/event-stream, for endpoints that stream Server-Sent Events"""
+
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Streams are returned as StreamingHttpResponse; only errors are rendered here
+        if data is None:
+            return b''
+        return b'event: error\ndata: ' + ORJSONRenderer().render(data) + b'\n\n'
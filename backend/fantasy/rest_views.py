@@ -27,43 +27,10 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from .databricks_rest_client import DatabricksRestClient
 import json
-import time
-import gzip
-from django.http import JsonResponse
-
-# Simple in-memory cache for query results
-query_cache = {}
-CACHE_DURATION = 30  # Cache for 30 seconds
-
-def get_cached_result(cache_key):
-    """Get cached result if it exists and hasn't expired"""
-    if cache_key in query_cache:
-        result, timestamp = query_cache[cache_key]
-        if time.time() - timestamp < CACHE_DURATION:
-            return result
-        else:
-            del query_cache[cache_key]
-    return None
-
-def set_cached_result(cache_key, result):
-    """Cache a result with current timestamp"""
-    query_cache[cache_key] = (result, time.time())
-
-def compressed_response(data, status_code=200):
-    """Return a compressed JSON response for large data"""
-    json_data = json.dumps(data)
-    
-    # Only compress if data is larger than 1KB
-    if len(json_data) > 1024:
-        compressed_data = gzip.compress(json_data.encode('utf-8'))
-        response = JsonResponse(data, status=status_code)
-        response['Content-Encoding'] = 'gzip'
-        response['Content-Length'] = str(len(compressed_data))
-        response.content = compressed_data
-        return response
-    else:
-        return JsonResponse(data, status=status_code)
 
+# Shares the bounded query cache used by the views package
+from .result_cache import get_cached_result, set_cached_result
+from .compression import body_response, json_body
 
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny])
@@ -831,8 +798,8 @@ def get_team_players(request, team_id):
         # Cache the result
         set_cached_result(cache_key, response_data)
         
-        # Use compressed response for large data
-        return compressed_response(response_data)
+        # Compressed as the client's Accept-Encoding allows
+        return body_response(request, json_body(response_data))
         
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,409 @@
+"""
+Shared query result cache for Fantasy Rugby API
+
+One process-wide cache used by every view module in place of the old
+per-module `query_cache` dicts. It is bounded by entry count and by the
+approximate size of the cached values, evicts least recently used entries
+first, supports a TTL per key and is safe to use from request threads.
+
+When settings.QUERY_CACHE_ALIAS names a Django cache (Redis, memcached or
+the file-based local stand-in, see QUERY_CACHE_URL in settings), entries are
+stored there instead so every gunicorn worker shares one warm cache and one
+worker's invalidation is seen by all of them. Values are pickled once when
+stored; each worker keeps the decoded copy of the bytes it last read, so a
+hit on an unchanged entry does not unpickle a large player list again.
+
+Entries can be tagged with the entities they were built from (`league:12`,
+`team:40`, `user:7`, `chat:12`, or the collections `leagues` and
+`tournaments`). Writers call invalidate(tags) after a mutation; every entry
+carrying one of those tags is treated as a miss from then on, in every
+worker. Tags are versioned rather than tracked as key lists: invalidating
+bumps the tag's version, and an entry is only served while the versions it
+was stored with are still current.
+
+Empty results ([] / {}) and not-found lookups (None, stored as NOT_FOUND)
+are cached too, with their own shorter TTLs, so a league with no trades
+does not query the warehouse on every request. A miss is always None;
+callers test `is None`, never truthiness.
+
+Entries stored with max_stale outlive their ttl so they can be served stale
+while cache_refresh reloads them in the background.
+
+Configuration:
+- QUERY_CACHE_MAX_ENTRIES: maximum number of cached keys (default 2000)
+- QUERY_CACHE_MAX_BYTES: maximum total size of cached values (default 64 MB)
+- QUERY_CACHE_DEFAULT_TTL: seconds an entry lives unless told otherwise
+  (default 300 with a shared cache; 30 without one, since the invalidations
+  of one worker do not reach the others' in-process caches)
+- QUERY_CACHE_EMPTY_TTL: maximum seconds an empty result is cached (default 60)
+- QUERY_CACHE_NOT_FOUND_TTL: maximum seconds a not-found lookup is cached (default 30)
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from decouple import config
+from django.conf import settings
+
+
+MAX_ENTRIES = config('QUERY_CACHE_MAX_ENTRIES', default=2000, cast=int)
+MAX_BYTES = config('QUERY_CACHE_MAX_BYTES', default=64 * 1024 * 1024, cast=int)
+DEFAULT_TTL = config('QUERY_CACHE_DEFAULT_TTL', default=300 if getattr(settings, 'QUERY_CACHE_ALIAS', None) else 30,
+                     cast=int)
+EMPTY_TTL = config('QUERY_CACHE_EMPTY_TTL', default=60, cast=int)
+NOT_FOUND_TTL = config('QUERY_CACHE_NOT_FOUND_TTL', default=30, cast=int)
+
+
+class _NotFound:
+    """Cached marker for a lookup that found nothing (None cannot be cached: it means a miss)"""
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return 'NOT_FOUND'
+
+    def __reduce__(self):
+        # Unpickle to the module's single instance so `is NOT_FOUND` holds
+        return 'NOT_FOUND'
+
+
+NOT_FOUND = _NotFound()
+
+# A cached value with the versions of the tags it was stored under and, for
+# stale-while-revalidate entries, the time after which it should be refreshed
+TaggedEntry = namedtuple('TaggedEntry', ['value', 'tag_versions', 'fresh_until'], defaults=(None,))
+
+
+def _value_size(value):
+    """Approximate memory cost of a cached value by its pickled length"""
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class QueryCache:
+    """Thread-safe LRU cache with a TTL per key and entry/byte bounds"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, default_ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._tags = {}  # tag -> version
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, size = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None, size=None):
+        """
+        Cache value under key for ttl seconds (default_ttl when omitted)
+        
+        Pass `size` when the value's cost is already known to skip measuring it.
+        """
+        if size is None:
+            size = _value_size(value)
+        if size > self.max_bytes:
+            # Never let one oversized value flush the whole cache
+            self.delete(key)
+            return
+        expires_at = time.time() + (self.default_ttl if ttl is None else ttl)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key):
+        """Drop key from the cache if present"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def tag_versions(self, tags):
+        """Current version of each tag (0 for tags never invalidated)"""
+        with self._lock:
+            return {tag: self._tags.get(tag, 0) for tag in tags}
+
+    def bump_tags(self, tags):
+        """Give each tag a new version, invalidating entries stored under it"""
+        version = time.time_ns()
+        with self._lock:
+            for tag in tags:
+                self._tags[tag] = version
+
+    def _remove(self, key):
+        value, expires_at, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[1] > time.time()
+
+    def stats(self):
+        """Counters and current occupancy for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+
+class SharedQueryCache:
+    """
+    Query cache stored in a Django cache backend shared by all workers
+    
+    Same interface as QueryCache. Entries are stored as pickled bytes; the
+    decoded value of the bytes last seen for each key is kept locally and
+    reused while the shared bytes are unchanged.
+    """
+
+    def __init__(self, alias, default_ttl=DEFAULT_TTL):
+        from django.core.cache import caches
+        self.alias = alias
+        self.default_ttl = default_ttl
+        self._backend = caches[alias]
+        # key -> (pickled bytes, decoded value), bounded like the local cache
+        self._decoded = QueryCache(default_ttl=default_ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.decodes = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired"""
+        raw = self._backend.get(key)
+        if raw is None:
+            self._count('misses')
+            self._decoded.delete(key)
+            return None
+        self._count('hits')
+        
+        seen = self._decoded.get(key)
+        if seen is not None and seen[0] == raw:
+            return seen[1]
+        
+        value = pickle.loads(raw)
+        self._count('decodes')
+        self._decoded.set(key, (raw, value), size=len(raw))
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Cache value under key for ttl seconds (default_ttl when omitted)"""
+        ttl = self.default_ttl if ttl is None else ttl
+        raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._backend.set(key, raw, timeout=ttl)
+        self._decoded.set(key, (raw, value), ttl, size=len(raw))
+
+    def delete(self, key):
+        """Drop key from the shared cache"""
+        self._backend.delete(key)
+        self._decoded.delete(key)
+
+    def clear(self):
+        """Drop every entry in the shared cache"""
+        self._backend.clear()
+        self._decoded.clear()
+
+    def tag_versions(self, tags):
+        """Current version of each tag (0 for tags never invalidated)"""
+        tags = list(tags)
+        stored = self._backend.get_many([f'tag:{tag}' for tag in tags])
+        return {tag: stored.get(f'tag:{tag}', 0) for tag in tags}
+
+    def bump_tags(self, tags):
+        """Give each tag a new version, invalidating entries stored under it"""
+        # Versions never expire: a forgotten version would revive old entries
+        version = time.time_ns()
+        self._backend.set_many({f'tag:{tag}': version for tag in tags}, timeout=None)
+
+    def stats(self):
+        """Counters for this worker's use of the shared cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.alias,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+                'decodes': self.decodes,
+                'decoded_entries': self._decoded.stats()['entries']
+            }
+
+
+def _build_query_cache():
+    """Use the shared Django cache when one is configured, else an in-process cache"""
+    alias = getattr(settings, 'QUERY_CACHE_ALIAS', None)
+    if alias:
+        return SharedQueryCache(alias)
+    return QueryCache()
+
+
+# The cache shared by all view modules
+query_cache = _build_query_cache()
+
+
+_counts = {
+    'invalidations': 0,
+    'stale_entries': 0,
+    'empty_hits': 0,
+    'not_found_hits': 0,
+    'empty_stored': 0,
+    'not_found_stored': 0
+}
+_counts_lock = threading.Lock()
+
+
+def _count(name):
+    with _counts_lock:
+        _counts[name] += 1
+
+
+def _is_empty(result):
+    return isinstance(result, (list, dict, tuple)) and not result
+
+
+def get_cached_entry(cache_key):
+    """
+    Look up cache_key, returning (result, fresh_until) or None on a miss
+    
+    fresh_until is None for ordinary entries. For entries stored with
+    max_stale it is the time after which the result is stale: still served,
+    but due for a refresh.
+    """
+    entry = query_cache.get(cache_key)
+    if entry is None:
+        return None
+    if isinstance(entry, TaggedEntry):
+        if entry.tag_versions and query_cache.tag_versions(entry.tag_versions) != entry.tag_versions:
+            _count('stale_entries')
+            query_cache.delete(cache_key)
+            return None
+        value, fresh_until = entry.value, entry.fresh_until
+    else:
+        value, fresh_until = entry, None
+    
+    if value is NOT_FOUND:
+        _count('not_found_hits')
+    elif _is_empty(value):
+        _count('empty_hits')
+    return value, fresh_until
+
+
+def get_cached_result(cache_key):
+    """
+    Get cached result if it exists, hasn't expired and none of its tags were invalidated
+    
+    Returns None on a miss. Cached empty results come back as they were
+    stored and cached not-found lookups as NOT_FOUND.
+    """
+    entry = get_cached_entry(cache_key)
+    return entry[0] if entry is not None else None
+
+
+def tag_versions(tags):
+    """
+    Snapshot the current versions of tags
+    
+    Take the snapshot before loading data and pass it to set_cached_result,
+    so a write that lands while the load is running still invalidates it.
+    """
+    return query_cache.tag_versions(tags)
+
+
+def set_cached_result(cache_key, result, ttl=None, tags=(), versions=None, max_stale=None):
+    """
+    Cache a result for ttl seconds (QUERY_CACHE_DEFAULT_TTL when omitted)
+    
+    The entry is dropped early when invalidate() is called for any of `tags`.
+    A None result records a not-found lookup (NOT_FOUND); it and empty
+    results are kept for at most NOT_FOUND_TTL / EMPTY_TTL seconds.
+    With max_stale, the entry outlives its ttl by up to max_stale seconds
+    so it can be served stale while a refresh runs (see cache_refresh).
+    """
+    if ttl is None:
+        ttl = DEFAULT_TTL
+    if result is None or result is NOT_FOUND:
+        result = NOT_FOUND
+        ttl = min(ttl, NOT_FOUND_TTL)
+        _count('not_found_stored')
+    elif _is_empty(result):
+        ttl = min(ttl, EMPTY_TTL)
+        _count('empty_stored')
+    
+    if not tags and not max_stale:
+        query_cache.set(cache_key, result, ttl)
+        return
+    if versions is None:
+        versions = query_cache.tag_versions(tags)
+    
+    entry = TaggedEntry(result, {tag: versions.get(tag, 0) for tag in tags})
+    if max_stale:
+        entry = entry._replace(fresh_until=time.time() + ttl)
+        ttl += max_stale
+    query_cache.set(cache_key, entry, ttl)
+
+
+def delete_cached_result(cache_key):
+    """Remove a cached result, e.g. after the underlying data changed"""
+    query_cache.delete(cache_key)
+
+
+def invalidate(tags):
+    """Invalidate every cached result tagged with any of `tags`"""
+    tags = [tag for tag in tags if tag]
+    if tags:
+        query_cache.bump_tags(tags)
+        _count('invalidations')
+
+
+def cache_stats():
+    """Query cache counters including tag invalidation activity"""
+    stats = query_cache.stats()
+    with _counts_lock:
+        stats.update(_counts)
+    return stats
@@ -0,0 +1,104 @@
+"""
+Schema-aware row mapping for Databricks statement results
+
+The SQL Statement Execution API returns rows as positional lists of strings
+alongside a manifest describing every column. This module turns those rows
+into lightweight named records so views can read `row.tournament_id`
+instead of `row[9]`, and coerces values to Python types in one pass.
+
+A converter is compiled once per result schema and cached, so mapping a
+large result is a single tight loop over the rows.
+"""
+
+import keyword
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+
+INTEGER_TYPES = {'TINYINT', 'BYTE', 'SMALLINT', 'SHORT', 'INT', 'INTEGER', 'BIGINT', 'LONG'}
+FLOAT_TYPES = {'FLOAT', 'REAL', 'DOUBLE', 'DECIMAL'}
+BOOLEAN_TYPES = {'BOOLEAN'}
+
+
+def _to_int(value):
+    return None if value is None else int(value)
+
+
+def _to_float(value):
+    return None if value is None else float(value)
+
+
+def _to_bool(value):
+    if value is None or isinstance(value, bool):
+        return value
+    return value == 'true'
+
+
+def _passthrough(value):
+    return value
+
+
+def _converter_for(type_name):
+    """Pick the coercion function for a manifest type_name"""
+    type_name = (type_name or '').upper()
+    if type_name in INTEGER_TYPES:
+        return _to_int
+    if type_name in FLOAT_TYPES:
+        return _to_float
+    if type_name in BOOLEAN_TYPES:
+        return _to_bool
+    return _passthrough
+
+
+def _field_name(name):
+    """Turn a column name such as `Player Name` into a valid attribute name"""
+    field = re.sub(r'\W', '_', name.strip())
+    if not field or field[0].isdigit() or keyword.iskeyword(field):
+        field = f'col_{field}'
+    return field
+
+
+@lru_cache(maxsize=256)
+def _compile(schema, coerce, keep_raw):
+    """Build the record type and row converter for one result schema"""
+    Record = namedtuple('Record', [_field_name(name) for name, _ in schema], rename=True)
+    
+    namespace = {'Record': Record}
+    arguments = []
+    for index, (name, type_name) in enumerate(schema):
+        converter = _converter_for(type_name) if coerce and name not in keep_raw else _passthrough
+        if converter is _passthrough:
+            arguments.append(f'row[{index}]')
+        else:
+            namespace[f'_c{index}'] = converter
+            arguments.append(f'_c{index}(row[{index}])')
+    
+    source = f"def convert(row):\n    return Record({', '.join(arguments)})\n"
+    exec(source, namespace)
+    return Record, namespace['convert']
+
+
+def record_converter(columns, coerce=True, keep_raw=()):
+    """
+    Return (Record, convert) for the manifest columns of a result
+    
+    Args:
+        columns: manifest['schema']['columns'] from a statement response
+        coerce: convert numeric and boolean columns from their JSON strings
+        keep_raw: column names to pass through untouched, e.g. identifiers
+            whose string form is part of an API response
+    """
+    ordered = sorted(columns, key=lambda column: column.get('position', 0))
+    schema = tuple((column['name'], column.get('type_name')) for column in ordered)
+    return _compile(schema, coerce, tuple(keep_raw))
+
+
+def map_records(response, coerce=True, keep_raw=()):
+    """Map the rows of a statement response to a list of named records"""
+    if not response or 'manifest' not in response:
+        return []
+    
+    _, convert = record_converter(response['manifest']['schema']['columns'], coerce, keep_raw)
+    rows = (response.get('result') or {}).get('data_array') or []
+    return [convert(row) for row in rows]
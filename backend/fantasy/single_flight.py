@@ -0,0 +1,93 @@
+"""
+Single-flight request coalescing
+
+When many requests ask for the same thing at the same moment (every drafter's
+browser loading the player pool as the draft opens), only the first caller
+does the work. Callers arriving while it is in flight wait for it and share
+its result or its exception. Nothing is remembered once the call finishes;
+pair this with a cache to also serve later callers.
+
+Coalescing is per process: each worker still sends its own request.
+"""
+
+import json
+import re
+import threading
+
+
+class _Call:
+    """One in-flight call and the callers waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run at most one call per key at a time and share its outcome"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Call fn() unless a call for `key` is already running, in which case
+        wait for that call and return its result (or raise its exception)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self.executed += 1
+            else:
+                call.waiters += 1
+                leader = False
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        """Counts of calls executed, calls that shared another's result, and calls in flight"""
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            'executed': self.executed,
+            'coalesced': self.coalesced,
+            'in_flight': in_flight
+        }
+
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_key(*parts, sql, params=None):
+    """
+    Key identifying a SQL statement and its parameters
+
+    Whitespace is normalized so the same template formatted with different
+    indentation still coalesces. Leading parts (warehouse id, result format)
+    keep otherwise identical statements apart.
+    """
+    normalized = _WHITESPACE.sub(' ', sql).strip()
+    return (*parts, normalized, json.dumps(params, sort_keys=True, default=str))
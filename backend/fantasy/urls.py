@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import user_leagues, league_teams, join_league, team_statistics, rugby_players, complete_draft, get_team_players, update_player_position, start_draft, get_draft_status, waiver_claims, process_waivers, trade_proposals, respond_to_trade, tournaments, chat_messages, chat_participants, update_read_status, tournament_availability, league_fixtures, next_matchup, invite_to_league
+from .views import user_leagues, league_teams, join_league, team_statistics, rugby_players, search_players, complete_draft, get_team_players, update_player_position, start_draft, get_draft_status, submit_draft_pick, draft_events, waiver_claims, process_waivers, trade_proposals, respond_to_trade, tournaments, chat_messages, chat_participants, update_read_status, tournament_availability, league_fixtures, next_matchup, invite_to_league
 from .admin_views import remove_team_from_league, get_league_admin, is_user_league_admin
 from .authentication import register, login, refresh_token, verify_token, logout, request_password_reset, confirm_password_reset
 from .views.draft_views import debug_database
+from .views.debug_views import runtime_stats
 
 urlpatterns = [
     # REST API endpoints
@@ -12,6 +13,7 @@ urlpatterns = [
     path('league-teams/', league_teams, name='league_teams'),
     path('team-statistics/', team_statistics, name='team_statistics'),
     path('rugby-players/', rugby_players, name='rugby_players'),
+    path('rugby-players/search/', search_players, name='search_players'),
     path('tournaments/', tournaments, name='tournaments'),
     path('tournament-availability/', tournament_availability, name='tournament_availability'),
     path('league-fixtures/', league_fixtures, name='league_fixtures'),
@@ -19,6 +21,8 @@ urlpatterns = [
     path('leagues/<int:league_id>/complete-draft/', complete_draft, name='complete_draft'),
     path('leagues/<int:league_id>/start-draft/', start_draft, name='start_draft'),
     path('leagues/<int:league_id>/draft-status/', get_draft_status, name='get_draft_status'),
+    path('leagues/<int:league_id>/draft-picks/', submit_draft_pick, name='submit_draft_pick'),
+    path('leagues/<int:league_id>/draft-events/', draft_events, name='draft_events'),
     path('leagues/<int:league_id>/waiver-claims/', waiver_claims, name='waiver_claims'),
     path('leagues/<int:league_id>/process-waivers/', process_waivers, name='process_waivers'),
     path('leagues/<int:league_id>/trades/', trade_proposals, name='trade_proposals'),
@@ -43,4 +47,5 @@ urlpatterns = [
     path('auth/password-reset/confirm/', confirm_password_reset, name='confirm_password_reset'),
     # Debug endpoints
     path('debug/database/', debug_database, name='debug_database'),
+    path('debug/runtime-stats/', runtime_stats, name='runtime_stats'),
 ]
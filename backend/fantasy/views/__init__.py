@@ -10,14 +10,15 @@ This package contains all the REST API view modules organized by functionality:
 - trade_views: Trade functionality
 - tournament_views: Tournament data
 - chat_views: Chat functionality
+- debug_views: Runtime diagnostics
 - utils: Shared utilities and caching
 """
 
 # Import all view functions for easy access
 from .league_views import user_leagues, league_teams
 from .team_views import join_league, team_statistics
-from .player_views import rugby_players, get_team_players, update_player_position
-from .draft_views import complete_draft, start_draft, get_draft_status
+from .player_views import rugby_players, search_players, get_team_players, update_player_position
+from .draft_views import complete_draft, start_draft, get_draft_status, submit_draft_pick, draft_events
 from .waiver_views import waiver_claims, process_waivers
 from .trade_views import trade_proposals, respond_to_trade
 from .tournament_views import tournaments
@@ -31,11 +32,14 @@ __all__ = [
     'join_league',
     'team_statistics',
     'rugby_players',
+    'search_players',
     'get_team_players',
     'update_player_position',
     'complete_draft',
     'start_draft',
     'get_draft_status',
+    'submit_draft_pick',
+    'draft_events',
     'waiver_claims',
     'process_waivers',
     'trade_proposals',
@@ -8,7 +8,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from ..databricks_rest_client import DatabricksRestClient
-from .utils import get_cached_result, set_cached_result
+from .utils import cached_response, get_or_load_cached_result, invalidate, statement_rows
 import json
 from datetime import datetime
 
@@ -106,7 +106,7 @@ def chat_messages(request, league_id):
                 LIMIT 1
                 """
                 
-                message_result = client.execute_sql(get_message_sql)
+                message_result = client.execute_sql(get_message_sql, coalesce=False)
                 
                 if message_result and 'result' in message_result and message_result['result'].get('data_array'):
                     row = message_result['result']['data_array'][0]
@@ -147,20 +147,18 @@ def chat_participants(request, league_id):
         client = DatabricksRestClient()
         
         if request.method == 'GET':
-            sql = f"""
-            SELECT cp.id, cp.league_id, cp.user_id, cp.joined_at, cp.last_read_at, cp.is_active,
-                   lt.team_name
-            FROM default.chat_participants cp
-            LEFT JOIN default.league_teams lt ON cp.user_id = lt.team_owner_user_id AND cp.league_id = lt.league_id
-            WHERE cp.league_id = {league_id} AND (cp.is_active = true OR cp.is_active IS NULL)
-            ORDER BY cp.joined_at ASC
-            """
-            
-            result = client.execute_sql(sql)
-            
-            if result and 'result' in result and result['result'].get('data_array'):
+            def load_participants():
+                sql = f"""
+                SELECT cp.id, cp.league_id, cp.user_id, cp.joined_at, cp.last_read_at, cp.is_active,
+                       lt.team_name
+                FROM default.chat_participants cp
+                LEFT JOIN default.league_teams lt ON cp.user_id = lt.team_owner_user_id AND cp.league_id = lt.league_id
+                WHERE cp.league_id = {league_id} AND (cp.is_active = true OR cp.is_active IS NULL)
+                ORDER BY cp.joined_at ASC
+                """
+                
                 participants = []
-                for row in result['result']['data_array']:
+                for row in statement_rows(client.execute_sql(sql)):
                     participants.append({
                         'id': row[0],
                         'league_id': row[1],
@@ -171,10 +169,14 @@ def chat_participants(request, league_id):
                         'username': row[6] or f'User {row[2]}',  # Use team name or fallback
                         'email': None
                     })
-                
-                return Response({'participants': participants})
-            else:
-                return Response({'participants': []})
+                return {'participants': participants}
+            
+            # Team names come from league_teams, so league writes invalidate it too
+            cache_key = f'chat_participants_{league_id}'
+            participants = get_or_load_cached_result(
+                cache_key, load_participants, tags=[f'chat:{league_id}', f'league:{league_id}']
+            )
+            return cached_response(request, cache_key, participants)
         
         elif request.method == 'POST':
             # Add user to chat participants
@@ -210,6 +212,7 @@ def chat_participants(request, league_id):
                 result = client.execute_sql(insert_sql)
             
             if result and 'status' in result and result['status'].get('state') == 'SUCCEEDED':
+                invalidate([f'chat:{league_id}'])
                 return Response({'message': 'User added to chat participants'}, 
                               status=status.HTTP_201_CREATED)
             else:
@@ -238,6 +241,7 @@ def update_read_status(request, league_id, user_id):
         result = client.execute_sql(sql)
         
         if result and 'status' in result and result['status'].get('state') == 'SUCCEEDED':
+            invalidate([f'chat:{league_id}'])
             return Response({'message': 'Read status updated'})
         else:
             return Response({'error': f'Failed to update read status: {result}'}, 
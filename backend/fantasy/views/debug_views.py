@@ -0,0 +1,40 @@
+"""
+Diagnostics views for Fantasy Rugby API
+
+This module exposes runtime statistics for the current worker process:
+- Databricks connection pool usage
+- Query result cache occupancy, hit rates and tag invalidations
+- Request coalescing for Databricks reads and cache loads
+- Background refresh of stale-while-revalidate cache entries
+- The in-memory player catalog snapshot
+"""
+
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from ..databricks_rest_client import get_pool_stats, statement_flight
+from ..result_cache import cache_stats
+from ..cache_refresh import refresher
+from ..player_catalog import catalog_stats
+from .utils import cache_flight
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def runtime_stats(request):
+    """
+    Get runtime statistics for this worker
+    
+    Returns connection pool figures so connection reuse can be monitored,
+    query cache occupancy and hit rates, how many statements and cache
+    loads were shared between requests, background refresh activity and
+    the loaded player catalog version.
+    """
+    return Response({
+        'databricks_pool': get_pool_stats(),
+        'query_cache': cache_stats(),
+        'statement_coalescing': statement_flight.stats(),
+        'cache_load_coalescing': cache_flight.stats(),
+        'cache_refresh': refresher.stats(),
+        'player_catalog': catalog_stats()
+    })
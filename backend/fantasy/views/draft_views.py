@@ -5,14 +5,53 @@ This module handles all draft-related operations including:
 - Starting drafts
 - Completing drafts
 - Draft status tracking
+- Pick submission to the server-side draft engine
+- Live draft events pushed over Server-Sent Events
 """
 
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from ..databricks_rest_client import DatabricksRestClient
-from .utils import get_cached_result, set_cached_result
+from .. import draft_engine, draft_stream
+from ..renderers import EventStreamRenderer
+from .utils import cached_response, compressed_response, get_or_load_cached_result, statement_rows
+
+# Draft status of a league that is not found (or has no status yet)
+DRAFT_NOT_STARTED = {'draft_status': 'NOT_STARTED'}
+
+
+def _league_draft(client, league_id):
+    """
+    (engine draft or None, status cache key, draft status) of a league
+    
+    The league's stored draft status wins over the engine: an engine draft
+    is only returned while the league is LIVE (or once the engine itself
+    made the last pick), and a draft held in memory that was finished
+    elsewhere, e.g. by the browser posting its rosters, is ended. Nothing
+    here runs the pick clock.
+    """
+    cache_key = f'draft_status_{league_id}'
+    
+    def load_draft_status():
+        rows = statement_rows(client.execute_named('draft_status_by_league', {'league_id': league_id}))
+        # None marks an unknown league; it is cached briefly as not found
+        return {'draft_status': rows[0][0]} if rows else None
+    
+    draft_status = get_or_load_cached_result(cache_key, load_draft_status, tags=[f'league:{league_id}']) or DRAFT_NOT_STARTED
+    stored_status = draft_status.get('draft_status')
+    if stored_status == 'LIVE':
+        # None when the draft is run in the browser, not by the engine
+        return draft_engine.get_draft(client, league_id, clock=False), cache_key, draft_status
+    
+    draft = draft_engine.get_draft(client, league_id, load=False, clock=False)
+    if draft is not None and draft.status == 'LIVE':
+        draft_engine.end_draft(league_id, stored_status or 'COMPLETED')
+    if draft is not None and len(draft.picks) >= draft.total_picks:
+        return draft, cache_key, draft_status
+    return None, cache_key, draft_status
 
 
 @api_view(['GET'])
@@ -37,7 +76,8 @@ def debug_database(request):
                 player_id BIGINT,
                 position STRING,
                 fantasy_position STRING,
-                is_starting BOOLEAN
+                is_starting BOOLEAN,
+                draft_id STRING
             )
             """
             create_result = client.execute_sql(create_table_sql)
@@ -84,78 +124,41 @@ def debug_database(request):
 def complete_draft(request, league_id):
     """
     Complete the draft by saving all team rosters
+    
+    Drafts run by the draft engine save their rosters when the last pick is
+    made, so this only has to confirm them, or save them again if that
+    save failed. Drafts run in the browser post
+    their rosters as team_rosters. Saving is idempotent: posting the same
+    rosters again (e.g. a retry after a timeout) leaves team_players as it is.
     """
     try:
         data = request.data
         team_rosters = data.get('team_rosters', [])
         
-        if not team_rosters:
-            return Response({'error': 'Team rosters are required'}, status=status.HTTP_400_BAD_REQUEST)
-        
         client = DatabricksRestClient()
         
-        # Clear existing team players for this league
-        clear_sql = f"""
-        DELETE FROM default.team_players 
-        WHERE team_id IN (
-            SELECT id FROM default.league_teams WHERE league_id = {league_id}
-        )
-        """
-        clear_result = client.execute_sql(clear_sql)
-        
-        # Insert new team rosters using batch insert for better performance
-        all_insert_values = []
-        
-        for team_roster in team_rosters:
-            team_id = team_roster.get('team_id')
-            players = team_roster.get('players', [])
-            
-            if not team_id or not players:
-                continue
-            
-            for player in players:
-                player_id = player.get('id')
-                position = player.get('position', '')
-                fantasy_position = player.get('fantasy_position', '')
-                is_starting = player.get('is_starting', False)
-                
-                if not player_id:
-                    continue
-                
-                # Escape single quotes in string values
-                position_escaped = position.replace("'", "''")
-                fantasy_position_escaped = fantasy_position.replace("'", "''")
-                
-                all_insert_values.append(f"({team_id}, {player_id}, '{position_escaped}', '{fantasy_position_escaped}', {str(is_starting).lower()})")
-        
-        # Batch insert all players at once
-        if all_insert_values:
-            batch_insert_sql = f"""
-            INSERT INTO default.team_players (team_id, player_id, position, fantasy_position, is_starting)
-            VALUES {', '.join(all_insert_values)}
-            """
-            
-            result = client.execute_sql(batch_insert_sql)
-            
-            if not result or 'status' not in result or result['status'].get('state') != 'SUCCEEDED':
-                return Response({'error': f'Failed to save team rosters: {result}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        # Update league draft status to COMPLETED
-        update_sql = f"""
-        UPDATE default.user_created_leagues 
-        SET draft_status = 'COMPLETED' 
-        WHERE id = {league_id}
-        """
-        update_result = client.execute_sql(update_sql)
+        if not team_rosters:
+            draft = draft_engine.get_draft(client, league_id, clock=False)
+            if draft is None:
+                return Response({'error': 'Team rosters are required'}, status=status.HTTP_400_BAD_REQUEST)
+            # Saves the rosters again if the save after the last pick failed
+            players_inserted = draft_engine.finish_draft(client, draft)
+            return Response({
+                'message': 'Draft completed successfully',
+                'players_inserted': players_inserted
+            }, status=status.HTTP_200_OK)
         
-        if not update_result or 'status' not in update_result or update_result['status'].get('state') != 'SUCCEEDED':
-            return Response({'error': f'Failed to update draft status: {update_result}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # The browser ran this draft: stop the engine's clock before its rosters land
+        draft_engine.end_draft(league_id)
+        players_inserted = draft_engine.save_rosters(client, league_id, team_rosters)
         
         return Response({
             'message': 'Draft completed successfully',
-            'players_inserted': len(all_insert_values)
+            'players_inserted': players_inserted
         }, status=status.HTTP_200_OK)
         
+    except draft_engine.DraftError as e:
+        return Response({'error': str(e)}, status=e.status_code)
     except Exception as e:
         print(f"ERROR in complete_draft: {str(e)}")
         import traceback
@@ -172,23 +175,25 @@ def complete_draft(request, league_id):
 def start_draft(request, league_id):
     """
     Start the draft for a league
+    
+    Optional body: draft_order (team ids in first-round order; defaults to
+    teams by id). Starting a draft that is already live returns it as is.
     """
     try:
         client = DatabricksRestClient()
         
-        # Update league draft status to LIVE
-        sql = f"""
-        UPDATE default.user_created_leagues 
-        SET draft_status = 'LIVE' 
-        WHERE id = {league_id}
-        """
-        result = client.execute_sql(sql)
+        draft = draft_engine.start_draft(client, league_id, order=request.data.get('draft_order'))
+        if draft is None:
+            # No draft engine tables yet: the browser runs the draft
+            return Response({'message': 'Draft started successfully'}, status=status.HTTP_200_OK)
         
-        if not result or 'status' not in result or result['status'].get('state') != 'SUCCEEDED':
-            return Response({'error': f'Failed to start draft: {result}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        return Response({'message': 'Draft started successfully'}, status=status.HTTP_200_OK)
+        return Response({
+            'message': 'Draft started successfully',
+            'draft': draft.snapshot()
+        }, status=status.HTTP_200_OK)
         
+    except draft_engine.DraftError as e:
+        return Response({'error': str(e)}, status=e.status_code)
     except Exception as e:
         print(f"ERROR in start_draft: {str(e)}")
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -199,29 +204,116 @@ def start_draft(request, league_id):
 def get_draft_status(request, league_id):
     """
     Get the current draft status for a league
+    
+    Live and finished engine drafts also return the draft state under
+    'draft'; pass after=<pick number> to receive only later picks.
     """
     try:
         client = DatabricksRestClient()
         
-        # Check cache first
-        cache_key = f'draft_status_{league_id}'
-        cached_result = get_cached_result(cache_key)
-        if cached_result:
-            return Response(cached_result)
+        draft, cache_key, draft_status = _league_draft(client, league_id)
+        if draft is None:
+            return cached_response(request, cache_key, draft_status)
         
-        sql = f"SELECT draft_status FROM default.user_created_leagues WHERE id = {league_id}"
-        result = client.execute_sql(sql)
+        try:
+            after = int(request.GET.get('after') or 0)
+        except ValueError:
+            return Response({'error': 'after must be a pick number'}, status=status.HTTP_400_BAD_REQUEST)
+        if after < 0:
+            return Response({'error': 'after must be a pick number'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if result and 'result' in result and result['result'].get('data_array'):
-            draft_status = result['result']['data_array'][0][0]
-            response_data = {'draft_status': draft_status}
-            
-            # Cache the result
-            set_cached_result(cache_key, response_data)
-            return Response(response_data)
-        else:
-            return Response({'draft_status': 'NOT_STARTED'})
+        with draft.lock:
+            draft_data = draft.snapshot(after=after)
+        return compressed_response(request, {'draft_status': draft_data['status'], 'draft': draft_data})
             
+    except draft_engine.DraftError as e:
+        return Response({'error': str(e)}, status=e.status_code)
     except Exception as e:
         print(f"ERROR in get_draft_status: {str(e)}")
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _submit_pick(request, league_id):
+    """Make the pick in request.data; the response shared by both pick endpoints"""
+    data = request.data
+    team_id = data.get('team_id')
+    player_id = data.get('player_id')
+    
+    if not team_id or not player_id:
+        return Response({'error': 'team_id and player_id are required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    client = DatabricksRestClient()
+    draft = draft_engine.get_draft(client, league_id)
+    if draft is None:
+        return Response({'error': f'League {league_id} has no draft in progress'}, status=status.HTTP_404_NOT_FOUND)
+    
+    user_id = data.get('user_id')
+    team = draft.teams.get(int(team_id))
+    if user_id and team and str(team['owner_user_id']) != str(user_id):
+        return Response({'error': 'You can only pick for your own team'}, status=status.HTTP_403_FORBIDDEN)
+    
+    draft, pick = draft_engine.submit_pick(client, league_id, team_id, player_id)
+    with draft.lock:
+        draft_data = draft.snapshot(after=pick['pick_number'])
+    
+    return Response({
+        'pick': pick,
+        # Id of the pick's event on the draft's event stream
+        'event_id': draft.event_id(2 * pick['pick_number'] + 1),
+        'draft': draft_data
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def submit_draft_pick(request, league_id):
+    """
+    Draft a player for the team on the clock
+    
+    Body: team_id, player_id and optionally user_id (checked against the
+    team's owner). Returns the pick, its event id and the updated draft
+    state.
+    """
+    try:
+        return _submit_pick(request, league_id)
+        
+    except draft_engine.DraftError as e:
+        return Response({'error': str(e)}, status=e.status_code)
+    except Exception as e:
+        print(f"ERROR in submit_draft_pick: {str(e)}")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+@renderer_classes(api_settings.DEFAULT_RENDERER_CLASSES + [EventStreamRenderer])
+def draft_events(request, league_id):
+    """
+    Push channel of a league's draft
+    
+    GET opens a Server-Sent Events stream of status, pick and clock events
+    (see draft_stream); reconnecting clients resume after the id in their
+    Last-Event-ID header (or ?last_event_id=). Leagues without a live
+    engine draft get their draft status and are asked to check back.
+    
+    POST submits a pick on the same channel, as draft-picks does; the pick
+    also reaches every open stream of the draft.
+    """
+    try:
+        if request.method == 'POST':
+            return _submit_pick(request, league_id)
+        
+        client = DatabricksRestClient()
+        
+        draft, _, draft_status = _league_draft(client, league_id)
+        if draft is None:
+            return draft_stream.status_stream_response({'status': draft_status.get('draft_status')})
+        
+        last_event_id = request.META.get('HTTP_LAST_EVENT_ID') or request.GET.get('last_event_id')
+        return draft_stream.event_stream_response(request, client, draft, last_event_id)
+        
+    except draft_engine.DraftError as e:
+        return Response({'error': str(e)}, status=e.status_code)
+    except Exception as e:
+        print(f"ERROR in draft_events: {str(e)}")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -12,7 +12,23 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from ..databricks_rest_client import DatabricksRestClient
-from .utils import get_cached_result, set_cached_result
+from .utils import cached_response, get_or_load_cached_result, invalidate
+
+
+def _league_to_dict(league):
+    """Build the API representation of a user_created_leagues record"""
+    return {
+        'id': league.id,
+        'name': league.name,
+        'description': league.description,
+        'created_by': league.created_by_user_id,
+        'max_teams': league.max_teams,
+        'max_players_per_team': league.max_players_per_team,
+        'is_public': league.is_public,
+        'tournament_id': league.tournament_id,
+        'created_at': league.created_at,
+        'draft_status': league.draft_status
+    }
 
 
 @api_view(['GET', 'POST'])
@@ -28,34 +44,13 @@ def user_leagues(request):
         try:
             client = DatabricksRestClient()
             
-            # Check cache first
-            cache_key = 'user_leagues'
-            cached_result = get_cached_result(cache_key)
-            if cached_result:
-                return Response(cached_result)
-            
-            result = client.execute_sql("SELECT * FROM default.user_created_leagues")
-            if result and 'result' in result and result['result'].get('data_array'):
-                leagues = []
-                for row in result['result']['data_array']:
-                    leagues.append({
-                        'id': row[0],
-                        'name': row[1],
-                        'description': row[2],
-                        'created_by': row[3],
-                        'max_teams': row[4],
-                        'max_players_per_team': row[5],
-                        'is_public': row[6],
-                        'tournament_id': row[9],
-                        'created_at': row[7],
-                        'draft_status': row[8]
-                    })
-                
-                # Cache the result
-                set_cached_result(cache_key, leagues)
-                return Response(leagues)
-            else:
-                return Response([])
+            # Map by column name: the physical column order of this table has
+            # drifted over time (tournament_id was added after draft_status)
+            leagues = get_or_load_cached_result('user_leagues', lambda: [
+                _league_to_dict(league)
+                for league in client.named_records('all_leagues', coerce=False)
+            ], tags=['leagues'])
+            return Response(leagues)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
@@ -77,35 +72,26 @@ def user_leagues(request):
             if not tournament_id:
                 return Response({'error': 'Tournament ID is required to create a league'}, status=status.HTTP_400_BAD_REQUEST)
             
-            is_public_sql = 'true' if is_public else 'false'
-            
-            sql = f"""
-            INSERT INTO default.user_created_leagues (name, description, created_by_user_id, max_teams, max_players_per_team, is_public, created_at, draft_status, tournament_id)
-            VALUES ('{name}', '{description}', {user_id}, {max_teams}, {max_players_per_team}, {is_public_sql}, CURRENT_TIMESTAMP, 'NOT_STARTED', {tournament_id})
-            """
-            result = client.execute_sql(sql)
+            result = client.execute_named('create_league', {
+                'name': name,
+                'description': description,
+                'user_id': user_id,
+                'max_teams': max_teams,
+                'max_players_per_team': max_players_per_team,
+                'is_public': bool(is_public),
+                'tournament_id': tournament_id
+            })
             
             if not result or 'status' not in result or result['status'].get('state') != 'SUCCEEDED':
                 return Response({'error': f'Failed to create league: {result}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-            get_sql = f"SELECT * FROM default.user_created_leagues WHERE name = '{name}' ORDER BY created_at DESC LIMIT 1"
-            league_result = client.execute_sql(get_sql)
-            
-            if league_result and 'result' in league_result and league_result['result'].get('data_array'):
-                row = league_result['result']['data_array'][0]
-                league = {
-                    'id': row[0],
-                    'name': row[1],
-                    'description': row[2],
-                    'created_by': row[3],
-                    'max_teams': row[4],
-                    'max_players_per_team': row[5],
-                    'is_public': row[6],
-                    'tournament_id': row[9],
-                    'created_at': row[7],
-                    'draft_status': row[8]
-                }
-                return Response(league, status=status.HTTP_201_CREATED)
+            invalidate(['leagues'])
+            
+            # Must see the insert above, so never shares an in-flight lookup
+            created = client.named_records('latest_league_by_name', {'name': name}, coerce=False, coalesce=False)
+            
+            if created:
+                return Response(_league_to_dict(created[0]), status=status.HTTP_201_CREATED)
             else:
                 return Response({'error': 'Failed to retrieve created league'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
                 
@@ -132,46 +118,34 @@ def league_teams(request):
             
             client = DatabricksRestClient()
             
-            # Build SQL query based on parameters
+            # Pick the query template based on parameters
             if league_id:
-                sql = f"SELECT * FROM default.league_teams WHERE league_id = {league_id}"
-                cache_key = f'league_teams_{league_id}'
+                query_name, params = 'teams_by_league', {'league_id': league_id}
+                cache_key, tags = f'league_teams_{league_id}', [f'league:{league_id}']
             else:  # user_id
-                sql = f"SELECT * FROM default.league_teams WHERE team_owner_user_id = {user_id}"
-                cache_key = f'user_teams_{user_id}'
-            
-            # Check cache first
-            cached_result = get_cached_result(cache_key)
-            if cached_result:
-                return Response(cached_result)
+                query_name, params = 'teams_by_owner', {'user_id': user_id}
+                cache_key, tags = f'user_teams_{user_id}', [f'user:{user_id}']
             
             print("=" * 80)
             print("DEBUG: league_teams() called with method: GET")
             print("=" * 80)
             
-            print(f"DEBUG: About to execute SQL query: {sql}")
-            
-            result = client.execute_sql(sql)
-            print(f"DEBUG: SQL query completed, got result: {result is not None}")
-            
-            if result and 'result' in result and result['result'].get('data_array'):
+            def load_teams():
+                print(f"DEBUG: About to execute query {query_name} with {params}")
                 teams = []
-                for row in result['result']['data_array']:
-                    team_name = row[2]  # team_name is the third column
-                    print(f"DEBUG: Retrieved team_name from DB: {team_name} (type: {type(team_name)})")
+                for team in client.named_records(query_name, params, coerce=False):
                     teams.append({
-                        'id': row[0],
-                        'league_id': row[1],
-                        'team_name': team_name,
-                        'team_owner_user_id': row[3]
+                        'id': team.id,
+                        'league_id': team.league_id,
+                        'team_name': team.team_name,
+                        'team_owner_user_id': team.team_owner_user_id
                     })
-                
-                # Cache the result
-                set_cached_result(cache_key, teams)
-                print("DEBUG: Cached league teams")
-                return Response(teams)
-            else:
-                return Response([])
+                print(f"DEBUG: SQL query completed, got {len(teams)} teams")
+                return teams
+            
+            # Cached even when empty; concurrent misses share one query
+            teams = get_or_load_cached_result(cache_key, load_teams, tags=tags)
+            return cached_response(request, cache_key, teams)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
@@ -187,15 +161,17 @@ def league_teams(request):
             
             client = DatabricksRestClient()
             
-            sql = f"""
-            INSERT INTO default.league_teams (league_id, team_name, team_owner_user_id)
-            VALUES ({league_id}, '{team_name}', {team_owner_user_id})
-            """
-            result = client.execute_sql(sql)
+            result = client.execute_named('create_team', {
+                'league_id': league_id,
+                'team_name': team_name,
+                'user_id': team_owner_user_id
+            })
             
             if not result or 'status' not in result or result['status'].get('state') != 'SUCCEEDED':
                 return Response({'error': f'Failed to create team: {result}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
+            invalidate([f'league:{league_id}', f'user:{team_owner_user_id}'])
+            
             return Response({'message': 'Team created successfully'}, status=status.HTTP_201_CREATED)
             
         except Exception as e:
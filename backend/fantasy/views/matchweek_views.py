@@ -12,7 +12,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from ..databricks_rest_client import DatabricksRestClient
-from .utils import get_cached_result, set_cached_result
+from .utils import cached_response, get_or_load_cached_result, statement_rows
 from datetime import datetime
 import random
 
@@ -28,34 +28,25 @@ def tournament_availability(request):
     try:
         client = DatabricksRestClient()
         
-        cache_key = 'tournament_availability'
-        cached_result = get_cached_result(cache_key)
-        if cached_result:
-            return Response(cached_result)
-        
-        # Get current date
-        current_date = datetime.now().strftime('%Y-%m-%d')
-        
-        # Query tournaments with weeks remaining
-        sql = f"""
-        SELECT 
-            t.Tournamen_ID,
-            t.Tournament,
-            COUNT(tw.`Week Date`) as total_weeks,
-            MIN(tw.`Week Date`) as first_week,
-            MAX(tw.`Week Date`) as last_week
-        FROM default.tournaments t
-        LEFT JOIN default.tournament_weeks tw ON t.Tournamen_ID = tw.Tournament_ID
-        GROUP BY t.Tournamen_ID, t.Tournament
-        ORDER BY t.Tournament
-        """
-        
-        result = client.execute_sql(sql)
-        
-        if result and 'result' in result and 'data_array' in result['result']:
-            available_tournaments = []
+        def load_available_tournaments():
+            # Query tournaments with weeks remaining
+            sql = f"""
+            SELECT 
+                t.Tournamen_ID,
+                t.Tournament,
+                COUNT(tw.`Week Date`) as total_weeks,
+                MIN(tw.`Week Date`) as first_week,
+                MAX(tw.`Week Date`) as last_week
+            FROM default.tournaments t
+            LEFT JOIN default.tournament_weeks tw ON t.Tournamen_ID = tw.Tournament_ID
+            GROUP BY t.Tournamen_ID, t.Tournament
+            ORDER BY t.Tournament
+            """
             
-            for row in result['result']['data_array']:
+            result = client.execute_sql(sql)
+            
+            available_tournaments = []
+            for row in statement_rows(result):
                 tournament_id, name, total_weeks, first_week, last_week = row
                 
                 # Calculate weeks remaining manually
@@ -77,13 +68,15 @@ def tournament_availability(request):
                         'last_week': last_week,
                         'is_available': True
                     })
-            
-            # Cache for 1 hour
-            set_cached_result(cache_key, available_tournaments, 3600)
-            
-            return Response(available_tournaments)
-        else:
-            return Response([])
+            return available_tournaments
+        
+        # Fresh for an hour; weeks remaining moves slowly, so serve it stale
+        # for up to another hour while it refreshes in the background
+        available_tournaments = get_or_load_cached_result(
+            'tournament_availability', load_available_tournaments,
+            tags=['tournaments'], ttl=3600, max_stale=3600
+        )
+        return cached_response(request, 'tournament_availability', available_tournaments)
             
     except Exception as e:
         return Response({
@@ -110,28 +103,9 @@ def league_fixtures(request):
                 'error': 'league_id is required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        sql = f"""
-        SELECT 
-            id,
-            week_number,
-            week_date,
-            home_team_id,
-            away_team_id,
-            home_team_name,
-            away_team_name,
-            home_team_points,
-            away_team_points,
-            is_playoff
-        FROM default.league_fixtures 
-        WHERE league_id = {league_id}
-        ORDER BY week_number, id
-        """
-        
-        result = client.execute_sql(sql)
-        
-        if result and 'result' in result and 'data_array' in result['result']:
+        def load_fixtures():
             fixtures = []
-            for row in result['result']['data_array']:
+            for row in statement_rows(client.execute_named('fixtures_by_league', {'league_id': league_id})):
                 fixtures.append({
                     'id': row[0],
                     'week_number': row[1],
@@ -144,10 +118,13 @@ def league_fixtures(request):
                     'away_team_points': row[8] if row[8] is not None else 0.0,
                     'is_playoff': row[9]
                 })
-            
-            return Response(fixtures)
-        else:
-            return Response([])
+            return fixtures
+        
+        # Polled by the matchups page; fixture writes invalidate the league,
+        # and the short ttl picks up scores written by the scoring jobs
+        cache_key = f'league_fixtures_{league_id}'
+        fixtures = get_or_load_cached_result(cache_key, load_fixtures, tags=[f'league:{league_id}'], ttl=60)
+        return cached_response(request, cache_key, fixtures)
             
     except Exception as e:
         return Response({
@@ -3,6 +3,7 @@ Player management views for Fantasy Rugby API
 
 This module handles all player-related operations including:
 - Retrieving rugby players
+- Player name search
 - Team player management
 - Player position updates
 """
@@ -12,90 +13,149 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from ..databricks_rest_client import DatabricksRestClient
-from .utils import get_cached_result, set_cached_result, query_cache
+from ..player_catalog import (
+    MAX_PAGE_SIZE, PLAYER_FIELDS, STAT_COLUMNS, catalog_snapshot, decode_cursor, encode_cursor,
+    get_player_catalog
+)
+from ..player_search import get_search_index
+from ..compression import accepted_renderer, body_response, render_body
+from .utils import get_or_load_cached_result, invalidate, statement_rows
+
+
+# Query parameters that switch /rugby-players/ from the full list to a page
+PAGE_PARAMS = ['position', 'fantasy_position', 'team', 'sort', 'fields', 'limit', 'cursor']
+DEFAULT_PAGE_SIZE = 50
+SEARCH_LIMIT = 20
+
+
+def _list_param(request, name):
+    """A comma-separated query parameter as a list, or None when absent"""
+    value = request.GET.get(name)
+    if not value:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _player_page(catalog, request, tournament_id):
+    """
+    One page of players for the filter, sort and projection parameters
+
+    Raises ValueError for parameters that cannot be served.
+    """
+    sort = request.GET.get('sort') or '-fantasy_points_per_game'
+    descending = sort.startswith('-')
+    by = sort.lstrip('-')
+    if by not in STAT_COLUMNS:
+        raise ValueError(f"Cannot sort by '{by}'; use one of: {', '.join(STAT_COLUMNS)}")
+
+    fields = _list_param(request, 'fields')
+    unknown = [field for field in fields or [] if field not in PLAYER_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    cursor = request.GET.get('cursor')
+    limit = request.GET.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    elif cursor:
+        limit = DEFAULT_PAGE_SIZE
+    after = decode_cursor(cursor, by, descending) if cursor else None
+
+    filters = {
+        'tournament_id': tournament_id,
+        'position': _list_param(request, 'position'),
+        'fantasy_position': _list_param(request, 'fantasy_position'),
+        'team': _list_param(request, 'team')
+    }
+    # The ordered selection is shared by every page of the same query
+    memo_key = ('player_order', by, descending) + tuple(
+        tuple(value) if isinstance(value, list) else value for value in filters.values()
+    )
+    ordered = catalog.memoize(memo_key, lambda: catalog.sort(catalog.select(**filters), by=by, descending=descending))
+
+    indices, last_key = catalog.page(ordered, by=by, descending=descending, after=after, limit=limit)
+    return {
+        'players': catalog.rows(indices, fields),
+        'count': len(ordered),
+        'next_cursor': encode_cursor(by, descending, last_key) if last_key else None,
+        'version': catalog.version
+    }
+
+
+def _player_delta(catalog, since, tournament_id):
+    """
+    Players changed since the catalog version a client holds
+
+    When that version is no longer (or never was) held by this process the
+    whole pool is sent with full=True and the client replaces its copy.
+    """
+    if since == catalog.version:
+        return {'version': catalog.version, 'since': since, 'full': False, 'players': [], 'removed': []}
+    older = catalog_snapshot(since)
+    if older is None:
+        players = catalog.rows(catalog.sort(catalog.select(tournament_id=tournament_id)))
+        return {'version': catalog.version, 'since': since, 'full': True, 'players': players, 'removed': []}
+    changed, removed = catalog.changes_since(older, tournament_id=tournament_id)
+    return {
+        'version': catalog.version,
+        'since': since,
+        'full': False,
+        'players': catalog.rows(changed),
+        'removed': removed
+    }
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def rugby_players(request):
-    """Get rugby players with fantasy points, optionally filtered by tournament"""
+    """
+    Get rugby players with fantasy points, optionally filtered by tournament
+
+    With no other parameters the whole pool is returned as a list. Any of
+    position, fantasy_position, team (comma-separated), sort (a stat column,
+    '-' prefix for descending), fields (comma-separated), limit or cursor
+    returns {'players', 'count', 'next_cursor', 'version'} instead; pass
+    next_cursor back as cursor to fetch the following page.
+
+    since=<version> (the version from an earlier response) returns only
+    the players changed since then plus the ids of removed players:
+    {'version', 'since', 'full', 'players', 'removed'}.
+    """
     try:
         client = DatabricksRestClient()
         
         # Get tournament_id from query parameters
         tournament_id = request.GET.get('tournament_id')
         
-        # Build SQL query using optimized materialized table (best performance)
-        if tournament_id:
-            sql = f"""
-            SELECT 
-                id,
-                team,
-                name,
-                position,
-                fantasy_position,
-                tournament_id,
-                fantasy_points_per_game,
-                fantasy_points_per_minute,
-                total_fantasy_points,
-                matches_played,
-                total_tries,
-                total_tackles_made,
-                total_metres_carried,
-                avg_tries_per_match,
-                avg_tackles_per_match
-            FROM default.draft_players_optimized 
-            WHERE tournament_id = {tournament_id}
-            ORDER BY fantasy_points_per_game DESC, name
-            """
-        else:
-            sql = """
-            SELECT 
-                id,
-                team,
-                name,
-                position,
-                fantasy_position,
-                tournament_id,
-                fantasy_points_per_game,
-                fantasy_points_per_minute,
-                total_fantasy_points,
-                matches_played,
-                total_tries,
-                total_tackles_made,
-                total_metres_carried,
-                avg_tries_per_match,
-                avg_tackles_per_match
-            FROM default.draft_players_optimized
-            ORDER BY fantasy_points_per_game DESC, name
-            """
-        
-        # Get rugby players with fantasy points
+        # Served from the in-memory player catalog, which mirrors
+        # draft_players_optimized and reloads itself when that table changes
         try:
-            result = client.execute_sql(sql)
-            if result and 'result' in result and result['result'].get('data_array'):
-                players = []
-                for row in result['result']['data_array']:
-                    players.append({
-                        'id': row[0],
-                        'team': row[1],
-                        'name': row[2],
-                        'position': row[3],
-                        'fantasy_position': row[4],
-                        'tournament_id': row[5],
-                        'fantasy_points_per_game': round(float(row[6]), 1) if row[6] is not None else 0.0,
-                        'fantasy_points_per_minute': round(float(row[7]), 2) if row[7] is not None else 0.0,
-                        'total_fantasy_points': round(float(row[8]), 1) if row[8] is not None else 0.0,
-                        'matches_played': int(row[9]) if row[9] is not None else 0,
-                        'total_tries': float(row[10]) if row[10] is not None else 0.0,
-                        'total_tackles_made': float(row[11]) if row[11] is not None else 0.0,
-                        'total_metres_carried': float(row[12]) if row[12] is not None else 0.0,
-                        'avg_tries_per_match': float(row[13]) if row[13] is not None else 0.0,
-                        'avg_tackles_per_match': float(row[14]) if row[14] is not None else 0.0
-                    })
-                return Response(players)
-            else:
-                return Response([])
+            catalog = get_player_catalog(client)
+            # Bodies are serialized (in the negotiated format) and compressed
+            # once per catalog snapshot
+            renderer = accepted_renderer(request)
+            since = request.GET.get('since')
+            if since:
+                body = catalog.memoize(('player_delta', renderer.format, since, tournament_id),
+                                       lambda: render_body(_player_delta(catalog, since, tournament_id), renderer))
+                return body_response(request, body)
+            if any(param in request.GET for param in PAGE_PARAMS):
+                query = tuple(sorted((key, tuple(values)) for key, values in request.GET.lists()))
+                try:
+                    body = catalog.memoize(('player_page', renderer.format, query),
+                                           lambda: render_body(_player_page(catalog, request, tournament_id), renderer))
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                return body_response(request, body)
+            body = catalog.memoize(('rugby_players', renderer.format, tournament_id), lambda: render_body(catalog.rows(
+                catalog.sort(catalog.select(tournament_id=tournament_id))
+            ), renderer))
+            return body_response(request, body)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
                 
@@ -108,6 +168,39 @@ def rugby_players(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_players(request):
+    """
+    Fuzzy search of player names and teams
+
+    Query parameters: q (required), tournament_id, limit (default 20).
+    Tolerates typos and ranks prefix matches first.
+    """
+    try:
+        query = request.GET.get('q', '').strip()
+        if not query:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.GET.get('limit', SEARCH_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        catalog = get_player_catalog(DatabricksRestClient())
+        tournament_id = request.GET.get('tournament_id')
+        candidates = catalog.select(tournament_id=tournament_id) if tournament_id else None
+
+        indices, scores = get_search_index(catalog).search(query, limit=limit, candidates=candidates)
+        results = catalog.rows(indices)
+        for player, score in zip(results, scores.tolist()):
+            player['score'] = round(score, 3)
+        return Response({'query': query, 'results': results, 'version': catalog.version})
+    except Exception as e:
+        print(f"ERROR in search_players: {str(e)}")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_team_players(request, team_id):
@@ -117,29 +210,12 @@ def get_team_players(request, team_id):
     try:
         client = DatabricksRestClient()
         
-        # Check cache first
-        cache_key = f'team_players_{team_id}'
-        cached_result = get_cached_result(cache_key)
-        if cached_result:
-            print(f"DEBUG: Cached team players for team {team_id}")
-            return Response(cached_result)
-        
-        # Get team players from the team_players table
-        sql = f"""
-        SELECT tp.player_id, tp.position, tp.fantasy_position, tp.is_starting, rp.player_name, rp.team
-        FROM default.team_players tp
-        LEFT JOIN default.rugby_players_25_26 rp ON tp.player_id = rp.player_id
-        WHERE tp.team_id = '{team_id}'
-        ORDER BY tp.is_starting DESC, tp.position
-        """
-        
-        result = client.execute_sql(sql)
-        
-        if result and 'result' in result and result['result'].get('data_array'):
-            players = []
-            data_rows = result['result']['data_array']
+        def load_team_players():
+            # Get team players from the team_players table
+            result = client.execute_named('team_players_by_team', {'team_id': team_id})
             
-            for row in data_rows:
+            players = []
+            for row in statement_rows(result):
                 players.append({
                     'id': row[0],
                     'position': row[1],
@@ -148,12 +224,10 @@ def get_team_players(request, team_id):
                     'name': row[4] if row[4] else 'Unknown Player',
                     'team': row[5] if row[5] else 'Unknown Team'
                 })
-            
-            # Cache the result
-            set_cached_result(cache_key, {'players': players})
-            return Response({'players': players})
-        else:
-            return Response({'players': []})
+            return {'players': players}
+        
+        # Teams with no players yet are cached too (as an empty roster)
+        return Response(get_or_load_cached_result(f'team_players_{team_id}', load_team_players, tags=[f'team:{team_id}']))
             
     except Exception as e:
         print(f"ERROR in get_team_players: {str(e)}")
@@ -181,26 +255,18 @@ def update_player_position(request, team_id, player_id):
         
         client = DatabricksRestClient()
         
-        # Build the SQL update query
-        update_fields = [f"is_starting = {str(is_starting).lower()}"]
-        if position:
-            update_fields.append(f"position = '{position}'")
-        
-        sql = f"""
-        UPDATE default.team_players 
-        SET {', '.join(update_fields)}
-        WHERE team_id = {team_id} AND player_id = {player_id}
-        """
-        
-        result = client.execute_sql(sql)
+        result = client.execute_named('update_team_player_position', {
+            'is_starting': is_starting,
+            'position': position or None,
+            'team_id': team_id,
+            'player_id': player_id
+        })
         
         if not result or 'status' not in result or result['status'].get('state') != 'SUCCEEDED':
             return Response({'error': f'Failed to update player position: {result}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        # Clear cache for this team
-        cache_key = f'team_players_{team_id}'
-        if cache_key in query_cache:
-            del query_cache[cache_key]
+        # Clear cached data for this team
+        invalidate([f'team:{team_id}'])
         
         return Response({'message': 'Player position updated successfully'}, status=status.HTTP_200_OK)
         
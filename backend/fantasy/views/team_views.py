@@ -12,7 +12,8 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from ..databricks_rest_client import DatabricksRestClient
-from .utils import get_cached_result, set_cached_result
+from ..queries import statement_parameters, values_list
+from .utils import get_cached_result, set_cached_result, invalidate
 
 
 @api_view(['POST'])
@@ -46,31 +47,18 @@ def join_league(request, league_id):
         except (ValueError, TypeError):
             return Response({'error': 'Invalid user ID format'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Escape team name to prevent SQL injection
-        escaped_team_name = team_name.replace("'", "''")
-        print(f"DEBUG: Original team_name: {team_name}")
-        print(f"DEBUG: Escaped team_name: {escaped_team_name}")
-        
-        sql = f"""
-        INSERT INTO default.league_teams (league_id, team_name, team_owner_user_id)
-        VALUES ({league_id}, '{escaped_team_name}', {user_id})
-        """
-        
-        print(f"DEBUG: Executing SQL: \n{sql}")
-        
-        result = client.execute_sql(sql)
+        # Team name is bound as a statement parameter, never formatted into SQL
+        result = client.execute_named('create_team', {
+            'league_id': league_id,
+            'team_name': team_name,
+            'user_id': user_id
+        })
         print(f"DEBUG: Result status: {result.get('status') if result else 'None'}")
         
         if not result or 'status' not in result or result['status'].get('state') != 'SUCCEEDED':
             return Response({'error': f'Failed to join league: {result}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        # Verify the team was created by querying it back
-        verify_sql = f"SELECT team_name FROM default.league_teams WHERE league_id = {league_id} AND team_owner_user_id = {user_id} ORDER BY id DESC LIMIT 1"
-        verify_result = client.execute_sql(verify_sql)
-        
-        if verify_result and 'result' in verify_result and verify_result['result'].get('data_array'):
-            stored_team_name = verify_result['result']['data_array'][0][0]
-            print(f"DEBUG: VERIFICATION - What Databricks actually stored: {[stored_team_name]}")
+        invalidate([f'league:{league_id}', f'user:{user_id}'])
         
         # Generate/update fixtures for the league after team is added
         try:
@@ -182,27 +170,37 @@ def team_statistics(request):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+FIXTURE_COLUMNS = ['week_number', 'week_date', 'home_team_id', 'away_team_id', 'home_team_name', 'away_team_name', 'is_playoff']
+FIXTURE_TYPES = {
+    'week_number': 'INT',
+    'week_date': 'STRING',
+    'home_team_id': 'BIGINT',
+    'away_team_id': 'BIGINT',
+    'home_team_name': 'STRING',
+    'away_team_name': 'STRING',
+    'is_playoff': 'BOOLEAN'
+}
+
+
 def generate_league_fixtures_auto(client, league_id):
     """
     Automatically generate/update fixtures for a league when teams are added
+    
+    Costs two warehouse round trips: the teams and tournament weeks are read
+    concurrently, then one MERGE replaces the league's fixtures.
     """
     try:
-        # Get teams in the league
-        teams_sql = f"""
-        SELECT id, team_name, team_owner_user_id
-        FROM default.league_teams 
-        WHERE league_id = {league_id}
-        ORDER BY id
-        """
-        
-        teams_result = client.execute_sql(teams_sql)
+        # Teams and tournament weeks are independent reads
+        with client.batch() as batch:
+            teams_item = batch.add_named('team_ids_by_league', {'league_id': league_id})
+            weeks_item = batch.add_named('tournament_weeks_for_league', {'league_id': league_id})
         
-        if not teams_result or 'result' not in teams_result or 'data_array' not in teams_result['result']:
+        if not teams_item.ok:
             print(f"DEBUG: No teams found for league {league_id}")
             return False
         
         teams = []
-        for row in teams_result['result']['data_array']:
+        for row in teams_item.rows:
             team_id, team_name, user_id = row
             teams.append({
                 "id": team_id,
@@ -214,36 +212,12 @@ def generate_league_fixtures_auto(client, league_id):
             print(f"DEBUG: Not enough teams ({len(teams)}) to generate fixtures for league {league_id}")
             return False
         
-        # Get tournament_id for this league
-        league_sql = f"""
-        SELECT tournament_id 
-        FROM default.user_created_leagues 
-        WHERE id = {league_id}
-        """
-        
-        league_result = client.execute_sql(league_sql)
-        
-        if not league_result or 'result' not in league_result or 'data_array' not in league_result['result']:
-            print(f"DEBUG: Could not get tournament_id for league {league_id}")
-            return False
-        
-        tournament_id = league_result['result']['data_array'][0][0]
-        
-        # Get tournament weeks
-        weeks_sql = f"""
-        SELECT Week, `Week Date`
-        FROM default.tournament_weeks 
-        WHERE Tournament_ID = {tournament_id}
-        ORDER BY `Week Date`
-        """
-        
-        weeks_result = client.execute_sql(weeks_sql)
-        
-        if not weeks_result or 'result' not in weeks_result or 'data_array' not in weeks_result['result']:
-            print(f"DEBUG: No weeks found for tournament {tournament_id}")
+        if not weeks_item.ok or not weeks_item.rows:
+            print(f"DEBUG: No tournament weeks found for league {league_id}")
             return False
         
-        weeks_data = weeks_result['result']['data_array']
+        tournament_id = weeks_item.rows[0][0]
+        weeks_data = [row[1:] for row in weeks_item.rows]
         
         # Generate round-robin fixtures
         fixtures = generate_round_robin_fixtures_auto(teams, len(weeks_data))
@@ -252,42 +226,54 @@ def generate_league_fixtures_auto(client, league_id):
             print(f"DEBUG: Failed to generate fixtures for league {league_id}")
             return False
         
-        # Clear existing fixtures for this league
-        clear_sql = f"DELETE FROM default.league_fixtures WHERE league_id = {league_id}"
-        client.execute_sql(clear_sql)
-        
-        # Insert new fixtures
-        fixtures_created = 0
+        fixture_rows = []
         for i, fixture in enumerate(fixtures):
             if i < len(weeks_data):
-                week_data = weeks_data[i]
-                week_name = week_data[0]
-                week_date = week_data[1]
-                
-                # Determine if this is a playoff week (last 2 weeks)
-                is_playoff = i >= len(weeks_data) - 2
-                
-                insert_sql = f"""
-                INSERT INTO default.league_fixtures 
-                (league_id, tournament_id, week_number, week_date, home_team_id, away_team_id, 
-                 home_team_name, away_team_name, is_playoff)
-                VALUES (
-                    {league_id},
-                    {tournament_id},
-                    {fixture['week']},
-                    '{week_date}',
-                    {fixture['home_team_id']},
-                    {fixture['away_team_id']},
-                    '{fixture['home_team_name']}',
-                    '{fixture['away_team_name']}',
-                    {is_playoff}
-                )
-                """
-                
-                client.execute_sql(insert_sql)
-                fixtures_created += 1
+                fixture_rows.append({
+                    'week_number': fixture['week'],
+                    'week_date': weeks_data[i][1],
+                    'home_team_id': fixture['home_team_id'],
+                    'away_team_id': fixture['away_team_id'],
+                    'home_team_name': fixture['home_team_name'],
+                    'away_team_name': fixture['away_team_name'],
+                    # Determine if this is a playoff week (last 2 weeks)
+                    'is_playoff': i >= len(weeks_data) - 2
+                })
+        
+        # Replace the league's fixtures in one statement: matching fixtures are
+        # updated in place, new ones inserted and stale ones deleted
+        values_sql, params = values_list(fixture_rows, FIXTURE_COLUMNS, FIXTURE_TYPES, prefix='f')
+        merge_sql = f"""
+        MERGE INTO default.league_fixtures AS t
+        USING (
+            SELECT * FROM VALUES {values_sql}
+            AS v({', '.join(FIXTURE_COLUMNS)})
+        ) AS s
+        ON t.league_id = :league_id
+            AND t.week_number = s.week_number
+            AND t.home_team_id = s.home_team_id
+            AND t.away_team_id = s.away_team_id
+        WHEN MATCHED THEN UPDATE SET
+            t.week_date = s.week_date,
+            t.home_team_name = s.home_team_name,
+            t.away_team_name = s.away_team_name,
+            t.is_playoff = s.is_playoff
+        WHEN NOT MATCHED THEN INSERT
+            (league_id, tournament_id, week_number, week_date, home_team_id, away_team_id,
+             home_team_name, away_team_name, is_playoff)
+            VALUES (:league_id, :tournament_id, s.week_number, s.week_date, s.home_team_id, s.away_team_id,
+                    s.home_team_name, s.away_team_name, s.is_playoff)
+        WHEN NOT MATCHED BY SOURCE AND t.league_id = :league_id THEN DELETE
+        """
+        params += statement_parameters({'league_id': league_id, 'tournament_id': tournament_id}, {'league_id': 'BIGINT', 'tournament_id': 'BIGINT'})
+        
+        result = client.execute_sql(merge_sql, params=params)
+        if not result or result.get('status', {}).get('state') != 'SUCCEEDED':
+            print(f"DEBUG: Failed to write fixtures for league {league_id}: {result}")
+            return False
         
-        print(f"DEBUG: Generated {fixtures_created} fixtures for league {league_id}")
+        invalidate([f'league:{league_id}'])
+        print(f"DEBUG: Generated {len(fixture_rows)} fixtures for league {league_id}")
         return True
         
     except Exception as e:
@@ -11,7 +11,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from ..databricks_rest_client import DatabricksRestClient
-from .utils import get_cached_result, set_cached_result
+from .utils import cached_response, get_or_load_cached_result, statement_rows
 
 
 @api_view(['GET'])
@@ -26,18 +26,13 @@ def tournaments(request):
     try:
         client = DatabricksRestClient()
         
-        cache_key = 'tournaments'
-        cached_result = get_cached_result(cache_key)
-        if cached_result:
-            return Response(cached_result)
-        
-        # Query tournaments table with existing columns
-        sql = "SELECT Tournamen_ID, Tournament FROM default.tournaments ORDER BY Tournament"
-        result = client.execute_sql(sql)
-        
-        if result and 'result' in result and 'data_array' in result['result']:
+        def load_tournaments():
+            # Query tournaments table with existing columns
+            sql = "SELECT Tournamen_ID, Tournament FROM default.tournaments ORDER BY Tournament"
+            result = client.execute_sql(sql)
+            
             tournaments_data = []
-            for row in result['result']['data_array']:
+            for row in statement_rows(result):
                 tournaments_data.append({
                     'id': row[0],
                     'name': row[1],
@@ -47,12 +42,13 @@ def tournaments(request):
                     'is_active': True,
                     'created_at': '2025-01-01T00:00:00Z'
                 })
-            
-            set_cached_result(cache_key, tournaments_data)
-            
-            return Response(tournaments_data)
-        else:
-            return Response([])
+            return tournaments_data
+        
+        # Fresh for an hour, then served stale for up to a day while it refreshes
+        tournaments_data = get_or_load_cached_result(
+            'tournaments', load_tournaments, tags=['tournaments'], ttl=3600, max_stale=86400
+        )
+        return cached_response(request, 'tournaments', tournaments_data)
             
     except Exception as e:
         import traceback
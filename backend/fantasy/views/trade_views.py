@@ -12,7 +12,12 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from ..databricks_rest_client import DatabricksRestClient
-from .utils import get_cached_result, set_cached_result, query_cache
+from ..queries import statement_parameters, values_list
+from .utils import get_or_load_cached_result, invalidate, statement_rows
+
+
+TRADE_MOVE_COLUMNS = ['from_team_id', 'to_team_id', 'player_id']
+TRADE_MOVE_TYPES = {column: 'BIGINT' for column in TRADE_MOVE_COLUMNS}
 
 
 @api_view(['GET', 'POST'])
@@ -28,28 +33,22 @@ def trade_proposals(request, league_id):
         try:
             client = DatabricksRestClient()
             
-            # Check cache first
-            cache_key = f'trade_proposals_{league_id}'
-            cached_result = get_cached_result(cache_key)
-            if cached_result:
-                return Response(cached_result)
-            
-            sql = f"""
-            SELECT tp.id, tp.league_id, tp.from_team_id, tp.to_team_id, tp.players_offered, 
-                   tp.players_requested, tp.status, tp.created_at, tp.responded_at,
-                   lt1.team_name as from_team_name, lt2.team_name as to_team_name
-            FROM default.trade_proposals tp
-            LEFT JOIN default.league_teams lt1 ON tp.from_team_id = lt1.id
-            LEFT JOIN default.league_teams lt2 ON tp.to_team_id = lt2.id
-            WHERE tp.league_id = {league_id}
-            ORDER BY tp.created_at DESC
-            """
-            
-            result = client.execute_sql(sql)
-            
-            if result and 'result' in result and result['result'].get('data_array'):
+            def load_trades():
+                sql = f"""
+                SELECT tp.id, tp.league_id, tp.from_team_id, tp.to_team_id, tp.players_offered, 
+                       tp.players_requested, tp.status, tp.created_at, tp.responded_at,
+                       lt1.team_name as from_team_name, lt2.team_name as to_team_name
+                FROM default.trade_proposals tp
+                LEFT JOIN default.league_teams lt1 ON tp.from_team_id = lt1.id
+                LEFT JOIN default.league_teams lt2 ON tp.to_team_id = lt2.id
+                WHERE tp.league_id = {league_id}
+                ORDER BY tp.created_at DESC
+                """
+                
+                result = client.execute_sql(sql)
+                
                 trades = []
-                for row in result['result']['data_array']:
+                for row in statement_rows(result):
                     trades.append({
                         'id': row[0],
                         'league_id': row[1],
@@ -63,12 +62,11 @@ def trade_proposals(request, league_id):
                         'from_team_name': row[9],
                         'to_team_name': row[10]
                     })
-                
-                # Cache the result
-                set_cached_result(cache_key, trades)
-                return Response(trades)
-            else:
-                return Response([])
+                return trades
+            
+            # Leagues with no trades yet are cached too, as an empty list
+            trades = get_or_load_cached_result(f'trade_proposals_{league_id}', load_trades, tags=[f'league:{league_id}'])
+            return Response(trades)
                 
         except Exception as e:
             print(f"ERROR in trade_proposals GET: {str(e)}")
@@ -106,10 +104,8 @@ def trade_proposals(request, league_id):
             if not result or 'status' not in result or result['status'].get('state') != 'SUCCEEDED':
                 return Response({'error': f'Failed to create trade proposal: {result}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-            # Clear cache
-            cache_key = f'trade_proposals_{league_id}'
-            if cache_key in query_cache:
-                del query_cache[cache_key]
+            # Clear cached data for this league
+            invalidate([f'league:{league_id}'])
             
             return Response({'message': 'Trade proposal created successfully'}, status=status.HTTP_201_CREATED)
             
@@ -175,41 +171,39 @@ def respond_to_trade(request, trade_id):
                 players_offered_list = json.loads(players_offered) if players_offered else []
                 players_requested_list = json.loads(players_requested) if players_requested else []
                 
-                # Move players from offering team to receiving team
-                for player_id in players_offered_list:
-                    # Remove from offering team
-                    remove_sql = f"""
-                    DELETE FROM default.team_players 
-                    WHERE team_id = {from_team_id} AND player_id = {player_id}
-                    """
-                    client.execute_sql(remove_sql)
-                    
-                    # Add to receiving team
-                    add_sql = f"""
-                    INSERT INTO default.team_players (team_id, player_id, position, fantasy_position, is_starting)
-                    SELECT {to_team_id}, {player_id}, rp.Position, rp.Fantasy_Position, false
-                    FROM default.rugby_players_25_26 rp
-                    WHERE rp.Player_ID = {player_id}
-                    """
-                    client.execute_sql(add_sql)
+                # Each move takes a player off one team and onto the other
+                moves = [
+                    {'from_team_id': from_team_id, 'to_team_id': to_team_id, 'player_id': player_id}
+                    for player_id in players_offered_list
+                ] + [
+                    {'from_team_id': to_team_id, 'to_team_id': from_team_id, 'player_id': player_id}
+                    for player_id in players_requested_list
+                ]
                 
-                # Move players from receiving team to offering team
-                for player_id in players_requested_list:
-                    # Remove from receiving team
-                    remove_sql = f"""
-                    DELETE FROM default.team_players 
-                    WHERE team_id = {to_team_id} AND player_id = {player_id}
-                    """
-                    client.execute_sql(remove_sql)
+                if moves:
+                    # One DELETE and one INSERT cover every player in both directions
+                    conditions = ' OR '.join(
+                        f"(team_id = :from_team_id_{i} AND player_id = :player_id_{i})"
+                        for i in range(len(moves))
+                    )
+                    remove_params = statement_parameters(
+                        {f'{column}_{i}': move[column] for i, move in enumerate(moves) for column in ('from_team_id', 'player_id')},
+                        {f'{column}_{i}': 'BIGINT' for i in range(len(moves)) for column in ('from_team_id', 'player_id')}
+                    )
+                    remove_result = client.execute_sql(f"DELETE FROM default.team_players WHERE {conditions}", params=remove_params)
+                    if not remove_result or remove_result.get('status', {}).get('state') != 'SUCCEEDED':
+                        raise Exception(f"Failed to remove traded players: {remove_result}")
                     
-                    # Add to offering team
+                    values_sql, add_params = values_list(moves, TRADE_MOVE_COLUMNS, TRADE_MOVE_TYPES, prefix='m')
                     add_sql = f"""
                     INSERT INTO default.team_players (team_id, player_id, position, fantasy_position, is_starting)
-                    SELECT {from_team_id}, {player_id}, rp.Position, rp.Fantasy_Position, false
-                    FROM default.rugby_players_25_26 rp
-                    WHERE rp.Player_ID = {player_id}
+                    SELECT m.to_team_id, m.player_id, rp.Position, rp.Fantasy_Position, false
+                    FROM VALUES {values_sql} AS m({', '.join(TRADE_MOVE_COLUMNS)})
+                    JOIN default.rugby_players_25_26 rp ON rp.Player_ID = m.player_id
                     """
-                    client.execute_sql(add_sql)
+                    add_result = client.execute_sql(add_sql, params=add_params)
+                    if not add_result or add_result.get('status', {}).get('state') != 'SUCCEEDED':
+                        raise Exception(f"Failed to add traded players: {add_result}")
                 
             except Exception as e:
                 print(f"Error processing trade: {str(e)}")
@@ -222,10 +216,11 @@ def respond_to_trade(request, trade_id):
                 client.execute_sql(revert_sql)
                 return Response({'error': f'Failed to process trade: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        # Clear cache
-        cache_key = f'trade_proposals_{league_id}'
-        if cache_key in query_cache:
-            del query_cache[cache_key]
+        # Clear cached data for this league and, for an accepted trade, both rosters
+        tags = [f'league:{league_id}']
+        if response == 'ACCEPTED':
+            tags += [f'team:{from_team_id}', f'team:{to_team_id}']
+        invalidate(tags)
         
         return Response({'message': f'Trade proposal {response.lower()} successfully'}, status=status.HTTP_200_OK)
         
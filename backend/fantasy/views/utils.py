@@ -2,51 +2,86 @@
 Shared utilities for Fantasy Rugby API views
 
 This module contains common functions used across multiple view modules.
+Cached query results live in the process-wide bounded cache (result_cache).
 """
 
 import time
-import gzip
-import json
-from django.http import JsonResponse
-
-
-# Simple in-memory cache for query results
-query_cache = {}
-CACHE_DURATION = 30  # Cache for 30 seconds
-
-
-def get_cached_result(cache_key):
-    """Get cached result if it exists and hasn't expired"""
-    if cache_key in query_cache:
-        result, timestamp = query_cache[cache_key]
-        if time.time() - timestamp < CACHE_DURATION:
-            return result
-        else:
-            del query_cache[cache_key]
-    return None
-
-
-def set_cached_result(cache_key, result):
-    """Cache a result with current timestamp"""
-    query_cache[cache_key] = (result, time.time())
-
-
-def compressed_response(data, status_code=200):
-    """Return a compressed JSON response"""
-    try:
-        # Convert data to JSON string
-        json_data = json.dumps(data)
-        
-        # Compress the data
-        compressed_data = gzip.compress(json_data.encode('utf-8'))
-        
-        # Create response with compressed data
-        response = JsonResponse(compressed_data, safe=False)
-        response['Content-Encoding'] = 'gzip'
-        response['Content-Type'] = 'application/json'
-        response.status_code = status_code
-        
-        return response
-    except Exception as e:
-        # Fallback to regular JSON response if compression fails
-        return JsonResponse(data, status=status_code)
+from ..compression import accepted_renderer, body_response, cached_body, render_body
+from ..single_flight import SingleFlight
+from ..result_cache import (
+    query_cache, get_cached_result, get_cached_entry, set_cached_result, delete_cached_result,
+    invalidate, tag_versions, DEFAULT_TTL, NOT_FOUND
+)
+from ..cache_refresh import refresher
+
+
+# Concurrent misses on the same cache key share one load
+cache_flight = SingleFlight()
+
+
+def get_or_load_cached_result(cache_key, load, tags=(), ttl=None, max_stale=None):
+    """
+    Return the cached result for cache_key, loading it on a miss
+    
+    Concurrent misses for the same key (a thundering herd when an entry
+    expires) share a single load() call. The result is cached under `tags`
+    (see result_cache.invalidate). Empty results are cached too, and load()
+    may return None for "not found", which is cached and returned as None.
+    load() should raise rather than return an empty value when the query
+    itself failed (see statement_rows).
+    
+    With max_stale, an expired result is still returned for up to max_stale
+    seconds while load() runs again in the background (see cache_refresh).
+    """
+    def load_and_cache(recheck=True):
+        # Another worker thread may have filled the entry while we queued
+        if recheck:
+            cached_result = get_cached_result(cache_key)
+            if cached_result is not None:
+                return cached_result
+        versions = tag_versions(tags)
+        result = load()
+        set_cached_result(cache_key, result, ttl=ttl, tags=tags, versions=versions, max_stale=max_stale)
+        return result
+    
+    def next_fresh_until():
+        return time.time() + (DEFAULT_TTL if ttl is None else ttl)
+    
+    entry = get_cached_entry(cache_key)
+    if entry is not None:
+        cached_result, fresh_until = entry
+    else:
+        cached_result = cache_flight.do(cache_key, load_and_cache)
+        fresh_until = next_fresh_until()
+    
+    if max_stale:
+        def reload():
+            cache_flight.do(cache_key, lambda: load_and_cache(recheck=False))
+            return next_fresh_until()
+        refresher.track(cache_key, reload, fresh_until)
+    
+    return None if cached_result is NOT_FOUND else cached_result
+
+
+def statement_rows(result):
+    """
+    Rows of a statement response, raising if the statement did not succeed
+    
+    Lets cached loaders tell "no rows" (cached) from a failed query (not cached).
+    """
+    if not result or result.get('status', {}).get('state') != 'SUCCEEDED':
+        raise Exception(f"Databricks query failed: {result.get('status') if result else result}")
+    return (result.get('result') or {}).get('data_array') or []
+
+
+def compressed_response(request, data, status_code=200):
+    """Return a response in the negotiated format, compressed as the client's Accept-Encoding allows"""
+    return body_response(request, render_body(data, accepted_renderer(request)), status=status_code)
+
+
+def cached_response(request, cache_key, data):
+    """
+    Return a cached result in the negotiated format, serialized and
+    compressed once per result rather than on every request
+    """
+    return body_response(request, cached_body(cache_key, data, accepted_renderer(request)))
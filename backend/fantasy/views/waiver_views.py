@@ -12,7 +12,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from ..databricks_rest_client import DatabricksRestClient
-from .utils import get_cached_result, set_cached_result, query_cache
+from .utils import get_or_load_cached_result, invalidate, statement_rows
 
 
 @api_view(['GET', 'POST'])
@@ -28,27 +28,21 @@ def waiver_claims(request, league_id):
         try:
             client = DatabricksRestClient()
             
-            # Check cache first
-            cache_key = f'waiver_claims_{league_id}'
-            cached_result = get_cached_result(cache_key)
-            if cached_result:
-                return Response(cached_result)
-            
-            sql = f"""
-            SELECT wc.id, wc.league_id, wc.team_id, wc.player_id, wc.players_to_drop, 
-                   wc.priority, wc.status, wc.created_at, lt.team_name, rp.name as player_name
-            FROM default.waiver_claims wc
-            LEFT JOIN default.league_teams lt ON wc.team_id = lt.id
-            LEFT JOIN default.rugby_players_25_26 rp ON wc.player_id = rp.Player_ID
-            WHERE wc.league_id = {league_id}
-            ORDER BY wc.priority ASC, wc.created_at ASC
-            """
-            
-            result = client.execute_sql(sql)
-            
-            if result and 'result' in result and result['result'].get('data_array'):
+            def load_claims():
+                sql = f"""
+                SELECT wc.id, wc.league_id, wc.team_id, wc.player_id, wc.players_to_drop, 
+                       wc.priority, wc.status, wc.created_at, lt.team_name, rp.name as player_name
+                FROM default.waiver_claims wc
+                LEFT JOIN default.league_teams lt ON wc.team_id = lt.id
+                LEFT JOIN default.rugby_players_25_26 rp ON wc.player_id = rp.Player_ID
+                WHERE wc.league_id = {league_id}
+                ORDER BY wc.priority ASC, wc.created_at ASC
+                """
+                
+                result = client.execute_sql(sql)
+                
                 claims = []
-                for row in result['result']['data_array']:
+                for row in statement_rows(result):
                     claims.append({
                         'id': row[0],
                         'league_id': row[1],
@@ -61,12 +55,11 @@ def waiver_claims(request, league_id):
                         'team_name': row[8],
                         'player_name': row[9]
                     })
-                
-                # Cache the result
-                set_cached_result(cache_key, claims)
-                return Response(claims)
-            else:
-                return Response([])
+                return claims
+            
+            # Leagues with no claims yet are cached too, as an empty list
+            claims = get_or_load_cached_result(f'waiver_claims_{league_id}', load_claims, tags=[f'league:{league_id}'])
+            return Response(claims)
                 
         except Exception as e:
             print(f"ERROR in waiver_claims GET: {str(e)}")
@@ -110,10 +103,8 @@ def waiver_claims(request, league_id):
             if not result or 'status' not in result or result['status'].get('state') != 'SUCCEEDED':
                 return Response({'error': f'Failed to create waiver claim: {result}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-            # Clear cache
-            cache_key = f'waiver_claims_{league_id}'
-            if cache_key in query_cache:
-                del query_cache[cache_key]
+            # Clear cached data for this league
+            invalidate([f'league:{league_id}'])
             
             return Response({'message': 'Waiver claim created successfully'}, status=status.HTTP_201_CREATED)
             
@@ -227,10 +218,8 @@ def process_waivers(request, league_id):
                 """
                 client.execute_sql(update_sql)
         
-        # Clear cache
-        cache_key = f'waiver_claims_{league_id}'
-        if cache_key in query_cache:
-            del query_cache[cache_key]
+        # Clear cached data for this league and every team with a claim
+        invalidate([f'league:{league_id}'] + [f'team:{claim[1]}' for claim in claims_result['result']['data_array']])
         
         return Response({
             'message': f'Processed {len(processed_claims)} waiver claims',
@@ -0,0 +1,345 @@
+"""
+In-memory stand-in for the Databricks SQL warehouse
+
+Serves the statements of the draft flow (leagues, teams, the player
+catalog, drafts, the pick log and team rosters) from Python dicts, so the
+flow can be driven end to end without a warehouse, e.g. by
+`manage.py simulate_draft`.
+
+The stub replaces the two DatabricksRestClient methods that send a
+statement over HTTP (_execute_merged and _execute_checked_once), and the
+client's constructor, so no DATABRICKS_* settings are needed. Everything
+above them runs for real: named query binding, read coalescing, record
+mapping and the query cache. Each statement can be delayed by a fixed
+latency plus random jitter to mimic a warehouse round trip.
+
+Statements are recognized by their registered query name (see queries)
+or, for the few built from formatted SQL, by their leading keywords and
+table. Anything else raises, so a new statement on the draft path shows
+up as an error instead of an empty result.
+
+Example Usage:
+    warehouse = InMemoryWarehouse(leagues=4, teams_per_league=12, latency=0.05)
+    with warehouse.installed():
+        client = DatabricksRestClient()
+        client.named_records('team_ids_by_league', {'league_id': 1})
+"""
+
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from .databricks_rest_client import DatabricksRestClient
+from .queries import QUERIES
+
+
+FANTASY_POSITIONS = [
+    ('Prop', 'Prop', 12), ('Hooker', 'Hooker', 6), ('Lock', 'Lock', 12),
+    ('Flanker', 'Back Row', 12), ('Number 8', 'Back Row', 6), ('Scrum-half', 'Scrum-half', 6),
+    ('Fly-half', 'Fly-half', 6), ('Centre', 'Centre', 12), ('Wing', 'Back Three', 12),
+    ('Fullback', 'Back Three', 6)
+]
+CLUBS = ['Bath', 'Bristol', 'Exeter', 'Gloucester', 'Harlequins', 'Leicester', 'Newcastle',
+         'Northampton', 'Sale', 'Saracens', 'Leinster', 'Munster']
+
+PLAYER_COLUMNS = [
+    ('id', 'BIGINT'), ('team', 'STRING'), ('name', 'STRING'), ('position', 'STRING'),
+    ('fantasy_position', 'STRING'), ('tournament_id', 'BIGINT'), ('fantasy_points_per_game', 'DOUBLE'),
+    ('fantasy_points_per_minute', 'DOUBLE'), ('total_fantasy_points', 'DOUBLE'), ('matches_played', 'BIGINT'),
+    ('total_tries', 'DOUBLE'), ('total_tackles_made', 'DOUBLE'), ('total_metres_carried', 'DOUBLE'),
+    ('avg_tries_per_match', 'DOUBLE'), ('avg_tackles_per_match', 'DOUBLE'), ('last_updated', 'TIMESTAMP')
+]
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _normalize(sql):
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def _bound_values(params):
+    """Python values of a statement's parameter list (or dict)"""
+    if isinstance(params, dict):
+        return dict(params)
+    values = {}
+    for parameter in params or []:
+        value = parameter.get('value')
+        type_name = parameter.get('type')
+        if value is not None and type_name in ('BIGINT', 'INT'):
+            value = int(value)
+        elif value is not None and type_name == 'BOOLEAN':
+            value = value == 'true'
+        values[parameter['name']] = value
+    return values
+
+
+def _cell(value):
+    """A value as the Statement Execution API sends it: a string or null"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
+
+
+def _response(columns, rows):
+    return {
+        'statement_id': 'in-memory',
+        'status': {'state': 'SUCCEEDED'},
+        'manifest': {
+            'schema': {
+                'column_count': len(columns),
+                'columns': [{'name': name, 'type_name': type_name, 'position': position}
+                            for position, (name, type_name) in enumerate(columns)]
+            },
+            'total_row_count': len(rows)
+        },
+        'result': {'data_array': [[_cell(value) for value in row] for row in rows]}
+    }
+
+
+def _affected(rows, inserted=None):
+    if inserted is None:
+        return _response([('num_affected_rows', 'BIGINT')], [[rows]])
+    return _response([('num_affected_rows', 'BIGINT'), ('num_inserted_rows', 'BIGINT')], [[rows, inserted]])
+
+
+def _stub_client_init(client):
+    """DatabricksRestClient.__init__ while a stub is installed: fixed settings, no token"""
+    client.workspace_url = 'inmemory://warehouse'
+    client.access_token = ''
+    client.warehouse_id = 'inmemory'
+    client.headers = {'Content-Type': 'application/json'}
+
+
+class InMemoryWarehouse:
+    """Tables and statement handlers for the draft flow, with injectable latency"""
+
+    def __init__(self, leagues=1, teams_per_league=12, players=900, tournament_id=1,
+                 latency=0.0, jitter=0.0, seed=42, migrated=True):
+        """
+        leagues and teams_per_league size the synthetic leagues (ids from 1,
+        draft NOT_STARTED); players is the size of the player pool, all in
+        tournament_id. Each statement sleeps latency plus up to jitter
+        seconds. migrated=False leaves out the draft engine's tables and
+        team_players.draft_id, as before create_draft_tables has run.
+        """
+        self.migrated = migrated
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.statements = Counter()
+
+        self.leagues = {}
+        self.teams = {}
+        team_id = 0
+        for league_id in range(1, leagues + 1):
+            self.leagues[league_id] = {'id': league_id, 'name': f'League {league_id}',
+                                       'tournament_id': tournament_id, 'draft_status': 'NOT_STARTED'}
+            self.teams[league_id] = []
+            for number in range(1, teams_per_league + 1):
+                team_id += 1
+                self.teams[league_id].append((team_id, f'Team {number}', 1000 + team_id))
+
+        updated = _now()
+        shares = [share for _, _, share in FANTASY_POSITIONS]
+        self.players = []
+        for index in range(players):
+            position, fantasy_position, _ = self._random.choices(FANTASY_POSITIONS, weights=shares)[0]
+            matches = self._random.randint(0, 18)
+            points = round(self._random.gammavariate(4.0, 3.0), 1)
+            self.players.append([
+                100000 + index, self._random.choice(CLUBS), f'Player {index}', position, fantasy_position,
+                tournament_id, points, round(points / 80, 3), round(points * matches, 1), matches,
+                float(self._random.randint(0, 10)), float(self._random.randint(0, 200)),
+                float(self._random.randint(0, 1500)), round(self._random.uniform(0, 1), 2),
+                round(self._random.uniform(0, 15), 2), updated
+            ])
+
+        self.drafts = []
+        self.picks = {}
+        # {team_id: {player_id: draft_id}}
+        self.team_players = {}
+        self.roster_stage = {}
+
+        self._named = {_normalize(query.sql): name for name, query in QUERIES.items()}
+
+    @contextmanager
+    def installed(self):
+        """Route every DatabricksRestClient statement to this warehouse"""
+        originals = (
+            DatabricksRestClient.__init__, DatabricksRestClient._execute_merged,
+            DatabricksRestClient._execute_checked_once
+        )
+        DatabricksRestClient.__init__ = _stub_client_init
+        DatabricksRestClient._execute_merged = lambda client, sql, params, timeout: self.execute(sql, params)
+        DatabricksRestClient._execute_checked_once = (
+            lambda client, sql, params, disposition, timeout: self.execute(sql, params)
+        )
+        try:
+            yield self
+        finally:
+            (DatabricksRestClient.__init__, DatabricksRestClient._execute_merged,
+             DatabricksRestClient._execute_checked_once) = originals
+
+    def execute(self, sql, params=None):
+        """Run one statement and return its response as the REST API would"""
+        sql = _normalize(sql)
+        name = self._named.get(sql) or self._statement_kind(sql)
+        with self._lock:
+            self.statements[name] += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+
+        handler = getattr(self, f'_q_{name.replace(" ", "_")}', None)
+        if handler is None:
+            raise Exception(f"InMemoryWarehouse has no handler for statement: {sql[:120]}")
+        with self._lock:
+            return handler(_bound_values(params), sql)
+
+    def _statement_kind(self, sql):
+        """Name for statements not built from a query template, e.g. 'delete team_players'"""
+        match = re.match(r'(INSERT INTO|DELETE FROM|MERGE INTO|UPDATE|SELECT)\b.*?\bdefault\.(\w+)', sql, re.IGNORECASE)
+        if not match:
+            return sql.split(' ', 1)[0].lower()
+        return f"{match.group(1).split()[0].lower()} {match.group(2)}"
+
+    # Player catalog
+
+    def _q_draft_players_version(self, params, sql):
+        return _response([('last_updated', 'TIMESTAMP'), ('player_count', 'BIGINT')],
+                         [[max(row[-1] for row in self.players), len(self.players)]])
+
+    def _q_draft_players_catalog(self, params, sql):
+        return _response(PLAYER_COLUMNS, self.players)
+
+    def _q_draft_players_changed_since(self, params, sql):
+        return _response(PLAYER_COLUMNS, [row for row in self.players if row[-1] > params['since']])
+
+    def _q_draft_player_ids(self, params, sql):
+        return _response([('id', 'BIGINT')], [[row[0]] for row in self.players])
+
+    # Draft engine schema
+
+    def _q_draft_engine_tables(self, params, sql):
+        tables = ['draft_picks', 'draft_roster_stage', 'drafts'] if self.migrated else []
+        return _response([('database', 'STRING'), ('tableName', 'STRING'), ('isTemporary', 'BOOLEAN')],
+                         [['default', table, False] for table in tables])
+
+    def _q_team_players_columns(self, params, sql):
+        columns = ['team_id', 'player_id', 'position', 'fantasy_position', 'is_starting']
+        return _response([('col_name', 'STRING')], [[column] for column in columns + ['draft_id'] * self.migrated])
+
+    # Leagues and teams
+
+    def _q_league_by_id(self, params, sql):
+        league = self.leagues.get(params['league_id'])
+        columns = [('id', 'BIGINT'), ('name', 'STRING'), ('tournament_id', 'BIGINT'), ('draft_status', 'STRING')]
+        return _response(columns, [[league[name] for name, _ in columns]] if league else [])
+
+    def _q_draft_status_by_league(self, params, sql):
+        league = self.leagues.get(params['league_id'])
+        return _response([('draft_status', 'STRING')], [[league['draft_status']]] if league else [])
+
+    def _q_set_draft_status(self, params, sql):
+        league = self.leagues.get(params['league_id'])
+        if league:
+            league['draft_status'] = params['draft_status']
+        return _affected(1 if league else 0)
+
+    def _q_team_ids_by_league(self, params, sql):
+        return _response([('id', 'BIGINT'), ('team_name', 'STRING'), ('team_owner_user_id', 'BIGINT')],
+                         self.teams.get(params['league_id'], []))
+
+    # Drafts and the pick log
+
+    def _q_create_draft(self, params, sql):
+        self.drafts.append(dict(params))
+        self.picks[params['draft_id']] = {}
+        return _affected(1, 1)
+
+    def _q_latest_draft_by_league(self, params, sql):
+        drafts = [draft for draft in self.drafts if draft['league_id'] == params['league_id']]
+        columns = ['draft_id', 'league_id', 'draft_order', 'pick_seconds', 'started_at']
+        return _response(list(zip(columns, ['STRING', 'BIGINT', 'STRING', 'INT', 'TIMESTAMP'])),
+                         [[drafts[-1][column] for column in columns]] if drafts else [])
+
+    def _q_record_draft_pick(self, params, sql):
+        picks = self.picks.setdefault(params['draft_id'], {})
+        if params['pick_number'] in picks:
+            return _affected(0, 0)
+        picks[params['pick_number']] = dict(params)
+        return _affected(1, 1)
+
+    def _q_draft_picks_after(self, params, sql):
+        picks = self.picks.get(params['draft_id'], {})
+        columns = ['pick_number', 'team_id', 'player_id', 'is_auto', 'picked_at']
+        rows = [[picks[number][column] for column in columns]
+                for number in sorted(picks) if number > params['after']]
+        return _response(list(zip(columns, ['INT', 'BIGINT', 'BIGINT', 'BOOLEAN', 'TIMESTAMP'])), rows)
+
+    # Team rosters
+
+    def _rows_from_values(self, params):
+        """Rows of a values_list (prefix 'r') from a statement's bound values"""
+        rows = {}
+        for marker, value in params.items():
+            match = re.match(r'r_(\w+)_(\d+)$', marker)
+            if match:
+                rows.setdefault(int(match.group(2)), {})[match.group(1)] = value
+        return [rows[index] for index in sorted(rows)]
+
+    def _q_merge_draft_roster_stage(self, params, sql):
+        stage = self.roster_stage.setdefault(params['draft_id'], {})
+        rows = self._rows_from_values(params)
+        for row in rows:
+            stage[row['team_id'], row['player_id']] = row
+        return _affected(len(rows))
+
+    def _q_clear_draft_roster_stage(self, params, sql):
+        return _affected(len(self.roster_stage.pop(params['draft_id'], {})))
+
+    def _q_delete_team_players(self, params, sql):
+        teams = {value for marker, value in params.items() if marker.startswith('league_team_')}
+        return _affected(sum(len(self.team_players.pop(team_id, {})) for team_id in teams))
+
+    def _q_insert_team_players(self, params, sql):
+        rows = self._rows_from_values(params)
+        for row in rows:
+            self.team_players.setdefault(row['team_id'], {})[row['player_id']] = None
+        return _affected(len(rows), len(rows))
+
+    def _q_merge_team_players(self, params, sql):
+        if not self.migrated:
+            raise Exception("[UNRESOLVED_COLUMN] A column with name `t`.`draft_id` cannot be resolved")
+        draft_id = params['draft_id']
+        if 'FROM default.draft_roster_stage' in sql:
+            rows = list(self.roster_stage.get(draft_id, {}).values())
+        else:
+            rows = self._rows_from_values(params)
+        league_teams = {value for marker, value in params.items() if marker.startswith('league_team_')}
+
+        changed = 0
+        source = set()
+        for row in rows:
+            source.add((row['team_id'], row['player_id']))
+            roster = self.team_players.setdefault(row['team_id'], {})
+            if roster.get(row['player_id']) != draft_id:
+                roster[row['player_id']] = draft_id
+                changed += 1
+        for team_id in league_teams:
+            roster = self.team_players.get(team_id, {})
+            for player_id in [player_id for player_id, version in roster.items()
+                              if (team_id, player_id) not in source and version != draft_id]:
+                del roster[player_id]
+                changed += 1
+        return _affected(changed)
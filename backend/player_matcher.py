@@ -5,24 +5,14 @@ Match players from Fantasy Rugby_converted.csv to premiership_official_squads_co
 
 import pandas as pd
 from fuzzywuzzy import fuzz, process
-import re
+from fantasy.player_search import strip_name_affixes
 
 def clean_player_name(name):
     """Clean player name for better matching"""
     if pd.isna(name):
         return ""
     
-    # Convert to string and strip whitespace
-    name = str(name).strip()
-    
-    # Remove common suffixes and prefixes
-    name = re.sub(r'\s+(Jr\.?|Sr\.?|III|IV|V)$', '', name)
-    name = re.sub(r'^(Mr\.?|Mrs\.?|Ms\.?|Dr\.?)\s+', '', name)
-    
-    # Remove extra spaces
-    name = re.sub(r'\s+', ' ', name)
-    
-    return name
+    return strip_name_affixes(name)
 
 def match_players():
     """Match players between the two CSV files"""
@@ -6,6 +6,9 @@ Run this whenever rugby_match_statistics_agg is updated
 
 from fantasy.databricks_rest_client import DatabricksRestClient
 
+# A full rebuild can take several minutes on a cold warehouse
+REFRESH_TIMEOUT = 30 * 60
+
 def refresh_draft_players_table():
     """Refresh the materialized draft players table with latest fantasy points data"""
     client = DatabricksRestClient()
@@ -63,8 +66,19 @@ def refresh_draft_players_table():
     WHERE rn = 1
     """
     
-    result = client.execute_sql(create_sql)
-    print(f"✅ Recreated materialized table: {result}")
+    handle = client.submit_sql(create_sql)
+    print(f"⏳ Rebuild submitted as statement {handle.statement_id}, waiting for it to finish...")
+    try:
+        result = handle.result(timeout=REFRESH_TIMEOUT)
+    except (TimeoutError, KeyboardInterrupt):
+        handle.cancel()
+        print("❌ Rebuild cancelled before it finished")
+        raise
+    
+    if handle.state != 'SUCCEEDED':
+        print(f"❌ Failed to recreate materialized table: {result.get('status')}")
+        return
+    print(f"✅ Recreated materialized table: {result['status']}")
     
     # Verify the refresh
     count_sql = "SELECT COUNT(*) FROM default.draft_players_optimized"
@@ -0,0 +1,14 @@
+"""
+ASGI config for rugby_fantasy project.
+
+Serves the same application as wsgi.py; under ASGI the draft event
+streams wait on the event loop instead of holding a worker thread each.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rugby_fantasy.settings')
+
+application = get_asgi_application()
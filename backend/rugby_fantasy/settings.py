@@ -2,6 +2,7 @@
 Django settings for rugby_fantasy project.
 """
 
+import importlib.util
 from pathlib import Path
 from decouple import config
 
@@ -31,6 +32,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'fantasy.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +61,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'rugby_fantasy.wsgi.application'
+ASGI_APPLICATION = 'rugby_fantasy.asgi.application'
 
 # Database
 DATABASES = {
@@ -117,9 +120,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # JSON by default (orjson when installed); MessagePack for clients that
+    # send Accept: application/msgpack, when msgpack is installed
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-    ],
+        'fantasy.renderers.ORJSONRenderer',
+    ] + (['fantasy.renderers.MessagePackRenderer'] if importlib.util.find_spec('msgpack') else []),
 }
 
 # CORS settings
@@ -140,6 +145,41 @@ DATABRICKS_ACCESS_TOKEN = config('DATABRICKS_ACCESS_TOKEN', default='your-access
 DATABRICKS_CLUSTER_ID = config('DATABRICKS_CLUSTER_ID', default='your-cluster-id')
 DATABRICKS_WAREHOUSE_ID = config('DATABRICKS_WAREHOUSE_ID', default='your-warehouse-id')
 
+# Query result cache
+# QUERY_CACHE_URL points every worker at one shared cache, for example
+# redis://localhost:6379/1 or memcached://localhost:11211. A file:// path
+# (file:///tmp/fantasy-query-cache) gives a shared local stand-in for
+# development and tests. Leave unset for a per-process in-memory cache, whose
+# entries live 30 seconds by default (see fantasy.result_cache).
+QUERY_CACHE_URL = config('QUERY_CACHE_URL', default='')
+QUERY_CACHE_ALIAS = 'query_results' if QUERY_CACHE_URL else None
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+if QUERY_CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES['query_results'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': QUERY_CACHE_URL,
+        'KEY_PREFIX': 'fantasy-qc',
+    }
+elif QUERY_CACHE_URL.startswith('memcached://'):
+    CACHES['query_results'] = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': QUERY_CACHE_URL[len('memcached://'):],
+        'KEY_PREFIX': 'fantasy-qc',
+    }
+elif QUERY_CACHE_URL.startswith('file://'):
+    CACHES['query_results'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': QUERY_CACHE_URL[len('file://'):],
+        'KEY_PREFIX': 'fantasy-qc',
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    }
+
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'